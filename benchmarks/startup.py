@@ -0,0 +1,84 @@
+""" Pomiar czasu zimnego startu gry: od uruchomienia interpretera do
+wyświetlenia pierwszego okna (okna wyboru trybu gry lub, przy
+'--resume', okna wczytanej gry). Każdy pomiar to osobny proces. """
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child(output):
+    """ Funkcja wykonywana w mierzonym procesie: uruchamia 'saper.py' i
+    zapisuje do pliku 'output' czas pokazania pierwszego okna, po czym
+    kończy proces razem z procesami puli plansz bez zgadywania. """
+    import runpy
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import QApplication, QDialog
+
+    def shown():
+        QApplication.processEvents()
+        with open(output, "w") as file:
+            file.write(str(time.time()))
+        gui = sys.modules.get("saper_gui")
+        if gui is not None:
+            gui.no_guess_pool.shutdown()
+        os._exit(0)
+
+    original = QDialog.exec
+
+    def exec(self):
+        QTimer.singleShot(0, shown)
+        return original(self)
+
+    QDialog.exec = exec
+    original_app_exec = QApplication.exec
+
+    def app_exec(*args):
+        QTimer.singleShot(0, shown)
+        return original_app_exec(*args)
+
+    QApplication.exec = app_exec
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    runpy.run_path(os.path.join(ROOT, "saper.py"), run_name="__main__")
+
+
+def measure(runs, argv):
+    """ Funkcja zwracająca listę czasów startu w milisekundach. """
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    times = []
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, "shown")
+        for _ in range(runs):
+            start = time.time()
+            subprocess.run([sys.executable, __file__, "--child", output] + argv,
+                           env=env, stderr=subprocess.DEVNULL, timeout=60)
+            with open(output) as file:
+                times.append((float(file.read()) - start) * 1000)
+    return times
+
+
+def main(argv=None):
+    """ Punkt wejścia pomiaru. """
+    parser = argparse.ArgumentParser(description="Measure cold start of the game.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--resume", help="saved game to open instead of the selector")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    game = [args.resume] if args.resume else []
+    if args.child:
+        sys.argv = ["saper.py"] + game
+        child(args.child)
+        return
+    times = measure(args.runs, ["--resume", args.resume] if args.resume else [])
+    print(f"startup: median {statistics.median(times):.1f} ms, "
+          f"min {min(times):.1f} ms, max {max(times):.1f} ms ({args.runs} runs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+""" Zestaw testów wydajności logiki gry i GUI.
+
+Każdy przypadek mierzony jest dla kolejnych rozmiarów plansz z 'SIZES'
+(lub 'QUICK_SIZES' przy '--quick'); przypadki GUI działają na platformie
+Qt 'offscreen' i tylko dla rozmiarów z 'GUI_SIZES'. Wyniki zapisywane są w
+formacie JSON i mogą być porównane z wcześniej zapisanym plikiem bazowym:
+przypadek, którego najkrótszy czas jest dłuższy od bazowego o więcej niż
+'--threshold', zgłaszany jest jako regresja, a program kończy się kodem 1.
+Porównywane są minima, bo są znacznie mniej zaszumione niż mediany.
+
+Przykład:
+    python benchmarks/suite.py --output baseline.json
+    python benchmarks/suite.py --baseline baseline.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import saper_logic as saper  # noqa: E402
+from saper_flood import flood_fill  # noqa: E402
+
+SIZES = [(9, 9, 10), (16, 16, 40), (30, 16, 99), (100, 100, 2000),
+         (300, 300, 18000), (1000, 1000, 200000)]
+QUICK_SIZES = SIZES[:4]
+GUI_SIZES = [(9, 9, 10), (16, 16, 40), (30, 16, 99), (100, 100, 2000)]
+SEED = 12345
+
+
+def repeats(width, height):
+    """ Funkcja dobierająca liczbę powtórzeń do rozmiaru planszy. """
+    cells = width * height
+    return 50 if cells <= 1000 else 10 if cells <= 100000 else 3
+
+
+def measure(setup, run, count):
+    """ Funkcja mierząca 'count' razy czas wywołania 'run(stan)', gdzie stan
+    przygotowywany jest przed każdym pomiarem przez 'setup()'. Na czas
+    pomiaru wyłączany jest odśmiecacz. Zwraca słownik z minimum i medianą w
+    sekundach. """
+    times = []
+    for _ in range(count):
+        state = setup()
+        gc.disable()
+        start = time.perf_counter()
+        run(state)
+        times.append(time.perf_counter() - start)
+        gc.enable()
+    return {"min": min(times), "median": statistics.median(times), "runs": count}
+
+
+def largest_opening(board):
+    """ Funkcja zwracająca współrzędne pola zerowego, które otwiera
+    największą wyspę planszy. """
+    best = (0, None)
+    seen = set()
+    for (i, n) in enumerate(board.numbers):
+        if n != 0 or i in seen:
+            continue
+        island = flood_fill(board.width, board.height, board.numbers, i)
+        seen.update(j for j in island if board.numbers[j] == 0)
+        if len(island) > best[0]:
+            best = (len(island), i)
+    if best[1] is None:
+        return (0, 0)
+    return (best[1] % board.width, best[1] // board.width)
+
+
+def chord_board(width, height, mines, chords=100):
+    """ Funkcja przygotowująca planszę do szybkiego odsłaniania: odsłania do
+    'chords' pól z cyframi i oflagowuje sąsiadujące z nimi miny. Zwraca
+    planszę i listę tych pól. """
+    board = saper.Board(width, height, mines, SEED)
+    cells = []
+    for (i, n) in enumerate(board.numbers):
+        if len(cells) == chords:
+            break
+        if n <= 0:
+            continue
+        (y, x) = divmod(i, width)
+        around = [j for j in board.around(x, y) if board.numbers[j] == -1]
+        if board.flags + len(around) > board.mines:
+            break
+        board.reveal(x, y)
+        for j in around:
+            if board.fields[j // width][j % width][1] == 'c':
+                board.flag(j % width, j // width)
+        cells.append((x, y))
+    return (board, cells)
+
+
+def logic_cases(width, height, mines):
+    """ Funkcja zwracająca przypadki logiki gry dla jednego rozmiaru jako
+    pary (nazwa, (setup, run)). Odsłanianie wyspy mierzone jest na planszy z
+    dziesięciokrotnie mniejszą liczbą min, żeby wyspy były duże. """
+    def lazy():
+        return saper.Board(width, height, mines, SEED, lazy=True)
+
+    def placed():
+        board = lazy()
+        board.place_mines(mines)
+        return board
+
+    def filled():
+        board = placed()
+        board.fill_with_numbers()
+        return board
+
+    def opening():
+        board = saper.Board(width, height, max(1, mines // 10), SEED)
+        return (board, largest_opening(board))
+
+    def almost_won():
+        board = saper.Board(width, height, mines, SEED)
+        board.safe_left = 1
+        return board
+
+    def check(board):
+        for _ in range(10000):
+            board.check_for_win()
+
+    def chords(state):
+        (board, cells) = state
+        for (x, y) in cells:
+            board.quick_uncover(x, y)
+
+    return [
+        ("board.construct", (lambda: None, lambda _: saper.Board(width, height, mines, SEED))),
+        ("board.place_mines", (lazy, lambda board: board.place_mines(mines))),
+        ("board.fill_with_numbers", (placed, lambda board: board.fill_with_numbers())),
+        ("board.calc_bbbv", (filled, lambda board: board.calc_bbbv())),
+        ("board.uncover_opening", (opening, lambda state: state[0].uncover(*state[1]))),
+        ("board.quick_uncover_100", (lambda: chord_board(width, height, mines), chords)),
+        ("board.check_for_win_10000", (almost_won, check)),
+    ]
+
+
+def gui_cases(width, height, mines):
+    """ Funkcja zwracająca przypadki GUI dla jednego rozmiaru. Obsługa
+    zdarzeń Qt po renderowaniu sprawia, że czas obejmuje też rysowanie. """
+    from PyQt5.QtWidgets import QApplication
+    from saper_gui import BoardManager
+    app = QApplication.instance() or QApplication([])
+    shown = []
+
+    def new_game():
+        """ Tworzy nową planszę, zamykając planszę z poprzedniego pomiaru,
+        żeby kolejne pomiary nie obsługiwały zdarzeń starych okien. """
+        for (manager, layout) in shown:
+            manager.canvas.close()
+            manager.canvas.deleteLater()
+        shown.clear()
+        manager = BoardManager(width, height, mines)
+        layout = manager.to_layout()
+        manager.canvas.resize(min(40 * width, 1600), min(40 * height, 1600))
+        manager.canvas.show()
+        app.processEvents()
+        shown.append((manager, layout))
+        return manager
+
+    def opened():
+        manager = new_game()
+        manager.board.place(mines)
+        manager.board.uncover(*largest_opening(manager.board))
+        return manager
+
+    def render(manager):
+        manager.render()
+        manager.canvas.repaint()
+        app.processEvents()
+
+    def setup_only(_):
+        new_game()
+
+    return [
+        ("gui.new_game", (lambda: None, setup_only)),
+        ("gui.render_opening", (opened, render)),
+    ]
+
+
+def run_suite(sizes, gui, verbose=True):
+    """ Funkcja wykonująca wszystkie przypadki i zwracająca słownik wyników
+    z kluczami 'przypadek/szerokośćxwysokość'. """
+    results = {}
+    for (width, height, mines) in sizes:
+        cases = logic_cases(width, height, mines)
+        if gui and (width, height, mines) in GUI_SIZES:
+            cases += gui_cases(width, height, mines)
+        for (name, (setup, run)) in cases:
+            key = f"{name}/{width}x{height}"
+            results[key] = measure(setup, run, repeats(width, height))
+            if verbose:
+                print(f"{key:40} {results[key]['median'] * 1000:10.3f} ms", flush=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """ Funkcja zwracająca listę regresji: krotek (klucz, minimum bazowe,
+    minimum obecne) dla przypadków wolniejszych o więcej niż 'threshold'
+    (ułamek) od pliku bazowego. """
+    regressions = []
+    for (key, result) in results.items():
+        base = baseline.get(key)
+        if base is not None and result["min"] > base["min"] * (1 + threshold):
+            regressions.append((key, base["min"], result["min"]))
+    return regressions
+
+
+def main(argv=None):
+    """ Punkt wejścia zestawu testów wydajności. """
+    parser = argparse.ArgumentParser(description="Run minesweeper benchmarks.")
+    parser.add_argument("--quick", action="store_true",
+                        help="only boards up to 100x100")
+    parser.add_argument("--no-gui", action="store_true", help="skip Qt benchmarks")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="slowdown reported as a regression (default: 0.25)")
+    args = parser.parse_args(argv)
+
+    gui = not args.no_gui
+    if gui:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        os.chdir(ROOT)
+        try:
+            import PyQt5.QtWidgets  # noqa: F401
+        except ImportError:
+            gui = False
+    results = run_suite(QUICK_SIZES if args.quick else SIZES, gui)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"python": platform.python_version(),
+                       "machine": platform.machine(),
+                       "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+                       "results": results}, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for (key, before, after) in regressions:
+            print(f"REGRESSION {key}: {before * 1000:.3f} ms -> {after * 1000:.3f} ms")
+        if regressions:
+            sys.exit(1)
+        print("no regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,14 @@
 
-from PyQt5.QtWidgets import QDialog, QHBoxLayout, QVBoxLayout, QPushButton, QLabel, QFormLayout, QSlider, QDialogButtonBox, QTableWidget, QTableWidgetItem, QWidget
-from PyQt5.QtCore import Qt
-from saper_gui import BoardManager, highscore_handler
+import sys
+from PyQt5.QtWidgets import QDialog, QHBoxLayout, QVBoxLayout, QPushButton, QCheckBox, QLabel, QFormLayout, QSlider, QDialogButtonBox, QTableWidget, QTableWidgetItem, QWidget, QFileDialog, QInputDialog, QComboBox, QProgressDialog, QMessageBox
+from PyQt5.QtCore import Qt, QTimer
+from saper_gui import BoardManager, ReplayPlayer, ProfilerOverlay, EndlessCanvas, get_highscore_handler, no_guess_pool
+from saper_endless import EndlessBoard, MIN_DENSITY, MAX_DENSITY
+import saper_instrument
+import saper_format
+import saper_replay
+
+DIFFICULTIES = [(8, 8, 10), (16, 16, 40), (30, 16, 99)]
 
 
 def clear_board(layout):
@@ -25,7 +32,7 @@ def clear_stats_row(layout):
 
 def GameModeSelector():
     """ Wywołuje okno dialogowe służące do wyboru nowej gry. Zwraca
-    3-elementową krotkę (długość, wysokość, liczba_min). """
+    4-elementową krotkę (długość, wysokość, liczba_min, bez_zgadywania). """
     window = QDialog()
     layout = QHBoxLayout()
     window.setLayout(layout)
@@ -134,65 +141,167 @@ def GameModeSelector():
         elif slider == custom_mines:
             custom_mines_label.setText(str(custom_mines.value()))
 
+    no_guess_box = QCheckBox("No guessing")
+    no_guess_box.toggled.connect(lambda on: on and no_guess_pool.prefill(DIFFICULTIES))
+    column.addWidget(no_guess_box)
+
     confirm_button = QDialogButtonBox(QDialogButtonBox.Ok, window)
     confirm_button.accepted.connect(window.accept)
     column.addWidget(confirm_button)
     if window.exec():
+        no_guess = no_guess_box.isChecked()
         if easy_button.isChecked():
-            return (8, 8, 10)
+            return DIFFICULTIES[0] + (no_guess,)
         elif advanced_button.isChecked():
-            return (16, 16, 40)
+            return DIFFICULTIES[1] + (no_guess,)
         elif expert_button.isChecked():
-            return (30, 16, 99)
+            return DIFFICULTIES[2] + (no_guess,)
         else:
-            return (custom_width.value(), custom_height.value(), custom_mines.value())
+            return (custom_width.value(), custom_height.value(), custom_mines.value(), no_guess)
     else:
         return None
 
 
+def no_guess_board(parent, width, height, mines):
+    """ Funkcja pobierająca z 'no_guess_pool' planszę bez zgadywania. Gdy
+    plansza nie jest jeszcze gotowa, pokazuje okno postępu, które można
+    anulować; pętla zdarzeń działa w tym czasie dalej. Zwraca krotkę
+    (ziarno, pole startowe) albo None, gdy gracz anulował czekanie lub
+    planszy nie udało się znaleźć (o czym gracz jest informowany). """
+    result = no_guess_pool.request(width, height, mines)
+    if not result.ready():
+        progress = QProgressDialog("Generating a board without guessing...", "Cancel",
+                                   0, 0, parent)
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(0)
+        timer = QTimer(progress)
+        timer.timeout.connect(lambda: result.ready() and progress.accept())
+        timer.start(50)
+        if not progress.exec():
+            return None
+    generated = result.get()
+    if generated is None:
+        QMessageBox.warning(parent, "No guessing",
+                            "Could not find a board without guessing for these "
+                            "parameters. Try fewer mines or a bigger board.")
+    return generated
+
+
 class HighscoreDialog(QDialog):
-    """ Okno dialogowe zawierające tabelę z najlepszymi wynikami. """
-    def __init__(self, parent=None):
+    """ Okno dialogowe zawierające tabelę z najlepszymi wynikami. Wyniki
+    pobierane są z bazy stronami po 'PAGE_SIZE' wierszy, osobno dla każdej
+    konfiguracji planszy. """
+    PAGE_SIZE = 10
+
+    def __init__(self, config=None, parent=None):
+        """ Parametr 'config' to krotka (szerokość, wysokość, liczba min)
+        konfiguracji pokazywanej na początku. """
         super(HighscoreDialog, self).__init__(parent)
         layout = QVBoxLayout()
         self.setLayout(layout)
 
-        self.table = QTableWidget(10, 3)
+        self.configs = get_highscore_handler().configurations()
+        if config is not None and config not in self.configs:
+            self.configs.append(config)
+        self.config_box = QComboBox()
+        self.config_box.addItems([f"{w}x{h}, {m} mines" if w else "Older results"
+                                  for (w, h, m) in self.configs])
+        if config is not None:
+            self.config_box.setCurrentIndex(self.configs.index(config))
+        self.order_box = QComboBox()
+        self.order_box.addItems(["3BV/s", "Time"])
+        self.page = 0
+
+        options = QHBoxLayout()
+        options.addWidget(self.config_box)
+        options.addWidget(self.order_box)
+        layout.addLayout(options)
+
+        self.table = QTableWidget(self.PAGE_SIZE, 5)
         self.table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.table.setHorizontalHeaderLabels(["Date", "Time", "3BV/s"])
-        self.fill_table(self.table)
+        self.table.setHorizontalHeaderLabels(["Player", "Date", "Time", "3BV", "3BV/s"])
         layout.addWidget(self.table)
 
-    def fill_table(self, table):
-        """ Uzupełnienie tabeli wierszami z zaimportowanego obiektu klasy 
+        pages = QHBoxLayout()
+        self.previous_button = QPushButton("Previous")
+        self.next_button = QPushButton("Next")
+        self.page_label = QLabel()
+        pages.addWidget(self.previous_button)
+        pages.addWidget(self.page_label)
+        pages.addWidget(self.next_button)
+        layout.addLayout(pages)
+
+        self.config_box.currentIndexChanged.connect(lambda: self.show_page(0))
+        self.order_box.currentIndexChanged.connect(lambda: self.show_page(0))
+        self.previous_button.clicked.connect(lambda: self.show_page(self.page - 1))
+        self.next_button.clicked.connect(lambda: self.show_page(self.page + 1))
+        self.show_page(0)
+
+    def show_page(self, page):
+        """ Wyświetla stronę 'page' wyników wybranej konfiguracji. """
+        self.page = page
+        self.table.clearContents()
+        if not self.configs:
+            self.page_label.setText("No results")
+            self.previous_button.setDisabled(True)
+            self.next_button.setDisabled(True)
+            return
+        config = self.configs[self.config_box.currentIndex()]
+        pages = max(1, -(-get_highscore_handler().count(*config) // self.PAGE_SIZE))
+        self.page_label.setText(f"Page {page + 1} of {pages}")
+        self.previous_button.setDisabled(page == 0)
+        self.next_button.setDisabled(page + 1 >= pages)
+        self.fill_table(self.table, config)
+
+    def fill_table(self, table, config):
+        """ Uzupełnienie tabeli wierszami bieżącej strony wyników
+        konfiguracji 'config' z zaimportowanego obiektu klasy
         HighscoreHandler. """
-        for i in range(len(highscore_handler.records)):
-            record = highscore_handler.records[i]
-            (minutes, seconds) = divmod(record[1], 60)
-
-            date_item = QTableWidgetItem(record[0])
-            time_item = QTableWidgetItem(f"{minutes}:{seconds}")
-            coef_item = QTableWidgetItem(str(record[2]))
-
-            table.setItem(i, 0, date_item)
-            table.setItem(i, 1, time_item)
-            table.setItem(i, 2, coef_item)
+        order = "coef" if self.order_box.currentIndex() == 0 else "time"
+        records = get_highscore_handler().top(*config, n=self.PAGE_SIZE,
+                                              offset=self.page * self.PAGE_SIZE,
+                                              order=order)
+        for (i, record) in enumerate(records):
+            (minutes, seconds) = divmod(record.time, 60)
+            table.setItem(i, 0, QTableWidgetItem(record.player))
+            table.setItem(i, 1, QTableWidgetItem(record.date))
+            table.setItem(i, 2, QTableWidgetItem(f"{minutes}:{seconds:02d}"))
+            table.setItem(i, 3, QTableWidgetItem(str(record.bbbv)))
+            table.setItem(i, 4, QTableWidgetItem(f"{record.coef:.3f}"))
         table.resizeColumnsToContents()
 
 
 class MenuButtons(QHBoxLayout):
-    """ Layout zawierający przyciski menu: nowej gry i najlepszych wyników. """
+    """ Layout zawierający przyciski menu: nowej gry, najlepszych wyników,
+    podpowiedzi, mapy cieplnej, zapisu i wczytania gry, odtworzenia
+    zapisanej gry oraz gry na nieskończonej planszy. """
     def __init__(self, parent=None):
         super(MenuButtons, self).__init__(parent)
         self.new_game_button = QPushButton("New game")
         self.highscore_button = QPushButton("Highscores")
+        self.hint_button = QPushButton("Hint")
+        self.heatmap_button = QPushButton("Heatmap")
+        self.heatmap_button.setCheckable(True)
+        self.save_button = QPushButton("Save")
+        self.load_button = QPushButton("Load")
+        self.replay_button = QPushButton("Replay")
+        self.endless_button = QPushButton("Endless")
         self.addWidget(self.new_game_button)
         self.addWidget(self.highscore_button)
+        self.addWidget(self.hint_button)
+        self.addWidget(self.heatmap_button)
+        self.addWidget(self.save_button)
+        self.addWidget(self.load_button)
+        self.addWidget(self.replay_button)
+        self.addWidget(self.endless_button)
 
 
 class GameWindow(QWidget):
     """ Główne okno gry """
-    def __init__(self, parent=None):
+    def __init__(self, path=None, parent=None):
+        """ Podanie ścieżki 'path' pliku zapisanej gry wznawia ją zamiast
+        pytać o parametry nowej planszy. Przy włączonych pomiarach
+        'saper_instrument' na oknie wyświetlana jest nakładka z czasami. """
         super(GameWindow, self).__init__(parent)
         layout = QVBoxLayout()
         self.setLayout(layout)
@@ -200,13 +309,30 @@ class GameWindow(QWidget):
         self.menu = MenuButtons()
         self.menu.new_game_button.clicked.connect(lambda: self.new_game(layout))
         self.menu.highscore_button.clicked.connect(self.highscores)
+        self.menu.hint_button.clicked.connect(lambda: self.board.show_hint())
+        self.menu.heatmap_button.toggled.connect(lambda on: self.board.set_heatmap(on))
+        self.menu.save_button.clicked.connect(self.save_game)
+        self.menu.load_button.clicked.connect(lambda: self.load_game(layout))
+        self.menu.replay_button.clicked.connect(lambda: self.replay_game(layout))
+        self.menu.endless_button.clicked.connect(self.endless_game)
+        self.player = None
+        self.endless = None
         layout.addLayout(self.menu)
 
-        (width, height, mines) = GameModeSelector()
-        self.board = BoardManager(width, height, mines)
+        self.board = None
+        if path is not None:
+            loaded = self.read_file(saper_format.load, path)
+            if loaded is not None:
+                (board, time) = loaded
+                self.board = BoardManager(board.width, board.height, board.mines,
+                                          board=board, time=time)
+        while self.board is None:
+            params = GameModeSelector()
+            if params is None:
+                sys.exit()
+            self.board = self.create_board(params)
         self.board_layout = self.board.to_layout()
-        self.bbbv_label = QLabel()
-        self.bbbv_label.setText(f"3BV of the board: {self.board.board.bbbv}")
+        self.bbbv_label = self.board.bbbv_label
 
         self.stats_row = QHBoxLayout()
         self.stats_row.addWidget(self.board.timer)
@@ -214,32 +340,143 @@ class GameWindow(QWidget):
         self.stats_row.addWidget(self.bbbv_label)
         layout.addLayout(self.stats_row)
         layout.addLayout(self.board_layout)
+        self.profiler = ProfilerOverlay(self) if saper_instrument.installed() else None
         self.show()
 
     def new_game(self, layout):
         """ Sczytuje parametry nowej planszy i uzupełnia layout o odpowiednie
         widgety. """
-        params = GameModeSelector()
+        board = self.create_board(GameModeSelector())
+        if board is not None:
+            self.set_board(layout, board)
+
+    def create_board(self, params):
+        """ Tworzy obiekt 'BoardManager' dla parametrów z 'GameModeSelector'.
+        Zwraca None, gdy wybór anulowano albo nie otrzymano planszy bez
+        zgadywania. """
         if params is None:
+            return None
+        (width, height, mines, no_guess) = params
+        generated = None
+        if no_guess:
+            generated = no_guess_board(self, width, height, mines)
+            if generated is None:
+                return None
+        return BoardManager(width, height, mines, generated=generated)
+
+    def save_game(self):
+        """ Zapisuje trwającą grę do wybranego pliku. Zakończonych gier nie
+        da się zapisać. """
+        board = self.board.board
+        if board.lost or board.check_for_win():
             return
-
+        (path, _) = QFileDialog.getSaveFileName(self, "Save game", "",
+                                                "Saved games (*.sapr)")
+        if path:
+            saper_format.save(path, board, self.board.timer.current)
+
+    def load_game(self, layout):
+        """ Wczytuje grę z wybranego pliku i zastępuje nią bieżącą planszę. """
+        (path, _) = QFileDialog.getOpenFileName(self, "Load game", "",
+                                                "Saved games (*.sapr)")
+        if not path:
+            return
+        loaded = self.read_file(saper_format.load, path)
+        if loaded is None:
+            return
+        (board, time) = loaded
+        self.set_board(layout, BoardManager(board.width, board.height, board.mines,
+                                            board=board, time=time))
+
+    def read_file(self, loader, path):
+        """ Wczytuje plik funkcją 'loader'. Gdy plik jest uszkodzony lub
+        nie da się go odczytać, pokazuje komunikat i zwraca None. """
+        try:
+            return loader(path)
+        except (ValueError, OSError, BufferError, ImportError) as error:
+            QMessageBox.warning(self, "Cannot open file", f"{path}: {error}")
+            return None
+
+    def replay_game(self, layout):
+        """ Odtwarza grę z wybranego dziennika ruchów z prędkością podaną
+        przez gracza. """
+        (path, _) = QFileDialog.getOpenFileName(self, "Replay game", "./replays",
+                                                "Move logs (*.sapl)")
+        if not path:
+            return
+        (speed, ok) = QInputDialog.getDouble(self, "Replay", "Speed:", 1.0, 0.1, 100.0, 1)
+        if not ok:
+            return
+        log = self.read_file(saper_replay.load, path)
+        if log is None:
+            return
+        board = self.read_file(lambda _: log.board(), path)
+        if board is None:
+            return
+        self.set_board(layout, BoardManager(log.width, log.height, log.mines,
+                                            board=board, record=False))
+        self.player = ReplayPlayer(self.board, log, speed)
+        self.player.start()
+
+    def endless_game(self):
+        """ Otwiera okno gry na nieskończonej planszy o gęstości min podanej
+        przez gracza. """
+        (density, ok) = QInputDialog.getDouble(self, "Endless", "Mine density:", 0.2,
+                                               MIN_DENSITY, MAX_DENSITY, 2)
+        if ok:
+            self.endless = EndlessWindow(EndlessBoard(density))
+            self.endless.show()
+
+    def set_board(self, layout, manager):
+        """ Zastępuje bieżącą planszę planszą obsługiwaną przez 'manager'. """
+        if self.player is not None:
+            self.player.stop()
+            self.player = None
+        self.board.timer.end()
+        self.board.set_heatmap(False)
         clear_board(self.board_layout)
         clear_stats_row(self.stats_row)
 
-        (width, height, mines) = params
-        self.board = BoardManager(width, height, mines)
+        self.board = manager
         self.board_layout = self.board.to_layout()
-        self.bbbv_label = QLabel()
-        self.bbbv_label.setText(f"3BV of the board: {self.board.board.bbbv}")
+        self.bbbv_label = self.board.bbbv_label
 
         self.stats_row.addWidget(self.board.timer)
         self.stats_row.addWidget(self.board.mines_counter)
         self.stats_row.addWidget(self.bbbv_label)
         layout.addLayout(self.stats_row)
         layout.addLayout(self.board_layout)
-        self.setFixedSize(width*40, height*40 + 50)
+        self.setFixedSize(manager.width*40, manager.height*40 + 50)
+        self.board.set_heatmap(self.menu.heatmap_button.isChecked())
 
     def highscores(self):
-        """ Wywołuje okno dialogowe z najlepszymi wynikami """
-        window = HighscoreDialog()
+        """ Wywołuje okno dialogowe z najlepszymi wynikami, zaczynając od
+        konfiguracji bieżącej planszy. """
+        window = HighscoreDialog((self.board.width, self.board.height,
+                                  self.board.board.mines))
         window.exec()
+
+
+class EndlessWindow(QWidget):
+    """ Okno gry na nieskończonej planszy 'saper_endless.EndlessBoard':
+    przewijana kontrolka 'EndlessCanvas' i wiersz z wynikiem, liczbą
+    zbadanych fragmentów i zajmowaną pamięcią. """
+    def __init__(self, board, parent=None):
+        super(EndlessWindow, self).__init__(parent)
+        self.setWindowTitle("Endless")
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+        self.board = board
+        self.status = QLabel()
+        self.canvas = EndlessCanvas(board, self.update_status)
+        layout.addWidget(self.status)
+        layout.addWidget(self.canvas)
+        self.update_status()
+
+    def update_status(self):
+        """ Uaktualnia wiersz z wynikiem gry. """
+        board = self.board
+        text = (f"Uncovered: {board.uncovered}  Flags: {board.flags}  "
+                f"Chunks explored: {len(board.explored())}  "
+                f"Memory: {board.memory() // 1024} kB")
+        self.status.setText(text + ("  Game over" if board.lost else ""))
@@ -1,41 +1,307 @@
-
 import datetime as dt
-from os import mkdir
+import getpass
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from collections import namedtuple
+
+Record = namedtuple("Record", ["player", "date", "time", "bbbv", "coef"])
+Record.__doc__ = """ Pojedynczy wynik: gracz, data, czas w sekundach, 3BV
+planszy i współczynnik 3BV/s. """
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    mines INTEGER NOT NULL,
+    player TEXT NOT NULL,
+    date TEXT NOT NULL,
+    time INTEGER NOT NULL,
+    bbbv INTEGER NOT NULL,
+    coef REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scores_by_coef ON scores (width, height, mines, coef DESC);
+CREATE INDEX IF NOT EXISTS scores_by_time ON scores (width, height, mines, time);
+CREATE INDEX IF NOT EXISTS scores_by_player ON scores (player, width, height, mines, coef DESC);
+"""
+ORDERS = {"coef": "coef DESC, time", "time": "time, coef DESC"}
+RETRIES = 3
+
 
 class HighscoreHandler:
-    """ Klasa zajmująca się obsługą najlepszych wyników. """
-    def __init__(self):
-        """ Przy tworzenu obiektu sczytywane są poprzednie rekordy z pliku,
-        w przeciwnym przypadku tworzona jest lista pusta. """
+    """ Klasa zajmująca się obsługą najlepszych wyników.
+
+    Wyniki przechowywane są w bazie 'sqlite3', osobno dla każdej
+    konfiguracji planszy (szerokość, wysokość, liczba min) i każdego gracza,
+    z indeksami według 3BV/s i czasu, dzięki którym zapytania o najlepsze
+    wyniki i percentyle nie wczytują całej historii. Wyniki z dawnego pliku
+    CSV przenoszone są do bazy przy jej tworzeniu jako wyniki planszy 0x0 z
+    0 minami, bo plik nie zapisywał parametrów planszy.
+
+    Zapis odbywa się w wątku w tle z własnym połączeniem: 'handle' i
+    'add_many' tylko wstawiają wyniki do kolejki i od razu wracają, więc
+    nie blokują okna wygranej. Wątek zbiera wyniki napływające w ciągu
+    'delay' sekund i zapisuje je w jednej transakcji. Baza działa w trybie
+    WAL (dopisywany dziennik, scalany z bazą przy punktach kontrolnych), a
+    każda transakcja wątku kończy się fsync, więc przerwanie programu w
+    dowolnej chwili zostawia w bazie wszystkie wyniki zapisanych
+    transakcji. Nieudany zapis jest ponawiany przy następnych paczkach,
+    najwyżej RETRIES razy, a potem wyniki są porzucane. Gdy bazy nie da się
+    otworzyć, wyniki są porzucane od razu, a zapytania zwracają puste
+    wyniki. Błędy trafiają do 'error' i na standardowe wyjście błędów.
+    Zapytania najpierw czekają na zapis wyników z kolejki ('flush'), więc
+    widzą wszystkie przekazane wyniki.
+
+    Przy otwarciu wątek sprawdza bazę ('PRAGMA quick_check'). Uszkodzony
+    plik przenoszony jest pod nazwę z przyrostkiem '.corrupt', a do nowej
+    bazy przepisywane są wyniki, które dało się z niego odczytać. """
+    def __init__(self, path="./highscores/highscores.db",
+                 csv_path="./highscores/highscores.csv", player=None, delay=0.05):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.csv_path = csv_path
+        self.player = player if player is not None else getpass.getuser()
+        self.delay = delay
+        self.connection = None
+        self.error = None
+        self.available = False
+        self.queue = queue.Queue()
+        self.ready = threading.Event()
+        self.writer = threading.Thread(target=self.run, daemon=True)
+        self.writer.start()
+
+    def connect(self):
+        """ Funkcja otwierająca połączenie z bazą w trybie WAL. """
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        return connection
+
+    def open(self):
+        """ Funkcja wykonywana w wątku zapisu: otwiera bazę, odtwarza ją po
+        uszkodzeniu, a nową bazę zakłada i uzupełnia wynikami z pliku CSV.
+        Błąd otwarcia (np. brak dostępu lub zablokowana baza) nie jest
+        uszkodzeniem i jest zgłaszany dalej, bez przenoszenia pliku. """
+        connection = sqlite3.connect(self.path)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            check = connection.execute("PRAGMA quick_check").fetchone()[0]
+            if check != "ok":
+                raise sqlite3.DatabaseError(check)
+        except sqlite3.OperationalError:
+            connection.close()
+            raise
+        except sqlite3.DatabaseError:
+            connection.close()
+            connection = self.recover()
+        connection.execute("PRAGMA synchronous=FULL")
+        if connection.execute("PRAGMA user_version").fetchone()[0] == 0:
+            with connection:
+                connection.executescript(SCHEMA)
+                self.migrate(connection, self.csv_path)
+                connection.execute("PRAGMA user_version = 1")
+        return connection
+
+    def recover(self):
+        """ Funkcja przenosząca uszkodzoną bazę (razem z plikami dziennika)
+        pod nazwę z przyrostkiem '.corrupt' i zakładająca nową bazę z
+        wynikami, które dało się odczytać ze starej. """
+        broken = self.path + ".corrupt"
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.replace(self.path + suffix, broken + suffix)
+        rows = []
         try:
-            file = open("./highscores/highscores.csv", "r")
-            lines = map(lambda line: line.split(";"), file.readlines())
-            self.records = [(line[0], int(line[1]), float(line[2])) for line in lines]
-        except(FileNotFoundError):
-            self.records = []
-
-    def handle(self, time, bbbv):
-        """ Funkcja odpowiadająca za obsługę konkretnego wyniku.
-        Liczy współczynnik 3BV/s i wstawia go w odpowiednie miejse na liście
-        wyników. """
-        coef = bbbv/time
-        for i in range(len(self.records)):
-            if coef > self.records[i][2]:
-                date = str(dt.datetime.now().date())
-                self.records.insert(i, (date, time, coef))
-                self.save()
-                return
-        if len(self.records) < 10:
-            date = str(dt.datetime.now().date())
-            self.records.append((date, time, coef))
-            self.save()
-
-    def save(self):
-        """ Funkcja zapisująca aktualną listę wyników do pliku. """
+            old = sqlite3.connect(broken)
+            try:
+                for row in old.execute("SELECT width, height, mines, player, date, "
+                                       "MAX(time, 1), bbbv FROM scores"):
+                    rows.append(row)
+            finally:
+                old.close()
+        except sqlite3.DatabaseError:
+            pass
+        connection = self.connect()
+        with connection:
+            connection.executescript(SCHEMA)
+            self.insert(connection, rows)
+            connection.execute("PRAGMA user_version = 1")
+        return connection
+
+    def migrate(self, connection, csv_path):
+        """ Funkcja przenosząca do bazy wyniki z pliku CSV w formacie
+        'data;czas;3BV/s'. Niepełne lub błędne wiersze (np. ostatni wiersz
+        przerwanego zapisu) oraz wyniki z czasem 0 są pomijane. """
         try:
-            file = open("./highscores/highscores.csv", "w")
-        except(FileNotFoundError):
-            mkdir("./highscores")
-            file = open("./highscores/highscores.csv", "w")
-        for r in self.records[:10]:
-            file.write(f"{r[0]};{r[1]};{r[2]}\n")
+            with open(csv_path, "r") as file:
+                lines = [line.strip().split(";") for line in file if line.strip()]
+        except FileNotFoundError:
+            return
+        results = []
+        for line in lines:
+            try:
+                (date, time, coef) = line
+                (time, coef) = (int(time), float(coef))
+            except ValueError:
+                continue
+            if time > 0:
+                results.append((0, 0, 0, self.player, date, time, round(coef * time)))
+        self.insert(connection, results)
+
+    def insert(self, connection, results):
+        """ Funkcja wstawiająca wyniki do bazy przez połączenie 'connection'. """
+        connection.executemany(
+            "INSERT INTO scores (width, height, mines, player, date, time, bbbv, coef) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            ((width, height, mines, player, date, time, bbbv, bbbv / time)
+             for (width, height, mines, player, date, time, bbbv) in results))
+
+    def run(self):
+        """ Pętla wątku zapisu: pobiera paczki wyników z kolejki i zapisuje
+        każdą w jednej transakcji. Wartość None w kolejce kończy wątek. """
+        connection = None
+        try:
+            connection = self.open()
+        except (sqlite3.Error, OSError) as error:
+            self.report(error)
+        finally:
+            self.available = connection is not None
+            self.ready.set()
+        pending = []
+        failures = 0
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.delay
+            while batch[-1] is not None:
+                try:
+                    batch.append(self.queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            running = batch[-1] is not None
+            pending.extend(results for item in batch if item is not None for results in item)
+            try:
+                if connection is not None:
+                    with connection:
+                        self.insert(connection, pending)
+                    failures = 0
+                elif pending:
+                    self.report(f"database unavailable, {len(pending)} results dropped")
+                pending = []
+            except sqlite3.Error as error:
+                failures += 1
+                if failures >= RETRIES:
+                    self.report(f"{error}, {len(pending)} results dropped")
+                    (pending, failures) = ([], 0)
+                else:
+                    self.report(error)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+        if connection is not None:
+            connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            connection.close()
+
+    def report(self, error):
+        """ Funkcja zapamiętująca błąd zapisu w 'error' i wypisująca go na
+        standardowe wyjście błędów. """
+        self.error = error
+        print(f"highscores: {error}", file=sys.stderr)
+
+    def add_many(self, results):
+        """ Funkcja zlecająca zapis wielu wyników podanych jako krotki
+        (szerokość, wysokość, liczba min, gracz, data, czas, 3BV). Czas
+        krótszy niż sekunda zapisywany jest jako 1 sekunda. """
+        self.queue.put([(width, height, mines, player, date, max(int(time), 1), bbbv)
+                        for (width, height, mines, player, date, time, bbbv) in results])
+
+    def handle(self, time, bbbv, width=0, height=0, mines=0):
+        """ Funkcja odpowiadająca za obsługę konkretnego wyniku bieżącego
+        gracza. Zleca jego zapis i zwraca jego współczynnik 3BV/s. Czas
+        krótszy niż sekunda liczony jest jako 1 sekunda. """
+        time = max(int(time), 1)
+        date = str(dt.datetime.now().date())
+        self.add_many([(width, height, mines, self.player, date, time, bbbv)])
+        return bbbv / time
+
+    def flush(self):
+        """ Funkcja czekająca, aż wszystkie zlecone wyniki zostaną zapisane. """
+        self.queue.join()
+
+    def reader(self):
+        """ Funkcja zwracająca połączenie do zapytań (otwierane przy pierwszym
+        użyciu, po przygotowaniu bazy przez wątek zapisu), po zapisaniu
+        wszystkich zleconych wyników. Zwraca None, gdy wątek zapisu nie
+        zdołał otworzyć bazy. """
+        self.flush()
+        if self.connection is None:
+            self.ready.wait()
+            if not self.available:
+                return None
+            self.connection = self.connect()
+        return self.connection
+
+    def top(self, width, height, mines, n=10, offset=0, player=None, order="coef"):
+        """ Funkcja zwracająca listę 'n' najlepszych wyników danej
+        konfiguracji (od wyniku numer 'offset'), według 3BV/s ('coef') lub
+        czasu ('time'), opcjonalnie tylko jednego gracza. """
+        query = "SELECT player, date, time, bbbv, coef FROM scores " \
+                "WHERE width = ? AND height = ? AND mines = ?"
+        params = [width, height, mines]
+        if player is not None:
+            query += " AND player = ?"
+            params.append(player)
+        query += f" ORDER BY {ORDERS[order]} LIMIT ? OFFSET ?"
+        connection = self.reader()
+        if connection is None:
+            return []
+        return [Record(*row) for row in connection.execute(query, params + [n, offset])]
+
+    def count(self, width, height, mines, player=None):
+        """ Funkcja zwracająca liczbę wyników danej konfiguracji. """
+        query = "SELECT COUNT(*) FROM scores WHERE width = ? AND height = ? AND mines = ?"
+        params = [width, height, mines]
+        if player is not None:
+            query += " AND player = ?"
+            params.append(player)
+        connection = self.reader()
+        return 0 if connection is None else connection.execute(query, params).fetchone()[0]
+
+    def percentile(self, coef, width, height, mines, player=None):
+        """ Funkcja zwracająca procent wyników danej konfiguracji ze
+        współczynnikiem 3BV/s mniejszym niż 'coef' lub None, gdy wyników
+        nie ma. """
+        total = self.count(width, height, mines, player)
+        if total == 0:
+            return None
+        query = "SELECT COUNT(*) FROM scores " \
+                "WHERE width = ? AND height = ? AND mines = ? AND coef < ?"
+        params = [width, height, mines, coef]
+        if player is not None:
+            query += " AND player = ?"
+            params.append(player)
+        return 100 * self.reader().execute(query, params).fetchone()[0] / total
+
+    def configurations(self):
+        """ Funkcja zwracająca listę konfiguracji plansz (szerokość,
+        wysokość, liczba min), dla których zapisano wyniki. """
+        connection = self.reader()
+        if connection is None:
+            return []
+        return connection.execute(
+            "SELECT DISTINCT width, height, mines FROM scores "
+            "ORDER BY width * height, mines").fetchall()
+
+    def close(self):
+        """ Funkcja zapisująca zlecone wyniki, kończąca wątek zapisu i
+        zamykająca połączenia z bazą. """
+        self.queue.put(None)
+        self.writer.join()
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
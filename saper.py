@@ -1,8 +1,21 @@
-
+import os
+import sys
 from PyQt5.QtWidgets import QApplication
 from game_window import GameWindow
+from saper_gui import close_highscore_handler, no_guess_pool
+from tile_cache import tile_cache
+import saper_instrument
 
 
-app = QApplication([])
-window = GameWindow()
-app.exec()
+if __name__ == "__main__":
+    app = QApplication([])
+    profile = os.environ.get("SAPER_PROFILE")
+    if profile:
+        saper_instrument.install()
+    tile_cache.preload()
+    window = GameWindow(sys.argv[1] if len(sys.argv) > 1 else None)
+    app.exec()
+    no_guess_pool.shutdown()
+    close_highscore_handler()
+    if profile and profile != "1":
+        saper_instrument.export(profile)
@@ -0,0 +1,464 @@
+import random
+from array import array
+from saper_format import pack_cells, unpack_cells, MINE_TABLES
+from saper_logic import UNCOVER, QUICK_UNCOVER, FLAG, UNFLAG, VISIBLE_COVERED, VISIBLE_FLAG, diff, visible_value
+from saper_metrics import board_metrics
+
+STATE_CHARS = ('c', 'u', 'f')
+OPEN_CELLS = bytes.maketrans(b"\x02", b"\x00")
+FLAG_CELLS = bytes.maketrans(b"\x01\x02", b"\x00\x01")
+
+
+class FieldsView:
+    """ Widok tylko do odczytu udający listę list krotek (liczba, stan),
+    dzięki któremu kod korzystający z 'Board.fields' działa bez zmian. """
+    def __init__(self, board):
+        self.board = board
+
+    def __len__(self):
+        return self.board.height
+
+    def __getitem__(self, y):
+        return RowView(self.board, y)
+
+    def __iter__(self):
+        for y in range(self.board.height):
+            yield RowView(self.board, y)
+
+
+class RowView:
+    """ Pojedynczy wiersz widoku 'FieldsView'. """
+    def __init__(self, board, y):
+        self.board = board
+        self.y = y
+
+    def __len__(self):
+        return self.board.width
+
+    def __getitem__(self, x):
+        return self.board.cell(x, self.y)
+
+    def __iter__(self):
+        for x in range(self.board.width):
+            yield self[x]
+
+
+class BitBoard:
+    """ Klasa zajmująca się obsługą logiki gry, przechowująca planszę w
+    liczbach całkowitych Pythona używanych jako zbiory bitów: miny w
+    'mine_bits', odsłonięte pola w 'open_bits', flagi w 'flag_bits', a
+    liczby sąsiednich min w czterech płaszczyznach bitowych 'count_bits'
+    (bit k liczby pola leży w płaszczyźnie k).
+
+    Pole (x, y) to bit y * stride + x, gdzie 'stride' = width + 1: dodatkowa,
+    zawsze pusta kolumna sprawia, że przesunięcia o 1, stride - 1, stride i
+    stride + 1 bitów wyznaczają sąsiadów bez zawijania między wierszami po
+    nałożeniu maski 'valid'. Liczenie sąsiednich min, odsłanianie wysp i
+    szybkie odsłanianie wykonują przesunięcia i maski na całej planszy
+    naraz, a cały stan planszy to kilka liczb, więc kopiowanie ('copy') i
+    haszowanie ('key') stanu jest tanie. Plansza zajmuje około 7 bitów na
+    pole zamiast krotki na pole w 'saper_logic.Board'.
+
+    Udostępnia ten sam interfejs co 'saper_logic.Board', łącznie z
+    licznikami 'uncovered', 'safe_left', 'flags', 'mines_revealed' i
+    'moves', strumieniem zmian 'changes', dziennikiem ruchów 'log' oraz
+    parametrami 'seed', 'safe' i 'lazy'. Miny rozmieszczane są tak samo jak
+    w 'saper_logic.Board', więc ta sama para (ziarno, pole 'safe') daje na
+    obu planszach tę samą grę. """
+    def __init__(self, width, height, mines, seed=None, safe=None, lazy=False):
+        self.width = width
+        self.height = height
+        self.seed = seed if seed is not None else random.getrandbits(64)
+        self.safe = safe
+        self.log = None
+        self.changes = []
+        self.base = 0
+        self.popped = 0
+        self.stride = width + 1
+        repunit = ((1 << self.stride * height) - 1) // ((1 << self.stride) - 1)
+        self.valid = ((1 << width) - 1) * repunit
+        self.mine_bits = self.open_bits = self.flag_bits = self.zero_bits = 0
+        self.count_bits = [0, 0, 0, 0]
+        self.numbers_cache = None
+        self.islands = 0
+        self.flags = 0
+        self.moves = 0
+        self.lost = False
+        if lazy:
+            self.mines = mines
+            self.placed = False
+            self.uncovered = 0
+            self.safe_left = width * height - mines
+            self.mines_revealed = 0
+            self.bbbv = self.openings = self.metrics = None
+        else:
+            self.place(mines, safe)
+
+    def place(self, mines, safe=None):
+        """ Funkcja rozmieszczająca miny (z pominięciem pola 'safe' i jego
+        sąsiadów, a gdy brakuje na to miejsca, tylko pola 'safe'),
+        wypełniająca planszę cyframi i licząca 3BV. Flagi postawione przed
+        rozmieszczeniem min zostają na swoich miejscach. """
+        flagged = self.flag_bits
+        exclude = ()
+        if safe is not None:
+            (x, y) = safe
+            exclude = [j * self.width + i
+                       for j in range(max(0, y - 1), min(self.height, y + 2))
+                       for i in range(max(0, x - 1), min(self.width, x + 2))]
+            if len(exclude) > self.width * self.height - mines:
+                exclude = [y * self.width + x]
+        self.place_mines(mines, exclude)
+        self.fill_with_numbers()
+        self.calc_bbbv()
+        self.flag_bits = flagged
+        self.flags = flagged.bit_count()
+        self.placed = True
+
+    @property
+    def fields(self):
+        """ Widok planszy zgodny z 'saper_logic.Board.fields'. """
+        return FieldsView(self)
+
+    @property
+    def numbers(self):
+        """ Płaska tablica array('b') liczb sąsiednich min (-1 oznacza minę),
+        zgodna z 'saper_logic.Board.numbers', wyznaczana z płaszczyzn
+        bitowych przy każdym odczycie. """
+        total = self.expand(self.mine_bits) * 255
+        for (k, plane) in enumerate(self.count_bits):
+            total += self.expand(plane & ~self.mine_bits) << k
+        cells = total.to_bytes(self.stride * self.height, "little")
+        return array('b', self.unpad(cells))
+
+    def expand(self, bits):
+        """ Funkcja zamieniająca zbiór bitów na liczbę, w której każdemu
+        polu odpowiada jeden bajt (0 lub 1). """
+        size = self.stride * self.height
+        cells = unpack_cells(bits.to_bytes((size + 7) // 8, "little"), size, MINE_TABLES)
+        return int.from_bytes(cells, "little")
+
+    def pad(self, cells):
+        """ Funkcja zamieniająca bajty pól w układzie y * width + x na
+        bajty w układzie y * stride + x. """
+        padded = bytearray(self.stride * self.height)
+        for y in range(self.height):
+            padded[y * self.stride:y * self.stride + self.width] = \
+                cells[y * self.width:(y + 1) * self.width]
+        return padded
+
+    def unpad(self, cells):
+        """ Funkcja odwrotna do 'pad'. """
+        cells = bytearray(cells)
+        del cells[self.width::self.stride]
+        return bytes(cells)
+
+    def to_bits(self, cells):
+        """ Funkcja zamieniająca bajty 0/1 pól (układ y * width + x) na
+        zbiór bitów. """
+        return int.from_bytes(pack_cells(bytes(self.pad(cells)), 1), "little")
+
+    def positions(self, bits):
+        """ Funkcja zwracająca listę współrzędnych (x, y) pól zbioru bitów. """
+        cells = bits.to_bytes((self.stride * self.height + 7) // 8, "little")
+        cells = unpack_cells(cells, self.stride * self.height, MINE_TABLES)
+        result = []
+        i = cells.find(1)
+        while i != -1:
+            (y, x) = divmod(i, self.stride)
+            result.append((x, y))
+            i = cells.find(1, i + 1)
+        return result
+
+    def neighbours(self, bits):
+        """ Funkcja zwracająca osiem zbiorów bitów: 'bits' przesunięte w
+        stronę każdego z sąsiadów. """
+        valid = self.valid
+        s = self.stride
+        return [(bits << k) & valid for k in (1, s - 1, s, s + 1)] + \
+               [(bits >> k) & valid for k in (1, s - 1, s, s + 1)]
+
+    def dilate(self, bits):
+        """ Funkcja zwracająca 'bits' razem z sąsiadami wszystkich pól. """
+        for shifted in self.neighbours(bits):
+            bits |= shifted
+        return bits
+
+    def place_mines(self, x, exclude=()):
+        """ Funkcja losująca pozycję min na planszy i wstawiająca je w
+        odpowiednie miejsca, tak samo jak 'saper_logic.Board.place_mines'. """
+        self.mines = x
+        cells = range(self.width * self.height)
+        if exclude and len(cells) - len(set(exclude)) >= x:
+            exclude = set(exclude)
+            cells = [i for i in cells if i not in exclude]
+        mines = bytearray(self.width * self.height)
+        for m in random.Random(self.seed).sample(cells, x):
+            mines[m] = 1
+        self.mine_bits = self.to_bits(mines)
+
+    def fill_with_numbers(self):
+        """ Funkcja licząca liczby sąsiednich min sumatorami bitowymi: każde
+        z ośmiu przesunięć zbioru min dodawane jest do płaszczyzn
+        'count_bits' jak jednobitowa liczba, z przeniesieniem do wyższych
+        płaszczyzn. """
+        planes = [0, 0, 0, 0]
+        for carry in self.neighbours(self.mine_bits):
+            for k in range(4):
+                (planes[k], carry) = (planes[k] ^ carry, planes[k] & carry)
+                if not carry:
+                    break
+        self.count_bits = planes
+        self.zero_bits = self.valid & ~self.mine_bits & ~(planes[0] | planes[1] | planes[2] | planes[3])
+        self.open_bits = self.flag_bits = 0
+        self.uncovered = 0
+        self.safe_left = self.width * self.height - self.mine_bits.bit_count()
+        self.flags = 0
+        self.mines_revealed = 0
+
+    def bit(self, x, y):
+        """ Funkcja zwracająca zbiór bitów z jednym polem (x, y). """
+        return 1 << (y * self.stride + x)
+
+    def cell(self, x, y):
+        """ Funkcja zwracająca krotkę (liczba, stan) pola jak
+        'saper_logic.Board.fields[y][x]'. """
+        i = y * self.stride + x
+        state = 'u' if self.open_bits >> i & 1 else 'f' if self.flag_bits >> i & 1 else 'c'
+        if self.mine_bits >> i & 1:
+            return (-1, state)
+        return (sum((plane >> i & 1) << k for (k, plane) in enumerate(self.count_bits)), state)
+
+    def get_number_of_mines(self, x, y):
+        """ Funkcja obliczająca liczbę min sąsiednich do pola o zadanych jako
+        parametry indeksach. """
+        if self.mine_bits & self.bit(x, y):
+            return -1
+        return (self.dilate(self.bit(x, y)) & self.mine_bits).bit_count()
+
+    def get_number_of_flags(self, x, y):
+        """ Funkcja obliczająca liczbę pól oznaczonych flagą sąsiednich
+        do pola o indeksach zadanych jako parametry. """
+        return (self.dilate(self.bit(x, y)) & self.flag_bits).bit_count()
+
+    def uncover(self, x, y):
+        """ Funkcja odsłaniająca wybrane pole lub, w przypadku 0, całą wyspę.
+        W przypadku odkrycia miny ustawia zmienną 'lost' na prawdę.
+        Zwraca prawdę, gdy pole udało się odkryć i fałsz w przeciwnym
+        przypadku. """
+        if not self.reveal(x, y):
+            return False
+        self.moves += 1
+        if self.log is not None:
+            self.log.record(UNCOVER, x, y)
+        return True
+
+    def reveal(self, x, y):
+        """ Funkcja wykonująca odsłonięcie pola dla 'uncover' i
+        'quick_uncover', bez liczenia ruchu i zapisu w dzienniku. """
+        bit = self.bit(x, y)
+        if (self.open_bits | self.flag_bits) & bit:
+            return False
+        if not self.placed:
+            self.place(self.mines, (x, y))
+
+        if self.zero_bits & bit:
+            self.islands += 1
+            self.uncover_island(x, y)
+            return True
+        self.open_bits |= bit
+        self.changes.append((x, y))
+        if self.mine_bits & bit:
+            self.mines_revealed += 1
+            self.lost = True
+        else:
+            self.uncovered += 1
+            self.safe_left -= 1
+        return True
+
+    def uncover_mines(self):
+        """ Funkcja odsłaniająca wszystkie miny na planszy. """
+        hidden = self.mine_bits & ~self.open_bits
+        self.mines_revealed += hidden.bit_count()
+        self.open_bits |= hidden
+        self.flag_bits &= ~hidden
+        self.changes.extend(self.positions(hidden))
+
+    def uncover_island(self, x, y):
+        """ Funkcja odsłaniająca wyspę: pole o zadanych indeksach, połączone
+        z nim zera oraz ich brzegi. Pola oznaczone flagą nie są odsłaniane i
+        przerywają wyspę. Wyspa rośnie przez kolejne rozszerzenia o sąsiadów
+        ograniczone do zakrytych zer. Zwraca zbiór bitów odsłoniętych pól. """
+        covered = self.valid & ~self.open_bits & ~self.flag_bits
+        zeros = self.zero_bits & covered
+        island = self.bit(x, y)
+        while True:
+            grown = self.dilate(island) & zeros | island
+            if grown == island:
+                break
+            island = grown
+        opened = self.dilate(island) & covered
+        self.open_bits |= opened
+        self.changes.extend(self.positions(opened))
+        count = opened.bit_count()
+        self.uncovered += count
+        self.safe_left -= count
+        return opened
+
+    def quick_uncover(self, x, y):
+        """ Funkcja odkrywająca zakrytych sąsiadów pola o wskazanych indeksach,
+        jeśli liczba flag na sąsiednich polach jest równa jego liczbie
+        sąsiednich min. Zwraca prawdę, gdy odkrycie było możliwe i fałsz
+        w przeciwnym wypadku. """
+        if not self.open_bits & self.bit(x, y):
+            return False
+        if self.cell(x, y)[0] != self.get_number_of_flags(x, y):
+            return False
+
+        hidden = self.dilate(self.bit(x, y)) & ~self.open_bits & ~self.flag_bits
+        for (i, j) in self.positions(hidden):
+            self.reveal(i, j)
+        self.moves += 1
+        if self.log is not None:
+            self.log.record(QUICK_UNCOVER, x, y)
+        return True
+
+    def calc_bbbv(self):
+        """ Funkcja wyliczająca współczynnik 3BV planszy przez
+        'saper_metrics.board_metrics'. """
+        self.metrics = board_metrics(self.width, self.height, self.numbers)
+        self.openings = self.metrics.openings
+        self.bbbv = self.metrics.bbbv
+
+    def flag(self, x, y):
+        """ Funkcja ustawiająca flagę na polu o zadanych indeksach.
+        Zwraca prawdę, gdy operacja powiodła się oraz fałsz, gdy nie ma już
+        więcej flag do wykorzystania. """
+        bit = self.bit(x, y)
+        if self.open_bits & bit:
+            return False
+
+        if self.flag_bits & bit:
+            self.unflag(x, y)
+            return True
+
+        if self.flags >= self.mines:
+            return False
+
+        self.flags += 1
+        self.moves += 1
+        self.flag_bits |= bit
+        self.changes.append((x, y))
+        if self.log is not None:
+            self.log.record(FLAG, x, y)
+        return True
+
+    def unflag(self, x, y):
+        """ Funkcja usuwająca flagę z pola o podanych indeksach. """
+        self.flags -= 1
+        self.moves += 1
+        self.flag_bits &= ~self.bit(x, y)
+        self.changes.append((x, y))
+        if self.log is not None:
+            self.log.record(UNFLAG, x, y)
+
+    def numbers_buffer(self):
+        """ Funkcja zwracająca tablicę 'numbers' dla
+        'saper_logic.BoardBuffers'. Płaszczyzny bitowe nie mają postaci bajtu
+        na pole, więc tablica budowana jest raz po rozmieszczeniu min i
+        zapamiętywana razem z 'mine_bits', na podstawie których powstała. """
+        if self.numbers_cache is None or self.numbers_cache[0] is not self.mine_bits:
+            self.numbers_cache = (self.mine_bits, self.numbers)
+        return self.numbers_cache[1]
+
+    def mine_cells(self):
+        """ Funkcja zwracająca rozmieszczenie min jako bajty, po jednym na
+        pole, w formacie 'saper_logic.Board.mine_cells'. """
+        return self.unpad(self.expand(self.mine_bits).to_bytes(self.stride * self.height, "little"))
+
+    def state_cells(self):
+        """ Funkcja zwracająca stany pól jako bajty, po jednym na pole, w
+        formacie 'saper_logic.Board.state_cells'. """
+        total = self.expand(self.open_bits) + (self.expand(self.flag_bits) << 1)
+        return self.unpad(total.to_bytes(self.stride * self.height, "little"))
+
+    def restore(self, mines, states):
+        """ Funkcja odtwarzająca planszę z bajtów w formacie 'mine_cells' i
+        'state_cells', odpowiednik 'saper_logic.Board.restore'. """
+        self.base = self.version + 1
+        self.changes = []
+        if mines is not None:
+            self.mine_bits = self.to_bits(mines)
+            self.mines = self.mine_bits.bit_count()
+            self.fill_with_numbers()
+            self.calc_bbbv()
+            self.placed = True
+        self.open_bits = self.to_bits(states.translate(OPEN_CELLS))
+        self.flag_bits = self.to_bits(states.translate(FLAG_CELLS))
+        self.flags = self.flag_bits.bit_count()
+        if mines is not None:
+            self.mines_revealed = (self.open_bits & self.mine_bits).bit_count()
+            self.uncovered = self.open_bits.bit_count() - self.mines_revealed
+            self.safe_left = self.width * self.height - self.mines - self.uncovered
+
+    def copy(self):
+        """ Funkcja zwracająca niezależną kopię planszy. Zbiory bitów są
+        niezmienne, więc kopia dzieli je z oryginałem. Dziennik ruchów nie
+        jest kopiowany. """
+        board = object.__new__(BitBoard)
+        board.__dict__.update(self.__dict__)
+        board.count_bits = list(self.count_bits)
+        board.changes = list(self.changes)
+        board.log = None
+        return board
+
+    def key(self):
+        """ Funkcja zwracająca haszowalny klucz stanu planszy: zbiory bitów
+        min, odsłoniętych pól i flag. """
+        return (self.mine_bits, self.open_bits, self.flag_bits)
+
+    def visible_values(self, cells):
+        """ Funkcja zwracająca wartości widoczne pól o płaskich indeksach
+        'cells'. Przy wielu polach liczby i stany rozpakowywane są raz dla
+        całej planszy zamiast odczytu bitów każdego pola. """
+        width = self.width
+        if len(cells) <= 32:
+            return [visible_value(self.cell(i % width, i // width)) for i in cells]
+        numbers = self.numbers
+        states = self.state_cells()
+        values = (VISIBLE_COVERED, None, VISIBLE_FLAG)
+        return [numbers[i] if states[i] == 1 else values[states[i]] for i in cells]
+
+    @property
+    def version(self):
+        """ Bieżąca wersja strumienia zmian, jak w 'saper_logic.Board'. """
+        return self.base + len(self.changes)
+
+    def changes_since(self, version):
+        """ Funkcja zwracająca zmiany od wersji 'version', jak
+        'saper_logic.Board.changes_since'. Wartości pól liczone są przez 'visible_values'. """
+        return diff(self, version, self.visible_values)
+
+    def trim(self, version):
+        """ Funkcja usuwająca ze strumienia zmian wpisy starsze niż wersja
+        'version'. """
+        drop = min(version, self.version) - self.base
+        if drop > 0:
+            del self.changes[:drop]
+            self.base += drop
+
+    def pop_changes(self):
+        """ Funkcja zwracająca listę współrzędnych (x, y) pól zmienionych od
+        poprzedniego wywołania (całą planszę, jeśli te zmiany zostały już
+        usunięte przez 'trim' lub 'restore'). """
+        start = self.popped - self.base
+        if start < 0:
+            changes = [(x, y) for y in range(self.height) for x in range(self.width)]
+        else:
+            changes = self.changes[start:]
+        self.popped = self.version
+        return changes
+
+    def check_for_win(self):
+        """ Funkcja sprawdzająca, czy plansza nie została już rozwiązana. """
+        return self.safe_left == 0
@@ -0,0 +1,315 @@
+""" Nieskończona plansza sapera podzielona na kwadratowe fragmenty.
+
+Świat nie ma brzegów: pole (x, y) może mieć dowolne całkowite
+współrzędne, także ujemne. Świat dzielony jest na fragmenty o boku
+'CHUNK' pól. Miny fragmentu (cx, cy) losowane są dopiero przy pierwszym
+odczycie, generatorem zależnym tylko od ziarna świata i współrzędnych
+fragmentu. Dzięki temu każdy fragment można w dowolnej chwili usunąć z
+pamięci i odtworzyć identycznie, a cyfry pól przy brzegu fragmentu,
+liczone z min sąsiednich fragmentów, są zawsze spójne.
+
+W pamięci trwale przechowywany jest tylko stan gracza w zbadanych
+fragmentach, czyli zbiory bitów pól odsłoniętych i oflagowanych. Pamięć
+zależy więc od zbadanego obszaru, a nie od rozmiaru świata:
+- miny i cyfry fragmentów trzymane są w pamięci podręcznej o rozmiarze
+  'cache_size' fragmentów i usuwane najdawniej używane,
+- fragment całkowicie rozwiązany (wszystkie pola bez min odsłonięte)
+  zapamiętywany jest tylko jako element zbioru 'solved', bo jego pola
+  odsłonięte wynikają z min,
+- 'compact' kompresuje stan fragmentów spoza widocznego obszaru;
+  zostaje on rozpakowany przy następnym użyciu.
+
+Pole (0, 0) i jego sąsiedzi nigdy nie są zaminowani, więc gra zaczyna
+się bezpiecznym odsłonięciem środka świata. Przegrana kończy grę, a jej
+wynikiem jest liczba odsłoniętych pól 'uncovered'.
+"""
+import random
+import sys
+import zlib
+from collections import OrderedDict
+from saper_logic import VISIBLE_COVERED, VISIBLE_FLAG
+
+CHUNK = 32
+CHUNK_CELLS = CHUNK * CHUNK
+CHUNK_BYTES = CHUNK_CELLS // 8
+FULL = (1 << CHUNK_CELLS) - 1
+ROW = (1 << CHUNK) - 1
+POPCOUNT3 = bytes(bin(i).count("1") for i in range(8))
+MIN_DENSITY = 0.15
+MAX_DENSITY = 0.35
+
+
+def chunk_of(x, y):
+    """ Funkcja zwracająca krotkę (klucz fragmentu, numer bitu pola we
+    fragmencie) dla pola (x, y). """
+    return ((x >> 5, y >> 5), (y & 31) * CHUNK + (x & 31))
+
+
+def cells_of(key, bits):
+    """ Generator współrzędnych (x, y) pól fragmentu 'key', których bity są
+    ustawione w 'bits'. """
+    (cx, cy) = key
+    while bits:
+        low = bits & -bits
+        i = low.bit_length() - 1
+        yield (cx * CHUNK + i % CHUNK, cy * CHUNK + i // CHUNK)
+        bits ^= low
+
+
+class EndlessBoard:
+    """ Nieskończona plansza o gęstości min 'density'. Interfejs naśladuje
+    'saper_logic.Board': 'uncover', 'quick_uncover', 'flag', liczniki
+    'uncovered', 'flags', 'moves' i 'lost' oraz strumień zmian 'changes'
+    ze współrzędnymi zmienionych pól, 'version', 'changes_since' i 'trim'.
+    'changes_since' zwraca pary ((x, y), wartość widoczna).
+
+    Gęstość musi leżeć w przedziale [MIN_DENSITY, MAX_DENSITY]. Przy
+    mniejszej gęstości pola zerowe tworzyłyby nieskończone wyspy, a
+    pierwsze odsłonięcie nigdy by się nie skończyło. """
+    def __init__(self, density=0.2, seed=None, cache_size=256):
+        if not MIN_DENSITY <= density <= MAX_DENSITY:
+            raise ValueError(f"density must be between {MIN_DENSITY} and {MAX_DENSITY}")
+        self.density = density
+        self.chunk_mines = round(density * CHUNK_CELLS)
+        self.seed = seed if seed is not None else random.getrandbits(64)
+        self.cache_size = cache_size
+        self.opened = {}
+        self.flagged = {}
+        self.solved = set()
+        self.packed = {}
+        self.mine_cache = OrderedDict()
+        self.number_cache = OrderedDict()
+        self.uncovered = 0
+        self.flags = 0
+        self.moves = 0
+        self.lost = False
+        self.changes = []
+        self.base = 0
+
+    @property
+    def version(self):
+        """ Wersja strumienia zmian: liczba wpisów dopisanych od utworzenia
+        planszy. """
+        return self.base + len(self.changes)
+
+    def cached(self, cache, key, build):
+        """ Funkcja zwracająca wartość z pamięci podręcznej 'cache', budując
+        ją przez 'build(key)' i usuwając najdawniej użyte wpisy. """
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+            return value
+        value = build(key)
+        cache[key] = value
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return value
+
+    def mines(self, key):
+        """ Funkcja zwracająca zbiór bitów min fragmentu 'key'. """
+        return self.cached(self.mine_cache, key, self.place_mines)
+
+    def numbers(self, key):
+        """ Funkcja zwracająca cyfry pól fragmentu 'key' jako bajty (-1, czyli
+        255, dla miny). """
+        return self.cached(self.number_cache, key, self.fill_with_numbers)
+
+    def place_mines(self, key):
+        """ Funkcja losująca miny fragmentu. Generator zależy tylko od ziarna
+        świata i współrzędnych fragmentu, a pola wokół (0, 0) są pomijane. """
+        (cx, cy) = key
+        rng = random.Random((self.seed << 64) | (cx & 0xffffffff) << 32 | (cy & 0xffffffff))
+        cells = range(CHUNK_CELLS)
+        if cx in (-1, 0) and cy in (-1, 0):
+            cells = [i for i in cells
+                     if abs(cx * CHUNK + i % CHUNK) > 1 or abs(cy * CHUNK + i // CHUNK) > 1]
+        bits = 0
+        for i in rng.sample(cells, self.chunk_mines):
+            bits |= 1 << i
+        return bits
+
+    def fill_with_numbers(self, key):
+        """ Funkcja licząca cyfry fragmentu z jego min i min ośmiu sąsiednich
+        fragmentów. Wiersze min poszerzone o kolumnę z każdej strony
+        zapisywane są jako liczby, a liczba min w bloku 3x3 to suma trzech
+        odczytów trzybitowych okien z tablicy 'POPCOUNT3'. """
+        (cx, cy) = key
+        around = {(i, j): self.mines((cx + i, cy + j)) for i in (-1, 0, 1) for j in (-1, 0, 1)}
+
+        def row(y):
+            j = -1 if y < 0 else 1 if y >= CHUNK else 0
+            shift = (y % CHUNK) * CHUNK
+            (left, middle, right) = (around[(i, j)] >> shift & ROW for i in (-1, 0, 1))
+            return left >> (CHUNK - 1) | middle << 1 | (right & 1) << (CHUNK + 1)
+
+        rows = [row(y) for y in range(-1, CHUNK + 1)]
+        mines = around[(0, 0)]
+        numbers = bytearray(CHUNK_CELLS)
+        for y in range(CHUNK):
+            (above, here, below) = rows[y:y + 3]
+            for x in range(CHUNK):
+                i = y * CHUNK + x
+                if mines >> i & 1:
+                    numbers[i] = 255
+                else:
+                    numbers[i] = (POPCOUNT3[above >> x & 7] + POPCOUNT3[here >> x & 7]
+                                  + POPCOUNT3[below >> x & 7])
+        return bytes(numbers)
+
+    def number(self, x, y):
+        """ Funkcja zwracająca liczbę min sąsiadujących z polem (-1 dla miny). """
+        (key, bit) = chunk_of(x, y)
+        value = self.numbers(key)[bit]
+        return -1 if value == 255 else value
+
+    def unpack(self, key):
+        """ Funkcja rozpakowująca stan fragmentu skompresowany przez 'compact'. """
+        data = zlib.decompress(self.packed.pop(key))
+        for (states, part) in ((self.opened, data[:CHUNK_BYTES]), (self.flagged, data[CHUNK_BYTES:])):
+            bits = int.from_bytes(part, "little")
+            if bits:
+                states[key] = bits
+
+    def opened_bits(self, key):
+        """ Funkcja zwracająca zbiór bitów pól odsłoniętych fragmentu. """
+        if key in self.packed:
+            self.unpack(key)
+        if key in self.solved:
+            return FULL & ~self.mines(key)
+        return self.opened.get(key, 0)
+
+    def flagged_bits(self, key):
+        """ Funkcja zwracająca zbiór bitów pól oflagowanych fragmentu. """
+        if key in self.packed:
+            self.unpack(key)
+        return self.flagged.get(key, 0)
+
+    def is_opened(self, x, y):
+        """ Funkcja sprawdzająca, czy pole jest odsłonięte. """
+        (key, bit) = chunk_of(x, y)
+        return bool(self.opened_bits(key) >> bit & 1)
+
+    def is_flagged(self, x, y):
+        """ Funkcja sprawdzająca, czy na polu stoi flaga. """
+        (key, bit) = chunk_of(x, y)
+        return bool(self.flagged_bits(key) >> bit & 1)
+
+    def visible(self, x, y):
+        """ Funkcja zwracająca wartość widoczną pola, jak
+        'saper_logic.visible_value'. Po przegranej widoczne są też miny. """
+        (key, bit) = chunk_of(x, y)
+        if self.flagged_bits(key) >> bit & 1:
+            return VISIBLE_FLAG
+        if self.opened_bits(key) >> bit & 1 or (self.lost and self.mines(key) >> bit & 1):
+            return self.number(x, y)
+        return VISIBLE_COVERED
+
+    def uncover(self, x, y):
+        """ Funkcja odsłaniająca pole lub, w przypadku 0, całą wyspę, także
+        ponad granicami fragmentów. Zwraca prawdę, gdy pole udało się
+        odkryć. """
+        if self.lost or self.is_opened(x, y) or self.is_flagged(x, y):
+            return False
+        self.reveal(x, y)
+        self.moves += 1
+        return True
+
+    def reveal(self, x, y):
+        """ Funkcja wykonująca odsłonięcie dla 'uncover' i 'quick_uncover'. """
+        touched = set()
+        stack = [(x, y)]
+        while stack:
+            (x, y) = stack.pop()
+            (key, bit) = chunk_of(x, y)
+            opened = self.opened_bits(key)
+            if opened >> bit & 1 or self.flagged_bits(key) >> bit & 1:
+                continue
+            self.solved.discard(key)
+            self.opened[key] = opened | 1 << bit
+            self.changes.append((x, y))
+            touched.add(key)
+            number = self.number(x, y)
+            if number == -1:
+                self.lost = True
+                return
+            self.uncovered += 1
+            if number == 0:
+                stack.extend((x + i, y + j) for i in (-1, 0, 1) for j in (-1, 0, 1) if i or j)
+        for key in touched:
+            if self.opened[key] == FULL & ~self.mines(key):
+                del self.opened[key]
+                self.solved.add(key)
+
+    def quick_uncover(self, x, y):
+        """ Funkcja odkrywająca zakrytych sąsiadów odsłoniętego pola, jeśli
+        liczba flag wokół niego jest równa jego cyfrze. """
+        if self.lost or not self.is_opened(x, y):
+            return False
+        around = [(x + i, y + j) for i in (-1, 0, 1) for j in (-1, 0, 1) if i or j]
+        if self.number(x, y) != sum(self.is_flagged(*cell) for cell in around):
+            return False
+        for cell in around:
+            if not self.lost and not self.is_opened(*cell) and not self.is_flagged(*cell):
+                self.reveal(*cell)
+        self.moves += 1
+        return True
+
+    def flag(self, x, y):
+        """ Funkcja stawiająca lub zdejmująca flagę z zakrytego pola. """
+        if self.lost or self.is_opened(x, y):
+            return False
+        (key, bit) = chunk_of(x, y)
+        flagged = self.flagged_bits(key) ^ 1 << bit
+        if flagged:
+            self.flagged[key] = flagged
+        else:
+            del self.flagged[key]
+        self.flags += 1 if flagged >> bit & 1 else -1
+        self.moves += 1
+        self.changes.append((x, y))
+        return True
+
+    def explored(self):
+        """ Funkcja zwracająca zbiór kluczy fragmentów, w których gracz coś
+        odsłonił lub oflagował. """
+        return self.opened.keys() | self.flagged.keys() | self.solved | self.packed.keys()
+
+    def changes_since(self, version):
+        """ Funkcja zwracająca krotkę (bieżąca wersja, lista par ((x, y),
+        wartość widoczna)) pól zmienionych od wersji 'version'. Dla wersji
+        starszej niż najstarszy zachowany wpis zwracane są wszystkie pola
+        zbadanych fragmentów. """
+        start = version - self.base
+        if start < 0:
+            cells = [cell for key in self.explored()
+                     for cell in cells_of(key, self.opened_bits(key) | self.flagged_bits(key))]
+        else:
+            cells = list(dict.fromkeys(self.changes[start:]))
+        return (self.version, [(cell, self.visible(*cell)) for cell in cells])
+
+    def trim(self, version):
+        """ Funkcja usuwająca ze strumienia zmian wpisy starsze niż 'version'. """
+        drop = min(version - self.base, len(self.changes))
+        if drop > 0:
+            del self.changes[:drop]
+            self.base += drop
+
+    def compact(self, keep=()):
+        """ Funkcja kompresująca stan zbadanych fragmentów spoza zbioru kluczy
+        'keep' (np. fragmentów widocznych na ekranie). Zwraca liczbę
+        skompresowanych fragmentów. """
+        keep = set(keep)
+        keys = [key for key in self.opened.keys() | self.flagged.keys() if key not in keep]
+        for key in keys:
+            data = (self.opened.pop(key, 0).to_bytes(CHUNK_BYTES, "little")
+                    + self.flagged.pop(key, 0).to_bytes(CHUNK_BYTES, "little"))
+            self.packed[key] = zlib.compress(data)
+        return len(keys)
+
+    def memory(self):
+        """ Funkcja zwracająca przybliżoną liczbę bajtów zajmowanych przez stan
+        planszy i pamięć podręczną fragmentów. """
+        states = (list(self.opened.values()) + list(self.flagged.values())
+                  + list(self.packed.values()) + list(self.mine_cache.values())
+                  + list(self.number_cache.values()))
+        return sum(map(sys.getsizeof, states)) + 64 * len(self.solved)
@@ -0,0 +1,43 @@
+from array import array
+from saper_topology import grid
+
+
+def flood_fill(width, height, numbers, start, can_open=None, visited=None,
+               topology=None):
+    """ Funkcja wyznaczająca wyspę, którą odsłania kliknięcie pola o indeksie
+    'start' (indeks płaski: y * width + x). Wyspę tworzą zera połączone z
+    polem startowym razem z ich brzegami.
+
+    Parametry:
+    - numbers: płaska sekwencja liczb sąsiednich min (-1 oznacza minę),
+    - can_open: opcjonalna funkcja indeksu mówiąca, czy pole wolno odsłonić
+    (np. pomijająca flagi); pole, którego nie wolno odsłonić, przerywa wyspę,
+    - visited: opcjonalny bytearray długości width * height, w którym
+    zaznaczane są odwiedzone pola; pozwala dzielić znaczniki między
+    kolejnymi wywołaniami,
+    - topology: obiekt 'saper_topology.SquareGrid' (lub pochodny)
+    opisujący sąsiedztwo pól; domyślnie zwykła siatka o tym kształcie.
+
+    Funkcja jest iteracyjna, więc nie ogranicza jej głębokość rekurencji, a
+    jej koszt (poza ewentualną alokacją 'visited') jest liniowy względem
+    rozmiaru wyspy. Zwraca tablicę array('i') indeksów odsłoniętych pól, w
+    kolejności ich odwiedzenia. """
+    if topology is None:
+        topology = grid(width, height)
+    (kinds, deltas) = (topology.kinds, topology.deltas)
+    if visited is None:
+        visited = bytearray(width * height)
+    visited[start] = 1
+    opened = array('i', [start])
+    stack = [start] if numbers[start] == 0 else []
+    while stack:
+        i = stack.pop()
+        for d in deltas[kinds[i]]:
+            n = i + d
+            if visited[n] or (can_open is not None and not can_open(n)):
+                continue
+            visited[n] = 1
+            opened.append(n)
+            if numbers[n] == 0:
+                stack.append(n)
+    return opened
@@ -0,0 +1,203 @@
+import argparse
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from saper_logic import Board
+
+MAGIC = b"SAPG"
+VERSION = 1
+HEADER = struct.Struct("<4sBBHIIIQIIII")
+PLACED = 1
+LOST = 2
+
+DIGITS = bytes.maketrans(b"\x00\x01\x02\x03", b"0123")
+MINE_TABLES = [bytes((b >> k) & 1 for b in range(256)) for k in range(8)]
+STATE_TABLES = [bytes((b >> 2 * k) & 3 for b in range(256)) for k in range(4)]
+
+
+def pack_cells(cells, bits):
+    """ Funkcja pakująca bajty 'cells' (po jednym na pole, wartości mniejsze
+    niż 2 ** bits) po 'bits' bitów na pole, zaczynając od najmłodszych bitów
+    pierwszego bajtu. Bajty zamieniane są na cyfry liczby o podstawie
+    2 ** bits, dzięki czemu pakowanie nie przegląda pól w Pythonie. """
+    digits = cells.translate(DIGITS)[::-1]
+    value = int(digits, 1 << bits) if digits else 0
+    return value.to_bytes((len(cells) * bits + 7) // 8, "little")
+
+
+def unpack_cells(data, size, tables):
+    """ Funkcja odwrotna do 'pack_cells': zwraca 'size' bajtów, po jednym na
+    pole. Tablica 'tables' zawiera, dla każdej pozycji pola w bajcie, tabelę
+    'bytes.translate' wyciągającą jego wartość. """
+    data = bytes(data)
+    per_byte = len(tables)
+    cells = bytearray(len(data) * per_byte)
+    for (k, table) in enumerate(tables):
+        cells[k::per_byte] = data.translate(table)
+    return bytes(cells[:size])
+
+
+class SavedGame:
+    """ Widok zapisanej gry w buforze (bytes, mmap lub memoryview), bez
+    kopiowania jego zawartości.
+
+    Zapis składa się z nagłówka 'HEADER' (sygnatura, wersja, bity stanu,
+    wymiary, liczba min, ziarno, liczba flag, ruchów i wysp oraz czas gry w
+    sekundach), zbioru bitów min (bit y * width + x) oraz stanów pól po
+    2 bity na pole (0 zakryte, 1 odsłonięte, 2 oflagowane). Pola nagłówka
+    dostępne są jako atrybuty, a 'size' to długość całego zapisu, więc
+    zapisy można sklejać w jeden plik. """
+    def __init__(self, buffer, offset=0):
+        self.buffer = memoryview(buffer)
+        self.offset = offset
+        try:
+            self.read_header()
+        except ValueError:
+            self.buffer.release()
+            raise
+
+    def read_header(self):
+        """ Funkcja odczytująca i sprawdzająca nagłówek zapisu. Błędny lub
+        niepełny zapis zgłasza ValueError. """
+        offset = self.offset
+        if len(self.buffer) - offset < HEADER.size:
+            raise ValueError("truncated saved game")
+        (magic, version, status, _, self.width, self.height, self.mines,
+         self.seed, self.flags, self.moves, self.islands, self.time) = \
+            HEADER.unpack_from(self.buffer, offset)
+        if magic != MAGIC:
+            raise ValueError("not a saved game")
+        if version != VERSION:
+            raise ValueError(f"unsupported saved game version {version}")
+        self.placed = bool(status & PLACED)
+        self.lost = bool(status & LOST)
+        cells = self.width * self.height
+        self.mines_offset = offset + HEADER.size
+        self.states_offset = self.mines_offset + (cells + 7) // 8
+        self.end = self.states_offset + (cells + 3) // 4
+        self.size = self.end - offset
+        if len(self.buffer) < self.end:
+            raise ValueError("truncated saved game")
+
+    def is_mine(self, x, y):
+        """ Funkcja sprawdzająca bezpośrednio w buforze, czy na polu leży
+        mina. """
+        i = y * self.width + x
+        return bool(self.buffer[self.mines_offset + (i >> 3)] >> (i & 7) & 1)
+
+    def state(self, x, y):
+        """ Funkcja odczytująca bezpośrednio z bufora kod stanu pola. """
+        i = y * self.width + x
+        return self.buffer[self.states_offset + (i >> 2)] >> 2 * (i & 3) & 3
+
+    def mine_cells(self):
+        """ Funkcja zwracająca miny w formacie 'saper_logic.Board.mine_cells'. """
+        return unpack_cells(self.buffer[self.mines_offset:self.states_offset],
+                            self.width * self.height, MINE_TABLES)
+
+    def state_cells(self):
+        """ Funkcja zwracająca stany w formacie 'saper_logic.Board.state_cells'. """
+        return unpack_cells(self.buffer[self.states_offset:self.end],
+                            self.width * self.height, STATE_TABLES)
+
+    def restore(self, board_class=Board):
+        """ Funkcja tworząca planszę klasy 'board_class' (domyślnie
+        'saper_logic.Board', można podać też 'saper_numpy.NumpyBoard' lub
+        'saper_bitboard.BitBoard') w stanie zapisanym w buforze. """
+        board = board_class(self.width, self.height, self.mines, self.seed, lazy=True)
+        board.restore(self.mine_cells() if self.placed else None, self.state_cells())
+        board.moves = self.moves
+        board.islands = self.islands
+        board.lost = self.lost
+        return board
+
+
+def dumps(board, time=0):
+    """ Funkcja zwracająca zapis gry na planszy 'board' trwającej 'time'
+    sekund. """
+    status = (PLACED if board.placed else 0) | (LOST if board.lost else 0)
+    header = HEADER.pack(MAGIC, VERSION, status, 0, board.width, board.height,
+                         board.mines, board.seed, board.flags, board.moves,
+                         board.islands, time)
+    mines = board.mine_cells() if board.placed else bytes(board.width * board.height)
+    return header + pack_cells(mines, 1) + pack_cells(board.state_cells(), 2)
+
+
+def loads(data, board_class=Board):
+    """ Funkcja odtwarzająca planszę z zapisu 'dumps'. Zwraca krotkę
+    (plansza, czas gry). """
+    saved = SavedGame(data)
+    return (saved.restore(board_class), saved.time)
+
+
+def save(path, board, time=0):
+    """ Funkcja zapisująca grę do pliku. Zapis trafia najpierw do pliku
+    tymczasowego, który podmienia docelowy, więc przerwany zapis nie
+    niszczy poprzedniego. """
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(dumps(board, time))
+    os.replace(temporary, path)
+
+
+@contextmanager
+def mapped(path):
+    """ Menedżer kontekstu mapujący plik do pamięci tylko do odczytu i
+    zwracający jego 'memoryview'. Widoki utworzone z bufora nie mogą
+    przeżyć bloku 'with'. Pustego pliku nie da się zmapować, więc dostaje
+    on pusty widok. """
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield memoryview(b"")
+            return
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(data)
+    try:
+        yield view
+    finally:
+        view.release()
+        data.close()
+
+
+def iter_saved(buffer):
+    """ Generator zwracający kolejne widoki 'SavedGame' zapisów sklejonych
+    w jednym buforze. """
+    offset = 0
+    while offset < len(buffer):
+        saved = SavedGame(buffer, offset)
+        yield saved
+        offset = saved.end
+
+
+def load(path, board_class=Board):
+    """ Funkcja wczytująca grę z pliku przez 'mmap'. Zwraca krotkę
+    (plansza, czas gry). """
+    with mapped(path) as view:
+        saved = SavedGame(view)
+        try:
+            result = (saved.restore(board_class), saved.time)
+        finally:
+            saved.buffer.release()
+    return result
+
+
+def main(argv=None):
+    """ Punkt wejścia wiersza poleceń wypisującego nagłówki zapisanych gier. """
+    parser = argparse.ArgumentParser(
+        description="Show headers of saved minesweeper games.")
+    parser.add_argument("files", nargs="+")
+    args = parser.parse_args(argv)
+    for path in args.files:
+        with mapped(path) as view:
+            for saved in iter_saved(view):
+                print(f"{path}@{saved.offset}: {saved.width}x{saved.height}, "
+                      f"{saved.mines} mines, seed {saved.seed}, "
+                      f"{saved.flags} flags, {saved.moves} moves, "
+                      f"{saved.time} s, "
+                      f"{'lost' if saved.lost else 'placed' if saved.placed else 'not started'}")
+                saved.buffer.release()
+
+
+if __name__ == "__main__":
+    main()
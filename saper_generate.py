@@ -0,0 +1,137 @@
+import argparse
+import csv
+import struct
+import sys
+from multiprocessing import Pool
+from saper_logic import Board
+from saper_format import pack_cells
+
+BINARY_MAGIC = b"SAPB"
+BINARY_HEADER = struct.Struct("<4sHHIQ")
+RECORD_HEADER = struct.Struct("<QII")
+SEED_LIMIT = 1 << 32
+
+
+def board_seed(seed, index):
+    """ Funkcja zwracająca ziarno planszy o numerze 'index' w serii o
+    ziarnie 'seed'. Każda plansza serii ma własne, powtarzalne ziarno,
+    mieszczące się w 64 bitach, gdy 'seed' i 'index' mieszczą się w 32. """
+    return (seed << 32) | index
+
+
+def mines_bitset(board):
+    """ Funkcja zwracająca rozmieszczenie min planszy jako zbiór bitów:
+    bit numer y * width + x jest ustawiony, gdy na polu (x, y) leży mina. """
+    return pack_cells(board.mine_cells(), 1)
+
+
+def generate_board(width, height, mines, seed):
+    """ Funkcja generująca jedną planszę. Zwraca krotkę (ziarno, 3BV,
+    liczba wysp, zbiór bitów min). """
+    board = Board(width, height, mines, seed)
+    return (seed, board.bbbv, board.openings, mines_bitset(board))
+
+
+def generate_chunk(task):
+    """ Funkcja wykonywana w procesie roboczym: generuje plansze o numerach
+    z przedziału [start, stop) serii opisanej krotką 'task'. """
+    (width, height, mines, seed, start, stop) = task
+    return [generate_board(width, height, mines, board_seed(seed, i))
+            for i in range(start, stop)]
+
+
+def generate(width, height, mines, count, seed=0, processes=None, chunk_size=256):
+    """ Generator zwracający kolejno 'count' plansz o zadanych parametrach w
+    postaci krotek z 'generate_board'. Praca dzielona jest na paczki po
+    'chunk_size' plansz i rozdzielana na pulę 'processes' procesów (domyślnie
+    tylu, ile jest rdzeni); przy jednym procesie plansze generowane są w
+    bieżącym procesie. Kolejność wyników nie zależy od liczby procesów.
+    Ziarno serii i liczba plansz muszą mieścić się w 32 bitach. """
+    if not 0 <= seed < SEED_LIMIT or count > SEED_LIMIT:
+        raise ValueError("seed and count must fit in 32 bits")
+    tasks = [(width, height, mines, seed, start, min(count, start + chunk_size))
+             for start in range(0, count, chunk_size)]
+    if processes == 1:
+        for task in tasks:
+            yield from generate_chunk(task)
+        return
+    with Pool(processes) as pool:
+        for chunk in pool.imap(generate_chunk, tasks):
+            yield from chunk
+
+
+def write_csv(file, records):
+    """ Funkcja zapisująca plansze do pliku CSV, po jednym wierszu
+    'ziarno;3BV;wyspy;miny' na planszę (miny zapisane szesnastkowo). """
+    writer = csv.writer(file, delimiter=";")
+    for (seed, bbbv, openings, bits) in records:
+        writer.writerow((seed, bbbv, openings, bits.hex()))
+
+
+def write_binary(file, width, height, mines, records):
+    """ Funkcja zapisująca plansze w formacie binarnym: nagłówek z wymiarami,
+    liczbą min i liczbą plansz, a po nim rekordy stałej długości złożone z
+    ziarna, 3BV, liczby wysp i zbioru bitów min. """
+    file.write(BINARY_HEADER.pack(BINARY_MAGIC, width, height, mines, 0))
+    count = 0
+    for (seed, bbbv, openings, bits) in records:
+        file.write(RECORD_HEADER.pack(seed, bbbv, openings))
+        file.write(bits)
+        count += 1
+    file.seek(0)
+    file.write(BINARY_HEADER.pack(BINARY_MAGIC, width, height, mines, count))
+
+
+def read_binary(file):
+    """ Generator odczytujący plansze zapisane przez 'write_binary'. Zwraca
+    kolejno krotki (ziarno, 3BV, liczba wysp, zbiór bitów min). """
+    (magic, width, height, mines, count) = BINARY_HEADER.unpack(
+        file.read(BINARY_HEADER.size))
+    if magic != BINARY_MAGIC:
+        raise ValueError("not a board batch file")
+    bits_size = (width * height + 7) // 8
+    for _ in range(count):
+        (seed, bbbv, openings) = RECORD_HEADER.unpack(file.read(RECORD_HEADER.size))
+        yield (seed, bbbv, openings, file.read(bits_size))
+
+
+def main(argv=None):
+    """ Punkt wejścia wiersza poleceń generatora plansz. """
+    parser = argparse.ArgumentParser(
+        description="Generate minesweeper boards without the GUI.")
+    parser.add_argument("width", type=int)
+    parser.add_argument("height", type=int)
+    parser.add_argument("mines", type=int)
+    parser.add_argument("count", type=int)
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the series; board i uses (seed << 32) | i")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="number of worker processes (default: all cores)")
+    parser.add_argument("--format", choices=("csv", "bin"), default="csv")
+    parser.add_argument("--output", default="-",
+                        help="output file, '-' for standard output (csv only)")
+    args = parser.parse_args(argv)
+    if not 0 <= args.mines <= args.width * args.height:
+        parser.error("number of mines does not fit on the board")
+    if not 0 <= args.seed < SEED_LIMIT:
+        parser.error(f"--seed must be between 0 and {SEED_LIMIT - 1}")
+    if not 0 <= args.count <= SEED_LIMIT:
+        parser.error(f"count must be between 0 and {SEED_LIMIT}")
+
+    records = generate(args.width, args.height, args.mines, args.count,
+                       args.seed, args.processes)
+    if args.format == "csv":
+        if args.output == "-":
+            write_csv(sys.stdout, records)
+        else:
+            with open(args.output, "w", newline="") as file:
+                write_csv(file, records)
+    else:
+        if args.output == "-":
+            parser.error("binary output needs --output")
+        with open(args.output, "wb") as file:
+            write_binary(file, args.width, args.height, args.mines, records)
+
+
+if __name__ == "__main__":
+    main()
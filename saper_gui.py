@@ -1,10 +1,45 @@
-from PyQt5.QtWidgets import QAbstractButton, QLabel, QDialog, QSizePolicy, QVBoxLayout, QDialogButtonBox, QHBoxLayout
-from PyQt5.QtGui import QPainter, QPixmap
-from PyQt5.QtCore import Qt, QTimer, QSize
+import threading
+from array import array
+from PyQt5.QtWidgets import QAbstractButton, QWidget, QLabel, QDialog, QSizePolicy, QVBoxLayout, QDialogButtonBox, QHBoxLayout
+from PyQt5.QtGui import QPainter, QColor
+from PyQt5.QtCore import Qt, QTimer, QSize, QRect, QObject, pyqtSignal
 from highscore_handler import HighscoreHandler
+from tile_cache import tile_cache, DEFAULT_TILE, HOVER_TILE, MINE_TILE, FLAG_TILE, NUMBER_TILES
 import saper_logic as saper
+from saper_solver import Solver, hint
+from saper_noguess import NoGuessPool
+import saper_replay
+import saper_instrument
+import saper_topology
 
-highscore_handler = HighscoreHandler()
+highscore_handler = None
+no_guess_pool = NoGuessPool()
+HEAT_ALPHA = 0.45
+
+
+def heat_color(probability):
+    """ Funkcja zwracająca półprzezroczysty kolor mapy cieplnej: zielony dla
+    pola na pewno bezpiecznego, przez żółty, do czerwonego dla miny. """
+    return QColor.fromHsvF((1 - probability) / 3, 1, 1, HEAT_ALPHA)
+
+
+def get_highscore_handler():
+    """ Funkcja zwracająca wspólny obiekt 'HighscoreHandler'. Obiekt (razem
+    z połączeniem z bazą wyników) tworzony jest przy pierwszym użyciu, a nie
+    przy imporcie modułu. """
+    global highscore_handler
+    if highscore_handler is None:
+        highscore_handler = HighscoreHandler()
+    return highscore_handler
+
+
+def close_highscore_handler():
+    """ Funkcja zapisująca oczekujące wyniki i zamykająca wspólny obiekt
+    'HighscoreHandler', jeśli został utworzony. """
+    global highscore_handler
+    if highscore_handler is not None:
+        highscore_handler.close()
+        highscore_handler = None
 
 
 class FieldButton(QAbstractButton):
@@ -28,10 +63,14 @@ class FieldButton(QAbstractButton):
         self.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Preferred)
 
     def paintEvent(self, event):
-        """ Przeładowanie funkcji, które rysuje na przycisku PixMap trzymany
-        pod zmienną 'current'"""
+        """ Przeładowanie funkcji, które rysuje na przycisku teksturę o
+        identyfikatorze trzymanym pod zmienną 'current', pobraną ze wspólnej
+        pamięci podręcznej tekstur. """
         painter = QPainter(self)
-        painter.drawPixmap(self.rect(), self.current)
+        tile_cache.draw(painter, self.rect(), self.current)
+        probability = self.board.heat.get(self.posY * self.board.width + self.posX)
+        if probability is not None and self.covered:
+            painter.fillRect(self.rect(), heat_color(probability))
 
     def mousePressEvent(self, e):
         """ Zdarzenie obsługujące kliknięcie przycisku.
@@ -82,35 +121,431 @@ class FieldButton(QAbstractButton):
         return QSize(40, 40)
 
 
+class BoardCanvas(QWidget):
+    """ Kontrolka rysująca całą planszę na jednym płótnie. Zastępuje siatkę
+    obiektów 'FieldButton': pole pod kursorem wyznaczane jest ze
+    współrzędnych myszy, a przy zmianach odświeżane są tylko prostokąty
+    zmienionych pól. """
+    def __init__(self, board, parent=None):
+        """ Jako argument dostaje obiekt 'BoardManager', który obsługuje
+        planszę. Zbiór 'marked' zawiera pola podświetlone przy przytrzymaniu
+        przycisku myszy, 'hover' pole pod kursorem, a 'pressed' pole, na
+        którym wciśnięto przycisk. """
+        super().__init__(parent)
+        self.board = board
+        self.marked = set()
+        self.hover = None
+        self.pressed = None
+        self.setMouseTracking(True)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+
+    def tile_size(self):
+        """ Funkcja zwracająca długość boku pola w pikselach. """
+        return max(1, min(self.width() // self.board.width,
+                          self.height() // self.board.height))
+
+    def cell_at(self, pos):
+        """ Funkcja zwracająca współrzędne (x, y) pola pod punktem 'pos'
+        lub None, jeśli punkt leży poza planszą. """
+        size = self.tile_size()
+        (x, y) = (pos.x() // size, pos.y() // size)
+        if 0 <= x < self.board.width and 0 <= y < self.board.height:
+            return (x, y)
+        return None
+
+    def cell_rect(self, x, y):
+        """ Funkcja zwracająca prostokąt zajmowany przez pole. """
+        size = self.tile_size()
+        return QRect(x * size, y * size, size, size)
+
+    def refresh(self, cells):
+        """ Funkcja zlecająca przerysowanie podanych pól. Przy dużej liczbie
+        zmian przerysowywana jest cała kontrolka. """
+        if len(cells) > 256:
+            self.update()
+            return
+        for (x, y) in cells:
+            self.update(self.cell_rect(x, y))
+
+    def tile(self, x, y):
+        """ Funkcja zwracająca identyfikator tekstury, którą należy narysować
+        na polu. """
+        if (x, y) in self.marked:
+            return self.board.hover_tile
+        if (x, y) == self.hover and self.isEnabled() and self.board.covered(x, y):
+            return self.board.hover_tile
+        return self.board.field_to_tile(x, y)
+
+    def paintEvent(self, event):
+        """ Przeładowanie funkcji rysującej, które rysuje tylko pola
+        przecinające się z uszkodzonym obszarem. """
+        painter = QPainter(self)
+        size = self.tile_size()
+        atlas = tile_cache.atlas(size, size)
+        rect = event.rect()
+        columns = range(max(0, rect.left() // size),
+                        min(self.board.width, rect.right() // size + 1))
+        heat = self.board.heat
+        for y in range(max(0, rect.top() // size),
+                       min(self.board.height, rect.bottom() // size + 1)):
+            for x in columns:
+                painter.drawPixmap(QRect(x * size, y * size, size, size), atlas,
+                                   tile_cache.source_rect(self.tile(x, y), size, size))
+                probability = heat.get(y * self.board.width + x)
+                if probability is not None and self.board.covered(x, y):
+                    painter.fillRect(QRect(x * size, y * size, size, size),
+                                     heat_color(probability))
+
+    def mousePressEvent(self, e):
+        """ Zdarzenie obsługujące kliknięcie planszy, odpowiednik
+        'FieldButton.mousePressEvent' dla pola pod kursorem. """
+        self.pressed = self.cell_at(e.pos())
+        if self.pressed is None:
+            return
+        (x, y) = self.pressed
+        if e.button() == Qt.LeftButton:
+            if not self.board.covered(x, y):
+                self.board.mark_neighbours(x, y)
+        else:
+            if self.board.board.flag(x, y):
+                self.board.mines_counter.update_label(self.board.board.flags)
+                self.board.render()
+        if not self.board.timer.running:
+            self.board.timer.start()
+
+    def mouseReleaseEvent(self, e):
+        """ Zdarzenie obsługujące puszczenie przycisku myszy nad polem, na
+        którym został on wciśnięty. """
+        if self.pressed is None:
+            return
+        (x, y) = self.pressed
+        self.pressed = None
+        if e.button() == Qt.LeftButton:
+            if not self.board.covered(x, y):
+                self.board.unmark_neighbours(x, y)
+            if self.board.board.quick_uncover(x, y):
+                self.board.render()
+            if self.board.board.uncover(x, y):
+                self.board.render()
+
+    def mouseMoveEvent(self, e):
+        """ Funkcja przesuwająca podświetlenie za kursorem myszy. """
+        self.set_hover(self.cell_at(e.pos()))
+
+    def leaveEvent(self, a0):
+        """ Funkcja usuwająca podświetlenie po opuszczeniu planszy. """
+        self.set_hover(None)
+
+    def set_hover(self, cell):
+        """ Funkcja zmieniająca pole pod kursorem i odświeżająca oba pola. """
+        if cell == self.hover:
+            return
+        changed = [c for c in (self.hover, cell) if c is not None]
+        self.hover = cell
+        self.refresh(changed)
+
+    def sizeHint(self):
+        """ Funkcja ustalająca rozmiar planszy. """
+        return QSize(40 * self.board.width, 40 * self.board.height)
+
+
+class EndlessCanvas(QWidget):
+    """ Kontrolka rysująca widoczny wycinek nieskończonej planszy
+    'saper_endless.EndlessBoard'. Widok przewijany jest kółkiem myszy (z
+    klawiszem Shift w poziomie), przeciąganiem środkowym przyciskiem myszy
+    i strzałkami. Lewy przycisk odsłania pole, a na odsłoniętym polu
+    wykonuje szybkie odsłonięcie; prawy stawia lub zdejmuje flagę.
+
+    Rysowane są tylko pola widoczne na ekranie, więc koszt klatki nie
+    zależy od zbadanego obszaru. Chwilę po przewinięciu stan fragmentów
+    spoza widoku jest kompresowany przez 'EndlessBoard.compact'. Funkcja
+    'changed' wywoływana jest po każdym ruchu. """
+    TILE = 32
+    SCROLL = 4
+
+    def __init__(self, board, changed=None, parent=None):
+        super().__init__(parent)
+        self.board = board
+        self.changed = changed
+        self.origin = None
+        self.version = 0
+        self.hover = None
+        self.pressed = None
+        self.drag = None
+        self.compactor = QTimer()
+        self.compactor.setSingleShot(True)
+        self.compactor.timeout.connect(self.compact)
+        self.setMouseTracking(True)
+        self.setFocusPolicy(Qt.StrongFocus)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+
+    def resizeEvent(self, e):
+        """ Przy pierwszym pokazaniu pole (0, 0) umieszczane jest na środku. """
+        if self.origin is None:
+            self.origin = (-(self.width() // 2), -(self.height() // 2))
+
+    def cell_at(self, pos):
+        """ Funkcja zwracająca współrzędne (x, y) pola pod punktem 'pos'. """
+        return ((pos.x() + self.origin[0]) // self.TILE, (pos.y() + self.origin[1]) // self.TILE)
+
+    def cell_rect(self, x, y):
+        """ Funkcja zwracająca prostokąt zajmowany przez pole w kontrolce. """
+        return QRect(x * self.TILE - self.origin[0], y * self.TILE - self.origin[1],
+                     self.TILE, self.TILE)
+
+    def cells_in(self, rect):
+        """ Funkcja zwracająca zakresy (kolumny, wiersze) pól przecinających
+        się z prostokątem 'rect' kontrolki. """
+        (left, top) = self.cell_at(rect.topLeft())
+        (right, bottom) = self.cell_at(rect.bottomRight())
+        return (range(left, right + 1), range(top, bottom + 1))
+
+    def tile(self, x, y):
+        """ Funkcja zwracająca identyfikator tekstury pola. """
+        value = self.board.visible(x, y)
+        if value == saper.VISIBLE_COVERED:
+            return HOVER_TILE if (x, y) == self.hover and not self.board.lost else DEFAULT_TILE
+        if value == saper.VISIBLE_FLAG:
+            return FLAG_TILE
+        if value == -1:
+            return MINE_TILE
+        return NUMBER_TILES[value]
+
+    def paintEvent(self, event):
+        """ Przeładowanie funkcji rysującej, które rysuje pola przecinające się
+        z uszkodzonym obszarem. """
+        painter = QPainter(self)
+        size = self.TILE
+        atlas = tile_cache.atlas(size, size)
+        (columns, rows) = self.cells_in(event.rect())
+        for y in rows:
+            for x in columns:
+                painter.drawPixmap(self.cell_rect(x, y), atlas,
+                                   tile_cache.source_rect(self.tile(x, y), size, size))
+
+    def render(self):
+        """ Funkcja przerysowująca pola zmienione od ostatniego renderowania
+        i usuwająca pobrane zmiany ze strumienia planszy. """
+        (self.version, changes) = self.board.changes_since(self.version)
+        self.board.trim(self.version)
+        if len(changes) > 256:
+            self.update()
+        else:
+            for (cell, value) in changes:
+                self.update(self.cell_rect(*cell))
+        if self.board.lost:
+            self.update()
+        if self.changed is not None:
+            self.changed()
+
+    def scroll_by(self, dx, dy):
+        """ Funkcja przesuwająca widok o (dx, dy) pikseli. """
+        self.origin = (self.origin[0] + dx, self.origin[1] + dy)
+        self.update()
+        self.compactor.start(1000)
+
+    def view_chunks(self):
+        """ Funkcja zwracająca zbiór kluczy fragmentów widocznych w kontrolce. """
+        (columns, rows) = self.cells_in(self.rect())
+        return {(cx, cy) for cx in range(columns[0] >> 5, (columns[-1] >> 5) + 1)
+                for cy in range(rows[0] >> 5, (rows[-1] >> 5) + 1)}
+
+    def compact(self):
+        """ Funkcja kompresująca stan fragmentów spoza widoku. """
+        self.board.compact(self.view_chunks())
+        if self.changed is not None:
+            self.changed()
+
+    def mousePressEvent(self, e):
+        """ Zdarzenie obsługujące wciśnięcie przycisku myszy. """
+        if e.button() == Qt.MiddleButton:
+            self.drag = e.pos()
+            return
+        self.pressed = self.cell_at(e.pos())
+        if e.button() == Qt.RightButton and self.board.flag(*self.pressed):
+            self.render()
+
+    def mouseReleaseEvent(self, e):
+        """ Zdarzenie obsługujące puszczenie przycisku myszy nad polem, na
+        którym został on wciśnięty. """
+        if e.button() == Qt.MiddleButton:
+            self.drag = None
+            return
+        cell = self.cell_at(e.pos())
+        if e.button() == Qt.LeftButton and cell == self.pressed:
+            if self.board.quick_uncover(*cell) or self.board.uncover(*cell):
+                self.render()
+        self.pressed = None
+
+    def mouseMoveEvent(self, e):
+        """ Funkcja przewijająca widok przy przeciąganiu i przesuwająca
+        podświetlenie za kursorem. """
+        if self.drag is not None:
+            delta = self.drag - e.pos()
+            self.drag = e.pos()
+            self.scroll_by(delta.x(), delta.y())
+            return
+        cell = self.cell_at(e.pos())
+        if cell != self.hover:
+            for c in (self.hover, cell):
+                if c is not None:
+                    self.update(self.cell_rect(*c))
+            self.hover = cell
+
+    def wheelEvent(self, e):
+        """ Funkcja przewijająca widok kółkiem myszy, z klawiszem Shift w
+        poziomie. Jeden ząbek kółka (120 jednostek) to 'SCROLL' pól. """
+        delta = e.angleDelta()
+        (dx, dy) = (-delta.x(), -delta.y())
+        if e.modifiers() & Qt.ShiftModifier:
+            (dx, dy) = (dy, dx)
+        step = self.SCROLL * self.TILE
+        self.scroll_by(dx * step // 120, dy * step // 120)
+
+    def keyPressEvent(self, e):
+        """ Funkcja przewijająca widok strzałkami. """
+        step = self.SCROLL * self.TILE
+        moves = {Qt.Key_Left: (-step, 0), Qt.Key_Right: (step, 0),
+                 Qt.Key_Up: (0, -step), Qt.Key_Down: (0, step)}
+        if e.key() in moves:
+            self.scroll_by(*moves[e.key()])
+        else:
+            super().keyPressEvent(e)
+
+    def sizeHint(self):
+        """ Funkcja ustalająca początkowy rozmiar widoku. """
+        return QSize(25 * self.TILE, 18 * self.TILE)
+
+
+class HeatmapWorker(QObject):
+    """ Wątek liczący prawdopodobieństwa min dla mapy cieplnej.
+
+    Zmiany planszy przekazywane przez 'submit' trafiają do kolejki, a wątek
+    nanosi wszystkie zebrane zmiany naraz na przyrostowy 'Solver' i
+    wysyła sygnał 'ready' ze słownikiem prawdopodobieństw (płaski indeks ->
+    prawdopodobieństwo miny). Dzięki temu wątek GUI nigdy nie czeka na
+    solver, a seria szybkich ruchów liczona jest raz. """
+    ready = pyqtSignal(object)
+
+    def __init__(self, width, height, mines):
+        super().__init__()
+        self.solver = Solver(width, height, mines)
+        self.pending = []
+        self.running = True
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, changes):
+        """ Funkcja zlecająca przeliczenie po zmianach 'changes'. """
+        with self.condition:
+            self.pending.extend(changes)
+            self.condition.notify()
+
+    def stop(self):
+        """ Funkcja kończąca wątek po bieżącym obliczeniu. """
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+
+    def run(self):
+        """ Pętla wątku roboczego. """
+        while True:
+            with self.condition:
+                while self.running and not self.pending:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                (changes, self.pending) = (self.pending, [])
+            self.solver.update(changes)
+            probabilities = self.solver.solve_current().probabilities
+            if self.running:
+                self.ready.emit(probabilities)
+
+
 class BoardManager:
     """ Obiekt odpowiadający za komunikację GUI z logiką gry. """
-    def __init__(self, width, height, mines):
+    def __init__(self, width, height, mines, canvas=True, generated=None,
+                 board=None, time=0, record=True):
         """ Przy inicjacji obiekt dostaje parametry początkowe planszy: długość,
         wysokość oraz liczbę min.
-        Tworzona jest warstwa logiczna planszy, przyciski odpowiadające polom,
-        stoper, licznik min pozostałych do oflagowania oraz ładowane są
-        tekstury przycisków. """
-        self.board = saper.Board(width, height, mines)
+        Tworzona jest warstwa logiczna planszy, widok planszy, stoper, licznik
+        min pozostałych do oflagowania oraz ładowane są tekstury przycisków.
+        Domyślnym widokiem jest pojedyncza kontrolka 'BoardCanvas'; przy
+        'canvas' równym fałsz tworzona jest siatka przycisków 'FieldButton'.
+        Podanie 'generated', krotki (ziarno, pole startowe) planszy
+        rozwiązywalnej bez zgadywania (np. z 'no_guess_pool'), tworzy tę
+        planszę i od razu odsłania jej pole startowe. W pozostałych przypadkach plansza tworzona jest leniwie:
+        miny rozmieszczane są dopiero po pierwszym kliknięciu.
+        Wczytaną grę wznawia się, podając jej planszę 'board' i czas 'time'.
+        Przy 'record' równym prawda ruchy nowej planszy zapisywane są w
+        dzienniku 'log', zapisywanym do katalogu './replays' po zakończeniu
+        gry; przy fałszu (np. przy odtwarzaniu) nie są też zapisywane
+        wyniki.
+        Widok nie czyta całej planszy: trzyma kopię wartości widocznych pól
+        'visible' i przy renderowaniu pobiera tylko zmiany od swojej wersji
+        'version' przez 'changes_since'.
+        Słownik 'heat' zawiera prawdopodobieństwa min pokazywane na mapie
+        cieplnej, włączanej przez 'set_heatmap'.
+        Nowa plansza tworzona jest przez 'saper_logic.create_board', więc
+        jej backend wybiera zmienna środowiskowa SAPER_BACKEND. Plansza bez
+        zgadywania to zawsze 'saper_logic.Board', bo ziarno z puli odtwarza
+        sprawdzoną planszę tylko przy jej sposobie losowania min. """
+        start = None
+        if board is not None:
+            self.board = board
+        elif generated is not None:
+            (seed, start) = generated
+        if start is not None:
+            self.board = saper.Board(width, height, mines, seed, safe=start)
+        elif board is None:
+            self.board = saper.create_board(width, height, mines, lazy=True)
+        self.record = record
+        self.log = None
+        if record and board is None:
+            self.log = saper_replay.attach(self.board)
+        if start is not None:
+            self.board.uncover(*start)
         self.width = width
         self.height = height
         self.load_tiles()
-        self.buttons = [[FieldButton(i, j, self, self.default_tile, self.hover_tile) for i in range(width)] for j in range(height)]
-        self.timer = TimerWidget()
+        if canvas:
+            self.canvas = BoardCanvas(self)
+            self.buttons = None
+        else:
+            self.canvas = None
+            self.buttons = [[FieldButton(i, j, self, self.default_tile, self.hover_tile) for i in range(width)] for j in range(height)]
+        self.timer = TimerWidget(time)
         self.mines_counter = MinesCounter(self.board.mines)
+        self.mines_counter.update_label(self.board.flags)
+        self.bbbv_label = BbbvLabel(self.board.bbbv)
+        self.solver = Solver(width, height, mines)
+        self.hint = None
+        self.heat = {}
+        self.heatmap = None
+        self.visible = array('b', [saper.VISIBLE_COVERED]) * (width * height)
+        self.version = -1 if board is not None else 0
+        self.render()
 
     def load_tiles(self):
-        """ Funkcja ładująca tekstury przycisków z plików. """
-        self.default_tile = QPixmap("./icons/blue_tile.png")
-        self.hover_tile = QPixmap("./icons/purple_tile.png")
-        self.mine_tile = QPixmap("./icons/naval-mine.png")
-        self.flag_tile = QPixmap("./icons/flag.png")
-        self.number_tiles = [QPixmap(f"./icons/{i}.png") for i in range(0, 9)]
+        """ Funkcja przypisująca identyfikatory tekstur przycisków. Same
+        tekstury wczytywane są raz na proces przez 'tile_cache'. """
+        self.default_tile = DEFAULT_TILE
+        self.hover_tile = HOVER_TILE
+        self.mine_tile = MINE_TILE
+        self.flag_tile = FLAG_TILE
+        self.number_tiles = NUMBER_TILES
 
     def to_layout(self):
         """ Funkcja zwracająca layout wypełniony przyciskami obsługiwanymi
-        przez klasę. """
+        przez klasę. Płótno umieszczane jest w jedynym wierszu layoutu. """
         layout = QVBoxLayout()
         layout.setSpacing(0)
+        if self.canvas is not None:
+            row = QHBoxLayout()
+            row.addWidget(self.canvas)
+            layout.addLayout(row)
+            return layout
         for list in self.buttons:
             row = QHBoxLayout()
             for b in list:
@@ -120,18 +555,28 @@ class BoardManager:
 
     def render(self):
         """ Funkcja renderująca aktualny wygląd przycisków, a także
-        sprawdzająca, czy rozgrywka nie została zakończona."""
-        for list in self.buttons:
-            for b in list:
-                if b.marked:
-                    b.current = self.hover_tile
-                else:
-                    b.current = self.field_to_tile(b.posX, b.posY)
-                if self.board.fields[b.posY][b.posX][1] != 'c':
-                    b.covered = False
-                else:
-                    b.covered = True
-                b.update()
+        sprawdzająca, czy rozgrywka nie została zakończona.
+        Odświeżane są tylko pola zmienione w logice gry od poprzedniego
+        renderowania (przy pierwszym renderowaniu wczytanej planszy
+        wszystkie), a pobrane zmiany usuwane są ze strumienia planszy. """
+        (self.version, changes) = self.board.changes_since(self.version)
+        self.board.trim(self.version)
+        width = self.width
+        cells = []
+        for (i, value) in changes:
+            self.visible[i] = value
+            cells.append((i % width, i // width))
+        if self.heatmap is not None and changes:
+            self.heatmap.submit(changes)
+        if self.hint is not None:
+            self.set_marked(*self.hint, False)
+            self.hint = None
+        if self.canvas is not None:
+            self.canvas.refresh(cells)
+        else:
+            for (x, y) in cells:
+                self.render_button(self.buttons[y][x])
+        self.bbbv_label.update_label(self.board.bbbv)
         if self.board.lost and self.timer.running:
             self.timer.end()
             self.game_lost()
@@ -139,38 +584,133 @@ class BoardManager:
             self.timer.end()
             self.game_won()
 
+    def render_button(self, b):
+        """ Funkcja uaktualniająca teksturę i stan pojedynczego przycisku. """
+        if b.marked:
+            b.current = self.hover_tile
+        else:
+            b.current = self.field_to_tile(b.posX, b.posY)
+        b.covered = self.covered(b.posX, b.posY)
+        b.update()
+
+    def set_marked(self, x, y, marked):
+        """ Funkcja włączająca lub wyłączająca podświetlenie pola. """
+        if self.canvas is not None:
+            if marked:
+                self.canvas.marked.add((x, y))
+            else:
+                self.canvas.marked.discard((x, y))
+            self.canvas.refresh([(x, y)])
+        else:
+            self.buttons[y][x].marked = marked
+            self.render_button(self.buttons[y][x])
+
+    def show_hint(self):
+        """ Funkcja podświetlająca pole wskazane przez solver: pole na pewno
+        bezpieczne lub, gdy takiego nie ma, pole o najmniejszym
+        prawdopodobieństwie miny. Podświetlenie znika przy następnym
+        renderowaniu. """
+        if self.finished():
+            return
+        cell = hint(self.solver.solve_board(self.board))
+        if cell is None:
+            return
+        if self.hint is not None:
+            self.set_marked(*self.hint, False)
+        self.hint = (cell % self.width, cell // self.width)
+        self.set_marked(*self.hint, True)
+
+    def set_heatmap(self, enabled):
+        """ Funkcja włączająca lub wyłączająca mapę cieplną zakrytych pól.
+        Włączenie uruchamia 'HeatmapWorker' i przekazuje mu cały widoczny
+        stan planszy; wyłączenie zatrzymuje wątek i usuwa zabarwienie. """
+        if enabled and self.heatmap is None and not self.finished():
+            self.heatmap = HeatmapWorker(self.width, self.height, self.board.mines)
+            self.heatmap.ready.connect(self.show_heat)
+            self.heatmap.submit(list(enumerate(self.visible)))
+        elif not enabled and self.heatmap is not None:
+            self.heatmap.stop()
+            self.heatmap = None
+            self.show_heat({})
+
+    def show_heat(self, probabilities):
+        """ Funkcja wywoływana w wątku GUI z wynikiem 'HeatmapWorker':
+        podmienia słownik 'heat' i odświeża pola, których zabarwienie mogło
+        się zmienić. Wyniki spóźnione po wyłączeniu mapy są pomijane. """
+        if self.heatmap is None and probabilities:
+            return
+        cells = self.heat.keys() | probabilities.keys()
+        self.heat = probabilities
+        self.refresh([(i % self.width, i // self.width) for i in cells])
+
+    def refresh(self, cells):
+        """ Funkcja przerysowująca podane pola bez zmiany ich stanu. """
+        if self.canvas is not None:
+            self.canvas.refresh(cells)
+            return
+        for (x, y) in cells:
+            self.buttons[y][x].update()
+
+    def finished(self):
+        """ Funkcja sprawdzająca, czy gra się zakończyła. """
+        return self.board.lost or self.board.check_for_win()
+
+    def covered(self, x, y):
+        """ Funkcja sprawdzająca, czy pole jest zakryte (bez flagi). """
+        return self.visible[y * self.width + x] == saper.VISIBLE_COVERED
+
     def field_to_tile(self, x, y):
-        """ Funkcja przyporządkowująca polu o podanych indeksach teksturę,
-        która odpowiada jego liczbie sąsiednich min. """
-        if self.board.fields[y][x][1] == 'c':
+        """ Funkcja przyporządkowująca polu o podanych indeksach identyfikator
+        tekstury, która odpowiada jego wartości widocznej. """
+        value = self.visible[y * self.width + x]
+        if value == saper.VISIBLE_COVERED:
             return self.default_tile
-        if self.board.fields[y][x][1] == 'f':
+        if value == saper.VISIBLE_FLAG:
             return self.flag_tile
-        if self.board.fields[y][x][0] == -1:
+        if value == -1:
             return self.mine_tile
-        return self.number_tiles[self.board.fields[y][x][0]]
+        return self.number_tiles[value]
+
+    def block(self, x, y):
+        """ Funkcja zwracająca płaskie indeksy pola i jego sąsiadów według
+        topologii 'saper_topology'. """
+        return saper_topology.grid(self.width, self.height).block(y * self.width + x)
 
     def mark_neighbours(self, x, y):
         """ Funkcja podświetlająca zakrytych sąsiadów przycisku o zadanych
         współrzędnych. """
-        for i in range(max(-1, -y), min(2, self.height - y)):
-            for j in range(max(-1, -x), min(2, self.width - x)):
-                if self.buttons[y + i][x + j].covered:
-                    self.buttons[y + i][x + j].marked = True
-        self.render()
+        cells = [(i % self.width, i // self.width) for i in self.block(x, y)]
+        if self.canvas is not None:
+            cells = [(i, j) for (i, j) in cells if self.covered(i, j)]
+            self.canvas.marked.update(cells)
+            self.canvas.refresh(cells)
+            return
+        for (i, j) in cells:
+            b = self.buttons[j][i]
+            if b.covered:
+                b.marked = True
+                self.render_button(b)
 
     def unmark_neighbours(self, x, y):
         """ Funkcja przywracająca zakrytych sąsiadów przycisku o podanych
         współrzędnych do stanu pierwotnego."""
-        for i in range(max(-1, -y), min(2, self.height - y)):
-            for j in range(max(-1, -x), min(2, self.width - x)):
-                if self.buttons[y + i][x + j].covered:
-                    self.buttons[y + i][x + j].marked = False
-        self.render()
+        if self.canvas is not None:
+            cells = list(self.canvas.marked)
+            self.canvas.marked.clear()
+            self.canvas.refresh(cells)
+            return
+        for i in self.block(x, y):
+            b = self.buttons[i // self.width][i % self.width]
+            if b.marked:
+                b.marked = False
+                self.render_button(b)
 
     def disable_buttons(self):
         """ Funkcja wyłączająca przyciski odpowiadające za plansze, używana po
         zakończeniu rozgrywki. """
+        if self.canvas is not None:
+            self.canvas.setDisabled(True)
+            return
         for row in self.buttons:
             for b in row:
                 b.setDisabled(True)
@@ -180,8 +720,11 @@ class BoardManager:
         Wyłącza przyciski reprezentujące pola, odkrywa wszystkie miny oraz
         wyświetla stosowne okno dialogowe."""
         self.disable_buttons()
+        self.set_heatmap(False)
         self.board.uncover_mines()
         self.render()
+        if self.log is not None:
+            saper_replay.save(self.log)
         result = ResultWindow(False)
         result.exec()
 
@@ -190,21 +733,66 @@ class BoardManager:
         Wyłącza przyciski odpowiadające za pola planszy, zapisuje wynik oraz
         wywołuje stosowne okno. """
         self.disable_buttons()
-        highscore_handler.handle(self.timer.current, self.board.bbbv)
+        self.set_heatmap(False)
+        if self.record:
+            get_highscore_handler().handle(self.timer.current, self.board.bbbv,
+                                     self.width, self.height, self.board.mines)
+        if self.log is not None:
+            saper_replay.save(self.log)
         result = ResultWindow(True, self.timer, self.board.bbbv)
         result.exec()
 
 
+class ReplayPlayer:
+    """ Odtwarzacz dziennika ruchów w GUI. Ruchy wykonywane są na planszy
+    obiektu 'BoardManager' (utworzonego z 'record' równym fałsz) w odstępach
+    zapisanych w dzienniku, podzielonych przez 'speed'. """
+    def __init__(self, manager, log, speed=1.0):
+        self.manager = manager
+        self.moves = list(log)
+        self.speed = speed
+        self.position = 0
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.step)
+        manager.disable_buttons()
+
+    def start(self):
+        """ Funkcja rozpoczynająca odtwarzanie. """
+        if self.moves:
+            self.timer.start(0)
+
+    def stop(self):
+        """ Funkcja zatrzymująca odtwarzanie. """
+        self.timer.stop()
+
+    def step(self):
+        """ Funkcja wykonująca kolejny ruch i planująca następny. """
+        manager = self.manager
+        move = self.moves[self.position]
+        saper_replay.apply(manager.board, move)
+        self.position += 1
+        manager.timer.current = (move.time - self.moves[0].time) // 1000
+        manager.timer.update_label()
+        manager.mines_counter.update_label(manager.board.flags)
+        manager.render()
+        if self.position < len(self.moves):
+            delay = (self.moves[self.position].time - move.time) / self.speed
+            self.timer.start(int(delay))
+        elif manager.board.lost:
+            manager.game_lost()
+
+
 class TimerWidget(QLabel):
     """ Kontrolka pełniąca funkcję miernika czasu wykonania planszy. """
-    def __init__(self, parent=None):
+    def __init__(self, current=0, parent=None):
         """ Podczas inicjacji obiektu tworzony jest zegar, który będzie
-        odmierzał czas, ustawiany jest czas początkowy oraz ustawiana jest
-        etykieta kontrolki. """
+        odmierzał czas, ustawiany jest czas początkowy (niezerowy przy
+        wznawianiu wczytanej gry) oraz ustawiana jest etykieta kontrolki. """
         super(TimerWidget, self).__init__(parent)
         self.timer = QTimer()
         self.timer.timeout.connect(self.count)
-        self.current = 0
+        self.current = current
         self.running = False
         self.update_label()
 
@@ -218,8 +806,8 @@ class TimerWidget(QLabel):
         self.update_label()
 
     def start(self):
-        """ Funkcja, która daje sygnał do startu zegarowi. """
-        self.current = 0
+        """ Funkcja, która daje sygnał do startu zegarowi. Zegar liczy dalej
+        od czasu ustawionego przy tworzeniu kontrolki. """
         self.running = True
         self.timer.start(1000)
 
@@ -235,6 +823,26 @@ class TimerWidget(QLabel):
         return "{:02d}:{:02d}".format(minutes, seconds)
 
 
+class ProfilerOverlay(QLabel):
+    """ Półprzezroczysta etykieta nakładana na okno gry, pokazująca rozbicie
+    czasu ostatniego kliknięcia i czas rysowania ostatniej klatki zebrane
+    przez 'saper_instrument'. Nie przechwytuje zdarzeń myszy. """
+    def __init__(self, parent=None):
+        super(ProfilerOverlay, self).__init__(parent)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setStyleSheet("background: rgba(0, 0, 0, 160); color: white; padding: 2px;")
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.update_label)
+        self.timer.start(250)
+        self.update_label()
+
+    def update_label(self):
+        """ Funkcja uaktualniająca etykietę i przenosząca ją na wierzch. """
+        self.setText(saper_instrument.summary())
+        self.adjustSize()
+        self.raise_()
+
+
 class MinesCounter(QLabel):
     """ Kontrolka odpowiadająca za informację o liczbie już oznakowanych
     min. """
@@ -248,6 +856,18 @@ class MinesCounter(QLabel):
         self.setText(f"Mines left to be marked: {self.mines_to_mark - flags}")
 
 
+class BbbvLabel(QLabel):
+    """ Kontrolka wyświetlająca współczynnik 3BV planszy, nieznany do
+    pierwszego ruchu na planszy tworzonej leniwie. """
+    def __init__(self, bbbv, parent=None):
+        super(BbbvLabel, self).__init__(parent)
+        self.update_label(bbbv)
+
+    def update_label(self, bbbv):
+        """ Funkcja uaktualniająca etykietę kontrolki. """
+        self.setText(f"3BV of the board: {'?' if bbbv is None else bbbv}")
+
+
 class ResultWindow(QDialog):
     """ Okno dialogowe informujące o rezultacie rozgrywki. """
     def __init__(self, won, timer=None, bbbv=0, parent=None):
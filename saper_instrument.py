@@ -0,0 +1,180 @@
+import functools
+import importlib
+import json
+import time
+from collections import defaultdict
+from saper_logic.backends import backend_class
+
+LOGIC_METHODS = ["uncover", "quick_uncover", "flag", "uncover_island", "place"]
+GUI_TARGETS = [
+    ("saper_gui", "BoardCanvas.mousePressEvent"),
+    ("saper_gui", "BoardCanvas.mouseReleaseEvent"),
+    ("saper_gui", "FieldButton.mousePressEvent"),
+    ("saper_gui", "FieldButton.mouseReleaseEvent"),
+    ("saper_gui", "BoardManager.render"),
+    ("saper_gui", "BoardCanvas.paintEvent"),
+    ("saper_gui", "FieldButton.paintEvent"),
+    ("saper_gui", "ResultWindow.__init__"),
+]
+CLICKS = {"BoardCanvas.mousePressEvent", "BoardCanvas.mouseReleaseEvent",
+          "FieldButton.mousePressEvent", "FieldButton.mouseReleaseEvent"}
+FRAMES = {"BoardCanvas.paintEvent", "FieldButton.paintEvent"}
+
+
+class Histogram:
+    """ Histogram czasów jednej operacji w przedziałach o granicach
+    będących potęgami dwójki mikrosekund, razem z liczbą wywołań, sumą,
+    minimum i maksimum. """
+    def __init__(self):
+        self.buckets = defaultdict(int)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, seconds):
+        """ Funkcja dopisująca jeden pomiar (w sekundach). """
+        self.buckets[int(seconds * 1e6).bit_length()] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def percentile(self, p):
+        """ Funkcja zwracająca górną granicę (w sekundach) przedziału, w
+        którym leży percentyl 'p' pomiarów, lub None bez pomiarów. """
+        if not self.count:
+            return None
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen * 100 >= p * self.count:
+                return (1 << bucket) / 1e6
+        return self.max
+
+    def merge(self, other):
+        """ Funkcja dodająca do histogramu pomiary histogramu 'other'. """
+        for (bucket, count) in other.buckets.items():
+            self.buckets[bucket] += count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    def to_dict(self):
+        """ Funkcja zwracająca histogram jako słownik gotowy do zapisu w
+        JSON-ie; przedziały opisane są górną granicą w mikrosekundach. """
+        return {"count": self.count, "total": self.total, "min": self.min,
+                "max": self.max, "p50": self.percentile(50), "p99": self.percentile(99),
+                "buckets_us": {str(1 << b): n for (b, n) in sorted(self.buckets.items())}}
+
+    @classmethod
+    def from_dict(cls, data):
+        """ Funkcja odtwarzająca histogram ze słownika z 'to_dict'. """
+        histogram = cls()
+        for (bound, count) in data["buckets_us"].items():
+            histogram.buckets[int(bound).bit_length() - 1] = count
+        (histogram.count, histogram.total) = (data["count"], data["total"])
+        (histogram.min, histogram.max) = (data["min"], data["max"])
+        return histogram
+
+
+histograms = defaultdict(Histogram)
+last_click = []
+last_frame = None
+originals = []
+
+
+def record(label, seconds):
+    """ Funkcja zapisująca pomiar operacji 'label' w histogramie i w
+    rozbiciu ostatniego kliknięcia. """
+    global last_frame
+    histograms[label].add(seconds)
+    last_click.append((label, seconds))
+    if label in FRAMES:
+        last_frame = seconds
+
+
+def wrap(label, function):
+    """ Funkcja zwracająca wersję 'function' mierzącą czas wywołań. Obsługa
+    kliknięcia ('CLICKS') zaczyna nowe rozbicie 'last_click'. """
+    click = label in CLICKS
+
+    @functools.wraps(function)
+    def timed(*args, **kwargs):
+        if click:
+            last_click.clear()
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            record(label, time.perf_counter() - start)
+    return timed
+
+
+def logic_targets(board_class=None):
+    """ Funkcja zwracająca metody logiki gry do pomiaru dla klasy planszy
+    'board_class', a bez niej dla backendu wybranego jak w 'backend_class'. """
+    if board_class is None:
+        board_class = backend_class()
+    return [(board_class.__module__, f"{board_class.__qualname__}.{method}")
+            for method in LOGIC_METHODS]
+
+
+def install(targets=None):
+    """ Funkcja podmieniająca metody z listy 'targets' (pary moduł, klasa.
+    metoda) na wersje mierzące czas; bez listy mierzone są metody planszy
+    bieżącego backendu i GUI. Dopóki pomiary nie są włączone, kod gry
+    działa bez żadnego narzutu, bo wywołuje oryginalne metody. """
+    if targets is None:
+        targets = logic_targets() + GUI_TARGETS
+    if originals:
+        return
+    for (module, name) in targets:
+        (class_name, method) = name.split(".")
+        cls = getattr(importlib.import_module(module), class_name)
+        function = cls.__dict__[method]
+        originals.append((cls, method, function))
+        setattr(cls, method, wrap(name, function))
+
+
+def uninstall():
+    """ Funkcja przywracająca oryginalne metody. """
+    while originals:
+        (cls, method, function) = originals.pop()
+        setattr(cls, method, function)
+
+
+def installed():
+    """ Funkcja sprawdzająca, czy pomiary są włączone. """
+    return bool(originals)
+
+
+def reset():
+    """ Funkcja czyszcząca wszystkie zebrane pomiary. """
+    global last_frame
+    histograms.clear()
+    last_click.clear()
+    last_frame = None
+
+
+def report():
+    """ Funkcja zwracająca słownik histogramów wszystkich operacji. """
+    return {label: histogram.to_dict() for (label, histogram) in sorted(histograms.items())}
+
+
+def export(path):
+    """ Funkcja zapisująca histogramy do pliku JSON. """
+    with open(path, "w") as file:
+        json.dump(report(), file, indent=2)
+
+
+def summary():
+    """ Funkcja zwracająca tekstowe rozbicie czasu ostatniego kliknięcia
+    oraz czas rysowania ostatniej klatki. """
+    parts = [f"{label.split('.')[-1] if label in CLICKS else label}: {seconds * 1000:.2f} ms"
+             for (label, seconds) in last_click]
+    frame = "-" if last_frame is None else f"{last_frame * 1000:.2f} ms"
+    return "Last click: " + (", ".join(parts) or "-") + f" | frame: {frame}"
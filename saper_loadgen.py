@@ -0,0 +1,121 @@
+""" Generator obciążenia dla 'saper_server'.
+
+Każdy z '--clients' klientów otwiera własne połączenie i rozgrywa '--games'
+gier: zakłada sesję, odsłania losowe zakryte pola (czasem stawiając flagę)
+aż do wygranej lub przegranej i zamyka sesję. Na koniec wypisywana jest
+liczba żądań na sekundę oraz percentyle czasów odpowiedzi z histogramów
+'saper_instrument.Histogram'.
+
+Przykład:
+    python saper_loadgen.py --port 7070 --clients 500 --games 10
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from saper_instrument import Histogram
+from saper_logic import VISIBLE_COVERED
+from saper_server import LINE_LIMIT
+
+
+class Client:
+    """ Połączenie z serwerem wysyłające po jednym żądaniu naraz i mierzące
+    czasy odpowiedzi w histogramach według rodzaju żądania. """
+    def __init__(self, reader, writer, histograms):
+        self.reader = reader
+        self.writer = writer
+        self.histograms = histograms
+
+    @classmethod
+    async def connect(cls, histograms, host=None, port=None, path=None):
+        """ Funkcja otwierająca połączenie TCP lub przez gniazdo uniksowe. """
+        if path is not None:
+            (reader, writer) = await asyncio.open_unix_connection(path, limit=LINE_LIMIT)
+        else:
+            (reader, writer) = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+        return cls(reader, writer, histograms)
+
+    async def request(self, op, **fields):
+        """ Funkcja wysyłająca żądanie i zwracająca odpowiedź serwera. """
+        start = time.perf_counter()
+        self.writer.write(json.dumps(dict(fields, op=op)).encode() + b"\n")
+        await self.writer.drain()
+        response = json.loads(await self.reader.readline())
+        self.histograms.setdefault(op, Histogram()).add(time.perf_counter() - start)
+        return response
+
+    async def close(self):
+        """ Funkcja zamykająca połączenie. """
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def play(client, width, height, mines, rng, no_guess=False):
+    """ Funkcja rozgrywająca jedną losową grę. Zwraca prawdę przy wygranej. """
+    game = await client.request("new", width=width, height=height, mines=mines,
+                                seed=rng.getrandbits(64), no_guess=no_guess)
+    session = game["session"]
+    covered = set(range(width * height))
+    if game["start"] is not None:
+        response = await client.request("state", session=session)
+        covered -= {i for (i, value) in response["changes"] if value != VISIBLE_COVERED}
+    won = lost = False
+    while not (won or lost) and covered:
+        (y, x) = divmod(rng.choice(tuple(covered)), width)
+        op = "flag" if rng.random() < 0.1 else "uncover"
+        response = await client.request(op, session=session, x=x, y=y)
+        for (i, value) in response["changes"]:
+            if value == VISIBLE_COVERED:
+                covered.add(i)
+            else:
+                covered.discard(i)
+        (won, lost) = (response["won"], response["lost"])
+    await client.request("close", session=session)
+    return won
+
+
+async def run(args):
+    """ Funkcja uruchamiająca wszystkich klientów i zbierająca wyniki. """
+    histograms = {}
+    results = []
+
+    async def worker(n):
+        client = await Client.connect(histograms, args.host, args.port, args.unix)
+        rng = random.Random(args.seed + n)
+        for _ in range(args.games):
+            results.append(await play(client, args.width, args.height, args.mines,
+                                      rng, args.no_guess))
+        await client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    requests = sum(h.count for h in histograms.values())
+    print(f"{len(results)} games ({sum(results)} won), {requests} requests "
+          f"in {elapsed:.2f} s: {requests / elapsed:.0f} requests/s")
+    for (op, histogram) in sorted(histograms.items()):
+        print(f"{op:8} {histogram.count:8} requests, "
+              f"mean {histogram.total / histogram.count * 1000:.2f} ms, "
+              f"p50 <= {histogram.percentile(50) * 1000:.2f} ms, "
+              f"p99 <= {histogram.percentile(99) * 1000:.2f} ms")
+
+
+def main(argv=None):
+    """ Punkt wejścia wiersza poleceń generatora obciążenia. """
+    parser = argparse.ArgumentParser(description="Load test a minesweeper server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7070)
+    parser.add_argument("--unix", help="connect to this Unix socket instead of TCP")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--games", type=int, default=10, help="games per client")
+    parser.add_argument("--width", type=int, default=16)
+    parser.add_argument("--height", type=int, default=16)
+    parser.add_argument("--mines", type=int, default=40)
+    parser.add_argument("--no-guess", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+""" Silnik logiki gry, niezależny od Qt.
+
+Pakiet udostępnia:
+- 'Board', planszę w czystym Pythonie, stałe ruchów i wartości widocznych
+  oraz funkcje 'visible_value' i 'diff' (moduł 'saper_logic.board'),
+- wybór implementacji planszy w trakcie działania programu
+  ('saper_logic.backends'): 'create_board' i 'backend_class' przyjmują nazwę
+  backendu ("python", "numpy" lub "bitboard"), a bez niej korzystają ze
+  zmiennej środowiskowej SAPER_BACKEND; kolejne implementacje dodaje
+  'register_backend', a 'backend_name' zwraca nazwę backendu danej klasy,
+- 'BoardBuffers', widoki stanu dowolnej planszy w ciągłej pamięci,
+  czytelne przez memoryview bez kopiowania ('saper_logic.buffers').
+
+Każdy backend przechodzi ten sam zestaw testów zgodności
+('BackendConformance' w tests.py).
+"""
+from .board import (Board, UNCOVER, QUICK_UNCOVER, FLAG, UNFLAG, VISIBLE_COVERED,
+                    VISIBLE_FLAG, MINE_CELLS, STATE_CODES, STATE_CHARS, visible_value, diff)
+from .backends import (BACKENDS, register_backend, backend_class, backend_name,
+                       available_backends, create_board)
+from .buffers import BoardBuffers
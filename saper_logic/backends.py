@@ -0,0 +1,60 @@
+import importlib
+import os
+
+BACKENDS = {
+    "python": "saper_logic.board:Board",
+    "numpy": "saper_numpy:NumpyBoard",
+    "bitboard": "saper_bitboard:BitBoard",
+}
+BACKEND_VARIABLE = "SAPER_BACKEND"
+DEFAULT_BACKEND = "python"
+
+
+def register_backend(name, path):
+    """ Funkcja rejestrująca implementację planszy pod nazwą 'name'. Ścieżka
+    'path' ma postać 'moduł:Klasa'; moduł importowany jest dopiero przy
+    pierwszym użyciu, więc rejestracja nie ładuje zależności backendu. """
+    BACKENDS[name] = path
+
+
+def backend_class(name=None):
+    """ Funkcja zwracająca klasę planszy backendu 'name'. Bez nazwy wybierany
+    jest backend ze zmiennej środowiskowej SAPER_BACKEND, a gdy jej nie ma,
+    czysty Python. Nieznana nazwa zgłasza ValueError, a brak zależności
+    backendu (np. NumPy) ImportError. """
+    if name is None:
+        name = os.environ.get(BACKEND_VARIABLE) or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"unknown board backend {name!r}, expected one of {', '.join(BACKENDS)}")
+    (module, cls) = BACKENDS[name].split(":")
+    return getattr(importlib.import_module(module), cls)
+
+
+def backend_name(board_class):
+    """ Funkcja zwracająca nazwę, pod którą zarejestrowana jest klasa planszy
+    'board_class'. Niezarejestrowana klasa zgłasza ValueError. """
+    path = f"{board_class.__module__}:{board_class.__qualname__}"
+    for (name, registered) in BACKENDS.items():
+        if registered == path:
+            return name
+    raise ValueError(f"board class {path} is not a registered backend")
+
+
+def available_backends():
+    """ Funkcja zwracająca listę nazw backendów, których zależności są
+    zainstalowane. """
+    names = []
+    for name in BACKENDS:
+        try:
+            backend_class(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def create_board(width, height, mines, seed=None, backend=None, **options):
+    """ Funkcja tworząca planszę backendu 'backend' (wybieranego jak w
+    'backend_class'). Pozostałe argumenty ('safe', 'lazy' itd.) trafiają do
+    konstruktora planszy. """
+    return backend_class(backend)(width, height, mines, seed, **options)
@@ -0,0 +1,425 @@
+
+import random
+from array import array
+from saper_flood import flood_fill
+from saper_metrics import board_metrics
+from saper_topology import SquareGrid, grid
+
+MINE_CELLS = bytes(255) + b"\x01"
+STATE_CODES = bytes.maketrans(b"cuf", b"\x00\x01\x02")
+STATE_CHARS = bytes.maketrans(b"\x00\x01\x02", b"cuf")
+FIELDS = {(n, state): (n, state) for n in range(-1, 9) for state in "cuf"}
+
+UNCOVER = 0
+QUICK_UNCOVER = 1
+FLAG = 2
+UNFLAG = 3
+
+VISIBLE_COVERED = 9
+VISIBLE_FLAG = 10
+
+
+def visible_value(field):
+    """ Funkcja zamieniająca krotkę (liczba, stan) pola na wartość widoczną
+    dla gracza: liczbę sąsiednich min odsłoniętego pola (-1 dla miny),
+    VISIBLE_COVERED dla pola zakrytego lub VISIBLE_FLAG dla flagi. """
+    (number, state) = field
+    if state == 'u':
+        return number
+    return VISIBLE_COVERED if state == 'c' else VISIBLE_FLAG
+
+
+def diff(board, version, values=None):
+    """ Funkcja wspólna dla wszystkich plansz, wyznaczająca zmiany od wersji
+    'version' strumienia zmian planszy. Zwraca krotkę (bieżąca wersja, lista
+    par (płaski indeks, wartość widoczna)), w której każde pole występuje
+    raz, z wartością bieżącą. Dla wersji starszej niż najstarszy zachowany
+    wpis (np. po 'trim' lub 'restore') zwracana jest cała plansza. Funkcja
+    'values', zamieniająca listę indeksów na listę wartości, pozwala
+    planszy wyznaczyć je szybciej niż przez 'fields'. """
+    width = board.width
+    start = version - board.base
+    if start < 0:
+        cells = list(range(width * board.height))
+    else:
+        cells = list(dict.fromkeys(y * width + x for (x, y) in board.changes[start:]))
+    if values is None:
+        fields = board.fields
+        result = [visible_value(fields[i // width][i % width]) for i in cells]
+    else:
+        result = values(cells)
+    return (board.version, list(zip(cells, result)))
+
+
+class Board:
+    """ Klasa zajmująca się obsługą logiki gry. """
+    def __init__(self, width, height, mines, seed=None, safe=None, lazy=False,
+                 topology=SquareGrid):
+        """ Przy inicjacji losowane są miny, wypełniane liczby i liczony
+        współczynnik 3BV. Podanie ziarna 'seed' sprawia, że rozmieszczenie
+        min jest powtarzalne; bez niego ziarno jest losowane. Jeśli podano
+        pole 'safe' (x, y), ani na nim, ani na jego sąsiadach nie stanie mina.
+
+        Przy 'lazy' równym prawda miny, cyfry i 3BV (do tego czasu równe
+        None) wyznaczane są dopiero przy pierwszym odsłonięciu pola, które
+        razem z sąsiadami jest wtedy wolne od min. Zmienna 'placed' mówi,
+        czy miny zostały już rozmieszczone.
+
+        Sąsiedztwo pól opisuje obiekt 'topology' (wspólny dla wszystkich
+        plansz tego kształtu, z 'saper_topology.grid'); klasa 'topology'
+        pozwala wybrać np. 'saper_topology.TorusGrid' lub 'HexGrid'.
+
+        Obiekt utrzymuje na bieżąco liczniki:
+        - uncovered: liczba odsłoniętych pól bez min,
+        - safe_left: liczba pól bez min, które pozostały do odsłonięcia,
+        - flags: liczba postawionych flag,
+        - mines_revealed: liczba odsłoniętych min,
+        - moves: liczba udanych ruchów gracza (odsłonięć, szybkich odsłonięć,
+        postawień i zdjęć flag),
+        dzięki którym sprawdzenie wygranej i przegranej nie wymaga
+        przeglądania planszy.
+
+        Współrzędne (x, y) każdego pola, którego stan się zmienił, dopisywane
+        są do listy 'changes', tworzącej strumień zmian planszy. Wersja
+        'version' to liczba wpisów dopisanych od utworzenia planszy, a
+        'changes_since(n)' zwraca zwięzłe zmiany od wersji n, dzięki czemu
+        widok planszy synchronizuje się w czasie zależnym od liczby zmian,
+        a nie od rozmiaru planszy. Najstarsze wpisy usuwa 'trim'.
+
+        Jeśli zmienna 'log' wskazuje dziennik ruchów (np.
+        'saper_replay.MoveLog'), każdy udany ruch gracza przekazywany jest do
+        jego metody 'record(ruch, x, y)', gdzie ruch to jedna ze stałych
+        UNCOVER, QUICK_UNCOVER, FLAG, UNFLAG. """
+        self.width = width
+        self.height = height
+        self.topology = grid(width, height, topology)
+        self.seed = seed if seed is not None else random.getrandbits(64)
+        self.safe = safe
+        self.log = None
+        self.changes = []
+        self.base = 0
+        self.popped = 0
+        self.fields = [[(0, 'c')] * width for j in range(height)]
+        self.islands = 0
+        self.flags = 0
+        self.moves = 0
+        self.lost = False
+        if lazy:
+            self.mines = mines
+            self.placed = False
+            self.numbers = array('b', bytes(width * height))
+            self.uncovered = 0
+            self.safe_left = width * height - mines
+            self.mines_revealed = 0
+            self.bbbv = self.openings = self.metrics = None
+        else:
+            self.place(mines, safe)
+
+    def place(self, mines, safe=None):
+        """ Funkcja rozmieszczająca miny (z pominięciem pola 'safe' i jego
+        sąsiadów, a gdy brakuje na to miejsca, tylko pola 'safe'),
+        wypełniająca planszę cyframi i licząca 3BV. Flagi postawione przed
+        rozmieszczeniem min zostają na swoich miejscach. """
+        flagged = [(x, y) for y in range(self.height) for x in range(self.width)
+                   if self.fields[y][x][1] == 'f'] if self.flags else []
+        exclude = ()
+        if safe is not None:
+            exclude = self.around(*safe)
+            if len(set(exclude)) > self.width * self.height - mines:
+                exclude = [safe[1] * self.width + safe[0]]
+        self.place_mines(mines, exclude)
+        self.fill_with_numbers()
+        self.calc_bbbv()
+        for (x, y) in flagged:
+            self.fields[y][x] = (self.fields[y][x][0], 'f')
+        self.flags = len(flagged)
+        self.placed = True
+
+    def around(self, x, y):
+        """ Funkcja zwracająca płaskie indeksy pola o zadanych indeksach i
+        jego sąsiadów. """
+        return self.topology.block(y * self.width + x)
+
+    def place_mines(self, x, exclude=()):
+        """ Funkcja losująca pozycję min na planszy i wstawiająca je w
+        odpowiednie miejsca. Losowanie zależy wyłącznie od ziarna planszy.
+        Pola o indeksach z 'exclude' pomijane są, o ile zostaje dość miejsca
+        na wszystkie miny. """
+        self.mines = x
+        cells = range(self.width * self.height)
+        if exclude and len(cells) - len(set(exclude)) >= x:
+            exclude = set(exclude)
+            cells = [i for i in cells if i not in exclude]
+        mines = random.Random(self.seed).sample(cells, x)
+        for m in mines:
+            self.fields[m // self.width][m % self.width] = (-1, 'c')
+
+    def fill_with_numbers(self):
+        """ Funkcja wstawiająca cyfry w poszczególne pola planszy
+        zależne od ilości sąsiednich min. Liczby liczone są, dodając każdą
+        minę do jej sąsiadów, i zapamiętywane są również w płaskiej tablicy
+        'numbers' (indeks y * width + x). """
+        width = self.width
+        (kinds, deltas) = (self.topology.kinds, self.topology.deltas)
+        mines = [y * width + x for y in range(self.height)
+                 for x in range(width) if self.fields[y][x][0] == -1]
+        numbers = array('b', bytes(width * self.height))
+        for m in mines:
+            numbers[m] = -1
+        for m in mines:
+            for d in deltas[kinds[m]]:
+                if numbers[m + d] != -1:
+                    numbers[m + d] += 1
+        self.numbers = numbers
+        self.uncovered = 0
+        self.safe_left = len(numbers) - len(mines)
+        self.flags = 0
+        self.mines_revealed = 0
+        self.fields = [[(n, 'c') for n in numbers[y * width:(y + 1) * width]]
+                       for y in range(self.height)]
+
+    def get_number_of_mines(self, x, y):
+        """ Funkcja obliczająca liczbę min sąsiednich do pola o zadanych jako
+        parametry indeksach. """
+        if self.fields[y][x][0] == -1:
+            return -1
+        width = self.width
+        return sum(1 for n in self.around(x, y) if self.fields[n // width][n % width][0] == -1)
+
+    def get_number_of_flags(self, x, y):
+        """ Funkcja obliczająca liczbę pól oznaczonych flagą sąsiednich
+        do pola o indeksach zadanych jako parametry. """
+        width = self.width
+        return sum(1 for n in self.around(x, y) if self.fields[n // width][n % width][1] == 'f')
+
+    def uncover(self, x, y):
+        """ Funkcja odsłaniająca wybrane pole lub, w przypadku 0, całą wyspę.
+        W przypadku odkrycia miny ustawia zmienną 'lost' na prawdę.
+        Zwraca prawdę, gdy pole udało się odkryć i fałsz w przeciwnym
+        przypadku. """
+        if not self.reveal(x, y):
+            return False
+        self.moves += 1
+        if self.log is not None:
+            self.log.record(UNCOVER, x, y)
+        return True
+
+    def reveal(self, x, y):
+        """ Funkcja wykonująca odsłonięcie pola dla 'uncover' i
+        'quick_uncover', bez liczenia ruchu i zapisu w dzienniku. """
+        if self.fields[y][x][1] != 'c':
+            return False
+        if not self.placed:
+            self.place(self.mines, (x, y))
+
+        to_uncover = self.fields[y][x][0]
+        if to_uncover == 0:
+            self.islands += 1
+            self.uncover_island(x, y)
+            return True
+        self.fields[y][x] = (to_uncover, 'u')
+        self.changes.append((x, y))
+        if to_uncover == -1:
+            self.mines_revealed += 1
+            self.lost = True
+        else:
+            self.uncovered += 1
+            self.safe_left -= 1
+        return True
+
+    def uncover_mines(self):
+        """ Funkcja odsłaniająca wszystkie miny na planszy. """
+        for i in range(len(self.numbers)):
+            if self.numbers[i] == -1:
+                (y, x) = divmod(i, self.width)
+                if self.fields[y][x][1] != 'u':
+                    self.mines_revealed += 1
+                    self.fields[y][x] = (-1, 'u')
+                    self.changes.append((x, y))
+
+    def uncover_island(self, x, y):
+        """ Funkcja odsłaniająca wyspę: pole o zadanych indeksach, połączone
+        z nim zera oraz ich brzegi. Pola oznaczone flagą nie są odsłaniane.
+        Zwraca tablicę płaskich indeksów odsłoniętych pól. """
+        width = self.width
+        fields = self.fields
+        opened = flood_fill(width, self.height, self.numbers, y * width + x,
+                            lambda i: fields[i // width][i % width][1] == 'c',
+                            topology=self.topology)
+        changes = self.changes
+        for i in opened:
+            (row, col) = divmod(i, width)
+            fields[row][col] = (self.numbers[i], 'u')
+            changes.append((col, row))
+        self.uncovered += len(opened)
+        self.safe_left -= len(opened)
+        return opened
+
+    def quick_uncover(self, x, y):
+        """ Funkcja odkrywająca zakrytych sąsiadów pola o wskazanych indeksach,
+        jeśli liczba flag na sąsiednich polach jest równa jego liczbie
+        sąsiednich min. Zwraca prawdę, gdy odkrycie udało było możliwe i fałsz
+        w przeciwnym wypadku. """
+        if self.fields[y][x][1] != 'u':
+            return False
+        if self.fields[y][x][0] != self.get_number_of_flags(x, y):
+            return False
+
+        width = self.width
+        for n in self.around(x, y):
+            (j, i) = divmod(n, width)
+            if self.fields[j][i][1] != 'f':
+                self.reveal(i, j)
+        self.moves += 1
+        if self.log is not None:
+            self.log.record(QUICK_UNCOVER, x, y)
+        return True
+
+    def calc_bbbv(self):
+        """ Funkcja wyliczająca współczynnik 3BV planszy. Zasada obliczania
+        współczynnika jest następująca:
+        - oznacz każdą wyspę razem z jej brzegami, do rezultatu dodaj liczbę
+        wysp
+        - dodaj 1 do rezultatu dla każdego pola, które nie jest miną, ani nie
+        jest już oznaczone
+        Obliczenia wykonuje 'saper_metrics.board_metrics'; pełne miary planszy
+        zapamiętywane są w zmiennej 'metrics', a liczba wysp w 'openings'. """
+        self.metrics = board_metrics(self.width, self.height, self.numbers, self.topology)
+        self.openings = self.metrics.openings
+        self.bbbv = self.metrics.bbbv
+
+    def flag(self, x, y):
+        """ Funkcja ustawiająca flagę na polu o zadanych indeksach.
+        Zwraca prawdę, gdy operacja powiodła się oraz fałsz, gdy nie ma już
+        więcej flag do wykorzystania. """
+        if self.fields[y][x][1] == 'u':
+            return False
+
+        if self.fields[y][x][1] == 'f':
+            self.unflag(x, y)
+            return True
+
+        if self.flags >= self.mines:
+            return False
+
+        self.flags += 1
+        self.moves += 1
+        self.fields[y][x] = (self.fields[y][x][0], 'f')
+        self.changes.append((x, y))
+        if self.log is not None:
+            self.log.record(FLAG, x, y)
+        return True
+
+    def unflag(self, x, y):
+        """ Funkcja usuwająca flagę z pola o podanych indeksach. """
+        self.flags -= 1
+        self.moves += 1
+        self.fields[y][x] = (self.fields[y][x][0], 'c')
+        self.changes.append((x, y))
+        if self.log is not None:
+            self.log.record(UNFLAG, x, y)
+
+    def numbers_buffer(self):
+        """ Funkcja zwracająca tablicę 'numbers', z której
+        'saper_logic.BoardBuffers' tworzy widok bez kopiowania. """
+        return self.numbers
+
+    def mine_cells(self):
+        """ Funkcja zwracająca rozmieszczenie min jako bajty, po jednym na
+        pole (1 oznacza minę, 0 pole bez miny). """
+        return bytes(self.numbers).translate(MINE_CELLS)
+
+    def state_cells(self):
+        """ Funkcja zwracająca stany pól jako bajty, po jednym na pole:
+        0 dla pola zakrytego, 1 dla odsłoniętego i 2 dla oflagowanego. """
+        return "".join(state for row in self.fields
+                       for (n, state) in row).encode().translate(STATE_CODES)
+
+    def __getstate__(self):
+        """ Stan planszy dla pickle: zamiast listy krotek 'fields' zapisywane
+        są stany pól w formacie 'state_cells' (liczby sąsiednich min są w
+        'numbers'), co kilkukrotnie skraca przesyłanie dużej planszy między
+        procesami. """
+        state = dict(self.__dict__)
+        state["fields"] = self.state_cells()
+        return state
+
+    def __setstate__(self, state):
+        """ Odtworzenie planszy z '__getstate__'. Pola budowane są ze
+        wspólnych krotek 'FIELDS'. """
+        self.__dict__.update(state)
+        width = self.width
+        chars = state["fields"].translate(STATE_CHARS).decode()
+        numbers = self.numbers
+        self.fields = [list(map(FIELDS.__getitem__,
+                                zip(numbers[y * width:(y + 1) * width],
+                                    chars[y * width:(y + 1) * width])))
+                       for y in range(self.height)]
+
+    def restore(self, mines, states):
+        """ Funkcja odtwarzająca planszę z bajtów w formacie 'mine_cells' i
+        'state_cells'. Przy 'mines' równym None miny nie są rozmieszczane, a
+        odtwarzane są tylko flagi planszy tworzonej leniwie. Liczniki pól
+        wyliczane są na nowo; 'islands', 'moves' i 'lost' ustawia wywołujący.
+        Strumień zmian zaczyna się od nowej wersji, więc widoki pobierają
+        całą planszę. """
+        width = self.width
+        self.base = self.version + 1
+        self.changes = []
+        positions = []
+        if mines is not None:
+            self.fields = [[(0, 'c')] * width for _ in range(self.height)]
+            i = mines.find(1)
+            while i != -1:
+                self.fields[i // width][i % width] = (-1, 'c')
+                positions.append(i)
+                i = mines.find(1, i + 1)
+            self.mines = len(positions)
+            self.fill_with_numbers()
+            self.calc_bbbv()
+            self.placed = True
+        chars = states.translate(STATE_CHARS).decode()
+        numbers = self.numbers
+        self.fields = [list(zip(numbers[y * width:(y + 1) * width],
+                                chars[y * width:(y + 1) * width]))
+                       for y in range(self.height)]
+        self.flags = chars.count('f')
+        if mines is not None:
+            self.mines_revealed = sum(1 for i in positions if chars[i] == 'u')
+            self.uncovered = chars.count('u') - self.mines_revealed
+            self.safe_left = len(numbers) - self.mines - self.uncovered
+
+    @property
+    def version(self):
+        """ Bieżąca wersja strumienia zmian. """
+        return self.base + len(self.changes)
+
+    def changes_since(self, version):
+        """ Funkcja zwracająca krotkę (bieżąca wersja, lista par (płaski
+        indeks, wartość widoczna)) pól zmienionych od wersji 'version';
+        szczegóły w 'diff'. """
+        return diff(self, version)
+
+    def trim(self, version):
+        """ Funkcja usuwająca ze strumienia zmian wpisy starsze niż wersja
+        'version', np. gdy wszystkie widoki ją już pobrały. """
+        drop = min(version, self.version) - self.base
+        if drop > 0:
+            del self.changes[:drop]
+            self.base += drop
+
+    def pop_changes(self):
+        """ Funkcja zwracająca listę współrzędnych (x, y) pól zmienionych od
+        poprzedniego wywołania (całą planszę, jeśli te zmiany zostały już
+        usunięte przez 'trim' lub 'restore'). """
+        start = self.popped - self.base
+        if start < 0:
+            changes = [(x, y) for y in range(self.height) for x in range(self.width)]
+        else:
+            changes = self.changes[start:]
+        self.popped = self.version
+        return changes
+
+    def check_for_win(self):
+        """ Funkcja sprawdzająca, czy plansza nie została już rozwiązana. """
+        return self.safe_left == 0
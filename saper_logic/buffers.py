@@ -0,0 +1,53 @@
+from array import array
+from .board import VISIBLE_COVERED
+
+
+class BoardBuffers:
+    """ Widoki stanu planszy w ciągłej pamięci, do odczytu przez zewnętrzne
+    narzędzia (np. numpy.asarray) bez kopiowania.
+
+    'numbers' i 'visible' to obiekty memoryview tylko do odczytu, w formacie
+    'b' (int8) i o kształcie (height, width), wiersz po wierszu:
+    - 'numbers' to liczby sąsiednich min (-1 dla miny), wskazujące wprost
+      na pamięć planszy zwracaną przez jej metodę 'numbers_buffer',
+    - 'visible' to wartości widoczne dla gracza ('visible_value'),
+      trzymane w tablicy uaktualnianej przy każdym odczycie tylko o zmiany
+      ze strumienia zmian planszy ('changes_since'). Strumień nie jest
+      przycinany, więc widoki nie przeszkadzają innym odbiorcom zmian.
+
+    Każdy backend planszy, który ma 'numbers_buffer' i strumień zmian,
+    działa z tą klasą. Widok pobrany wcześniej pozostaje ważny po kolejnych
+    ruchach, ale po rozmieszczeniu min planszy tworzonej leniwie lub
+    'restore' widok 'numbers' należy pobrać ponownie. """
+    def __init__(self, board):
+        self.board = board
+        self.shape = (board.height, board.width)
+        self.version = -1
+        self.cells = array('b', [VISIBLE_COVERED]) * (board.width * board.height)
+        self.visible_view = memoryview(self.cells).cast('b', self.shape).toreadonly()
+        self.source = None
+        self.numbers_view = None
+
+    @property
+    def numbers(self):
+        """ Widok liczb sąsiednich min planszy. """
+        source = self.board.numbers_buffer()
+        if source is not self.source:
+            self.source = source
+            self.numbers_view = memoryview(source).cast('B').cast('b', self.shape).toreadonly()
+        return self.numbers_view
+
+    @property
+    def visible(self):
+        """ Widok wartości widocznych pól, uaktualniony do bieżącej wersji. """
+        self.sync()
+        return self.visible_view
+
+    def sync(self):
+        """ Funkcja nanosząca na tablicę 'visible' zmiany od poprzedniego
+        odczytu. Zwraca liczbę zmienionych pól. """
+        (self.version, changes) = self.board.changes_since(self.version)
+        cells = self.cells
+        for (i, value) in changes:
+            cells[i] = value
+        return len(changes)
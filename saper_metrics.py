@@ -0,0 +1,197 @@
+from array import array
+from collections import namedtuple
+from saper_topology import grid
+
+BoardMetrics = namedtuple("BoardMetrics", ["bbbv", "openings", "opening_sizes", "isolated"])
+BoardMetrics.__doc__ = """ Miary planszy: współczynnik 3BV, liczba wysp
+(otwarć), rozmiary kolejnych wysp razem z ich brzegami oraz liczba pól z
+cyframi, które nie sąsiadują z żadną wyspą. 3BV to suma liczby wysp i
+liczby takich pól. """
+
+
+def board_metrics(width, height, numbers, topology=None):
+    """ Funkcja licząca miary planszy opisanej płaską sekwencją liczb
+    sąsiednich min 'numbers' (indeks y * width + x, -1 oznacza minę).
+
+    Plansza przeglądana jest raz: każda wyspa zer etykietowana jest w
+    tablicy 'stamp' numerem wyspy, który trafia też do pól jej brzegu.
+    Pole brzegowe dzielone przez kilka wysp jest liczone w rozmiarze każdej
+    z nich. Pola, do których nie dotarła żadna wyspa, to miny i pola
+    izolowane. Sąsiedztwo pól opisuje 'topology' (jak w
+    'saper_flood.flood_fill'). """
+    if topology is None:
+        topology = grid(width, height)
+    (kinds, deltas) = (topology.kinds, topology.deltas)
+    size = width * height
+    stamp = array('i', [-1]) * size
+    sizes = []
+    for start in range(size):
+        if numbers[start] != 0 or stamp[start] != -1:
+            continue
+        opening = len(sizes)
+        stamp[start] = opening
+        count = 1
+        stack = [start]
+        while stack:
+            i = stack.pop()
+            for d in deltas[kinds[i]]:
+                n = i + d
+                if stamp[n] != opening:
+                    stamp[n] = opening
+                    count += 1
+                    if numbers[n] == 0:
+                        stack.append(n)
+        sizes.append(count)
+    isolated = stamp.count(-1) - list(numbers).count(-1)
+    return BoardMetrics(len(sizes) + isolated, len(sizes), sizes, isolated)
+
+
+def dilate(mask):
+    """ Funkcja zwracająca maskę rozszerzoną o wszystkich sąsiadów
+    zaznaczonych pól (splot z jądrem 3x3). """
+    import numpy as np
+    padded = np.pad(mask, 1)
+    rows = padded[:-2] | padded[1:-1] | padded[2:]
+    return rows[:, :-2] | rows[:, 1:-1] | rows[:, 2:]
+
+
+def label_islands(zeros):
+    """ Funkcja etykietująca spójne (w sąsiedztwie 8-kierunkowym) wyspy pól
+    zaznaczonych w masce. Każde pole wyspy dostaje indeks najmniejszego pola
+    swojej wyspy, pozostałe pola dostają rozmiar planszy.
+
+    Sąsiednie pary pól łączone są jak w strukturze find-union: korzeń o
+    większym indeksie podpinany jest pod mniejszy, a skoki po wskaźnikach
+    (parent[parent]) spłaszczają drzewa. Tablica 'parent' obejmuje tylko
+    zaznaczone pola (numerowane po kolei, więc najmniejszy numer wyspy to
+    jej najmniejsze pole). Wszystkie kroki są operacjami na całych
+    tablicach. """
+    import numpy as np
+    (height, width) = zeros.shape
+    size = zeros.size
+    dtype = np.int32 if size < 2 ** 31 - 1 else np.int64
+    index = np.arange(size, dtype=dtype).reshape(height, width)
+    first = []
+    second = []
+    for (a, b) in ((np.s_[:, :-1], np.s_[:, 1:]),
+                   (np.s_[:-1, :], np.s_[1:, :]),
+                   (np.s_[:-1, :-1], np.s_[1:, 1:]),
+                   (np.s_[:-1, 1:], np.s_[1:, :-1])):
+        both = zeros[a] & zeros[b]
+        first.append(index[a][both])
+        second.append(index[b][both])
+    cells = np.flatnonzero(zeros)
+    compact = np.empty(size, dtype=dtype)
+    compact[cells] = np.arange(cells.size, dtype=dtype)
+    first = compact[np.concatenate(first)]
+    second = compact[np.concatenate(second)]
+
+    parent = np.arange(cells.size, dtype=dtype)
+    while True:
+        roots_a = parent[first]
+        roots_b = parent[second]
+        differ = roots_a != roots_b
+        if not np.any(differ):
+            break
+        (roots_a, roots_b) = (roots_a[differ], roots_b[differ])
+        np.minimum.at(parent, np.maximum(roots_a, roots_b), np.minimum(roots_a, roots_b))
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+        (first, second) = (first[differ], second[differ])
+    labels = np.full(size, size, dtype=np.int64)
+    labels[cells] = cells[parent]
+    return labels.reshape(height, width)
+
+
+def opening_sizes(counts, labels, zeros=None):
+    """ Funkcja zwracająca pary tablic (etykieta wyspy, rozmiar wyspy razem z
+    brzegiem) dla planszy 'counts' i jej etykiet z 'label_islands'. Pole
+    brzegowe wspólne dla kilku wysp liczone jest w każdej z nich: dla
+    każdego pola z cyfrą sąsiadującego z wyspą pobierane są (po płaskich
+    indeksach) etykiety ośmiu sąsiadów, a każda etykieta różna od
+    wcześniejszych dolicza mu jedno pole brzegu. Maskę zer 'zeros' można
+    podać, jeśli została już policzona. """
+    import numpy as np
+    (height, width) = counts.shape
+    size = counts.size
+    dtype = np.int32 if size < 2 ** 31 - 1 else np.int64
+    if zeros is None:
+        zeros = counts == 0
+    padded = np.pad(labels.astype(dtype), 1, constant_values=size).ravel()
+    cells = np.flatnonzero((counts > 0) & dilate(zeros))
+    centre = cells + cells // width * 2 + width + 3
+    around = [padded[centre + dy * (width + 2) + dx]
+              for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx]
+    distinct = []
+    for (i, label) in enumerate(around):
+        new = label != size
+        for earlier in around[:i]:
+            new &= label != earlier
+        distinct.append(label[new])
+    border = np.bincount(np.concatenate(distinct), minlength=size)
+    islands = np.bincount(labels.ravel()[zeros.ravel()], minlength=size)
+    roots = np.flatnonzero(islands)
+    return (roots, islands[roots] + border[roots])
+
+
+def array_metrics(counts, labels=None):
+    """ Funkcja licząca miary planszy zapisanej w dwuwymiarowej tablicy
+    NumPy liczb sąsiednich min. Etykiety wysp można podać, jeśli zostały
+    już policzone. """
+    import numpy as np
+    zeros = counts == 0
+    if labels is None:
+        labels = label_islands(zeros)
+    (roots, sizes) = opening_sizes(counts, labels, zeros)
+    isolated = int(np.count_nonzero((counts > 0) & ~dilate(zeros)))
+    return BoardMetrics(len(roots) + isolated, len(roots), sizes.tolist(), isolated)
+
+
+def counts_from_mines(mines):
+    """ Funkcja zamieniająca tablicę NumPy min (wartości logiczne, kształt
+    (plansze, wysokość, szerokość)) na tablicę int8 liczb sąsiednich min,
+    z -1 na minach. """
+    import numpy as np
+    padded = np.pad(mines.astype(np.int8), ((0, 0), (1, 1), (1, 1)))
+    rows = padded[:, :-2] + padded[:, 1:-1] + padded[:, 2:]
+    total = rows[:, :, :-2] + rows[:, :, 1:-1] + rows[:, :, 2:]
+    return np.where(mines, np.int8(-1), total).astype(np.int8)
+
+
+def batch_metrics(counts):
+    """ Funkcja licząca miary wielu plansz naraz. Przyjmuje tablicę NumPy o
+    kształcie (plansze, wysokość, szerokość) albo, bez NumPy, listę krotek
+    (width, height, numbers). Zwraca listę 'BoardMetrics'.
+
+    W wersji NumPy plansze sklejane są w jedną wysoką planszę rozdzieloną
+    wierszami min, dzięki czemu etykietowanie i liczenie brzegów wykonuje
+    się jednym przebiegiem operacji tablicowych dla całej paczki.
+
+    NumPy importowany jest dopiero w funkcjach, które z niego korzystają,
+    żeby 'saper_logic' (używający tylko 'board_metrics') nie płacił za jego
+    import. """
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    if np is None or not isinstance(counts, np.ndarray):
+        return [board_metrics(width, height, numbers)
+                for (width, height, numbers) in counts]
+
+    (boards, height, width) = counts.shape
+    stacked = np.full((boards, height + 1, width), -1, dtype=np.int8)
+    stacked[:, :height] = counts
+    stacked = stacked.reshape(boards * (height + 1), width)
+    zeros = stacked == 0
+    labels = label_islands(zeros)
+    (roots, sizes) = opening_sizes(stacked, labels)
+    owners = roots // ((height + 1) * width)
+    openings = np.bincount(owners, minlength=boards)
+    isolated = ((stacked > 0) & ~dilate(zeros)).reshape(boards, -1).sum(axis=1)
+    bounds = np.concatenate(([0], np.cumsum(openings)))
+    return [BoardMetrics(int(openings[b] + isolated[b]), int(openings[b]),
+                         sizes[bounds[b]:bounds[b + 1]].tolist(), int(isolated[b]))
+            for b in range(boards)]
@@ -0,0 +1,113 @@
+import random
+from collections import deque
+from saper_logic import Board
+from saper_solver import Solver, visible_state
+
+
+def solvable(board, start, solver=None):
+    """ Funkcja sprawdzająca, czy planszę da się rozwiązać bez zgadywania,
+    zaczynając od odsłonięcia pola 'start' (x, y). Plansza jest przy tym
+    rozgrywana, więc po sprawdzeniu nie nadaje się już do gry.
+
+    W każdym kroku odsłaniane są wszystkie pola wskazane przez propagację
+    ograniczeń; dokładne przeglądanie rozmieszczeń uruchamiane jest dopiero
+    wtedy, gdy propagacja nie znajduje żadnego pewnego ruchu. """
+    if solver is None:
+        solver = Solver(board.width, board.height, board.mines)
+    board.uncover(*start)
+    while not board.check_for_win():
+        visible = visible_state(board)
+        safe = solver.solve(visible, exact=False).safe
+        if not safe:
+            safe = solver.solve(visible).safe
+        if not safe:
+            return False
+        for i in safe:
+            board.uncover(i % board.width, i // board.width)
+    return not board.lost
+
+
+def generate_no_guess(width, height, mines, seed=None, attempts=1000, board_class=Board):
+    """ Funkcja szukająca planszy, którą da się rozwiązać bez zgadywania.
+    Kolejne próby dostają ziarna i pola startowe wylosowane z 'seed', a miny
+    nigdy nie leżą na polu startowym ani obok niego. Zwraca krotkę
+    (ziarno, pole startowe), z której plansza odtwarzana jest wywołaniem
+    board_class(width, height, mines, ziarno, safe=pole startowe), albo
+    None, jeśli żadna z 'attempts' prób się nie powiodła. Sprawdzenie
+    odbywa się na planszy klasy 'board_class', bo backendy losują miny z
+    tego samego ziarna różnie. """
+    rng = random.Random(seed)
+    solver = Solver(width, height, mines)
+    for _ in range(attempts):
+        board_seed = rng.getrandbits(64)
+        start = (rng.randrange(width), rng.randrange(height))
+        if solvable(board_class(width, height, mines, board_seed, safe=start), start, solver):
+            return (board_seed, start)
+    return None
+
+
+class NoGuessPool:
+    """ Pula procesów generująca w tle plansze bez zgadywania.
+
+    Dla każdej konfiguracji (szerokość, wysokość, liczba min) trzymana jest
+    kolejka 'depth' zleconych lub gotowych plansz. Pobranie planszy od razu
+    zleca kolejną, więc przy zapełnionej kolejce nowa gra startuje bez
+    czekania. Procesy (i moduł 'multiprocessing', którego import jest
+    kosztowny) tworzone są przy pierwszym zleceniu. Pula to
+    'multiprocessing.Pool', bo 'shutdown' musi przerwać trwające zlecenia
+    (np. długie szukanie trudnej planszy), a nie czekać na ich koniec. """
+    def __init__(self, depth=2, processes=None):
+        self.depth = depth
+        self.processes = processes
+        self.pool = None
+        self.queues = {}
+
+    def submit(self, config):
+        """ Funkcja zlecająca wygenerowanie jednej planszy. """
+        if self.pool is None:
+            from multiprocessing import Pool
+            self.pool = Pool(self.processes)
+        (width, height, mines) = config
+        result = self.pool.apply_async(generate_no_guess, (width, height, mines,
+                                                           random.getrandbits(64)))
+        self.queues.setdefault(config, deque()).append(result)
+
+    def prefill(self, configs):
+        """ Funkcja zapełniająca kolejki podanych konfiguracji. """
+        for config in configs:
+            queue = self.queues.setdefault(config, deque())
+            for _ in range(self.depth - len(queue)):
+                self.submit(config)
+
+    def ready(self, width, height, mines):
+        """ Funkcja sprawdzająca, czy gotowa plansza czeka w kolejce. """
+        queue = self.queues.get((width, height, mines))
+        return bool(queue) and queue[0].ready()
+
+    def request(self, width, height, mines):
+        """ Funkcja pobierająca z kolejki zlecenie planszy bez zgadywania i
+        zlecająca następną. Zwraca obiekt 'multiprocessing.pool.AsyncResult',
+        którego wynikiem jest krotka (ziarno, pole startowe) albo None, gdy
+        dla tych parametrów nie udało się znaleźć planszy. Funkcja nie czeka
+        na wynik. """
+        config = (width, height, mines)
+        if not self.queues.get(config):
+            self.submit(config)
+        result = self.queues[config].popleft()
+        self.prefill([config])
+        return result
+
+    def get(self, width, height, mines):
+        """ Funkcja zwracająca krotkę (ziarno, pole startowe) planszy bez
+        zgadywania, czekając na nią, jeśli nie jest jeszcze gotowa.
+        Zwraca None, gdy dla tych parametrów nie udało się jej znaleźć. """
+        return self.request(width, height, mines).get()
+
+    def shutdown(self):
+        """ Funkcja zatrzymująca procesy puli bez czekania na zlecenia,
+        także te właśnie wykonywane. """
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+            self.queues.clear()
@@ -0,0 +1,373 @@
+import numpy as np
+from saper_flood import flood_fill
+from saper_logic import UNCOVER, QUICK_UNCOVER, FLAG, UNFLAG, VISIBLE_COVERED, VISIBLE_FLAG, diff
+from saper_metrics import array_metrics, label_islands
+
+COVERED = 0
+UNCOVERED = 1
+FLAGGED = 2
+STATE_CHARS = ('c', 'u', 'f')
+
+
+class FieldsView:
+    """ Widok tylko do odczytu udający listę list krotek (liczba, stan),
+    dzięki któremu kod korzystający z 'Board.fields' działa bez zmian. """
+    def __init__(self, board):
+        self.board = board
+
+    def __len__(self):
+        return self.board.height
+
+    def __getitem__(self, y):
+        return RowView(self.board, y)
+
+    def __iter__(self):
+        for y in range(self.board.height):
+            yield RowView(self.board, y)
+
+
+class RowView:
+    """ Pojedynczy wiersz widoku 'FieldsView'. """
+    def __init__(self, board, y):
+        self.board = board
+        self.y = y
+
+    def __len__(self):
+        return self.board.width
+
+    def __getitem__(self, x):
+        return (int(self.board.counts[self.y, x]),
+                STATE_CHARS[self.board.states[self.y, x]])
+
+    def __iter__(self):
+        for x in range(self.board.width):
+            yield self[x]
+
+
+class NumpyBoard:
+    """ Klasa zajmująca się obsługą logiki gry, przechowująca planszę w
+    tablicach NumPy: liczby sąsiednich min w tablicy int8 (-1 oznacza minę)
+    oraz stany pól w tablicy uint8. Udostępnia ten sam interfejs co
+    'saper_logic.Board', łącznie z licznikami 'uncovered', 'safe_left',
+    'flags', 'mines_revealed' i 'moves', strumieniem zmian 'changes',
+    dziennikiem ruchów 'log' oraz parametrami 'seed', 'safe' i 'lazy'. """
+    def __init__(self, width, height, mines, seed=None, safe=None, lazy=False):
+        self.width = width
+        self.height = height
+        self.seed = seed if seed is not None else int(np.random.SeedSequence().entropy % 2 ** 64)
+        self.safe = safe
+        self.log = None
+        self.changes = []
+        self.base = 0
+        self.popped = 0
+        self.counts = np.zeros((height, width), dtype=np.int8)
+        self.states = np.zeros((height, width), dtype=np.uint8)
+        self.islands = 0
+        self.flags = 0
+        self.moves = 0
+        self.lost = False
+        if lazy:
+            self.mines = mines
+            self.placed = False
+            self.uncovered = 0
+            self.safe_left = width * height - mines
+            self.mines_revealed = 0
+            self.bbbv = self.openings = self.metrics = None
+        else:
+            self.place(mines, safe)
+
+    def place(self, mines, safe=None):
+        """ Funkcja rozmieszczająca miny (z pominięciem pola 'safe' i jego
+        sąsiadów, a gdy brakuje na to miejsca, tylko pola 'safe'),
+        wypełniająca planszę cyframi i licząca 3BV. Flagi postawione przed
+        rozmieszczeniem min zostają na swoich miejscach. """
+        flagged = self.states == FLAGGED
+        exclude = ()
+        if safe is not None:
+            (x, y) = safe
+            exclude = [j * self.width + i
+                       for j in range(max(0, y - 1), min(self.height, y + 2))
+                       for i in range(max(0, x - 1), min(self.width, x + 2))]
+            if len(exclude) > self.width * self.height - mines:
+                exclude = [y * self.width + x]
+        self.place_mines(mines, exclude)
+        self.fill_with_numbers()
+        self.calc_bbbv()
+        self.states[flagged] = FLAGGED
+        self.flags = int(np.count_nonzero(flagged))
+        self.placed = True
+
+    @property
+    def fields(self):
+        """ Widok planszy zgodny z 'saper_logic.Board.fields'. """
+        return FieldsView(self)
+
+    def place_mines(self, x, exclude=()):
+        """ Funkcja losująca pozycję min na planszy i wstawiająca je w
+        odpowiednie miejsca. Pola o indeksach z 'exclude' pomijane są, o ile
+        zostaje dość miejsca na wszystkie miny. """
+        self.mines = x
+        cells = self.width * self.height
+        if len(exclude) and cells - len(set(exclude)) >= x:
+            keep = np.ones(cells, dtype=bool)
+            keep[exclude] = False
+            cells = np.flatnonzero(keep)
+        mines = np.random.default_rng(self.seed).choice(cells, x, replace=False)
+        self.counts.flat[mines] = -1
+
+    def fill_with_numbers(self):
+        """ Funkcja wstawiająca cyfry w poszczególne pola planszy. Liczby
+        sąsiednich min wyznaczane są splotem z jądrem 3x3, rozbitym na sumę
+        wierszową i kolumnową. """
+        mines = self.counts == -1
+        padded = np.pad(mines.astype(np.int8), 1)
+        rows = padded[:-2] + padded[1:-1] + padded[2:]
+        total = rows[:, :-2] + rows[:, 1:-1] + rows[:, 2:]
+        self.counts = np.where(mines, np.int8(-1), total).astype(np.int8)
+        self.states[:] = COVERED
+        self.uncovered = 0
+        self.safe_left = self.counts.size - int(np.count_nonzero(mines))
+        self.flags = 0
+        self.mines_revealed = 0
+
+    def get_number_of_mines(self, x, y):
+        """ Funkcja obliczająca liczbę min sąsiednich do pola o zadanych jako
+        parametry indeksach. """
+        if self.counts[y, x] == -1:
+            return -1
+        window = self.counts[max(0, y - 1):y + 2, max(0, x - 1):x + 2]
+        return int(np.count_nonzero(window == -1))
+
+    def get_number_of_flags(self, x, y):
+        """ Funkcja obliczająca liczbę pól oznaczonych flagą sąsiednich
+        do pola o indeksach zadanych jako parametry. """
+        window = self.states[max(0, y - 1):y + 2, max(0, x - 1):x + 2]
+        return int(np.count_nonzero(window == FLAGGED))
+
+    def uncover(self, x, y):
+        """ Funkcja odsłaniająca wybrane pole lub, w przypadku 0, całą wyspę.
+        W przypadku odkrycia miny ustawia zmienną 'lost' na prawdę.
+        Zwraca prawdę, gdy pole udało się odkryć i fałsz w przeciwnym
+        przypadku. """
+        if not self.reveal(x, y):
+            return False
+        self.moves += 1
+        if self.log is not None:
+            self.log.record(UNCOVER, x, y)
+        return True
+
+    def reveal(self, x, y):
+        """ Funkcja wykonująca odsłonięcie pola dla 'uncover' i
+        'quick_uncover', bez liczenia ruchu i zapisu w dzienniku. """
+        if self.states[y, x] != COVERED:
+            return False
+        if not self.placed:
+            self.place(self.mines, (x, y))
+
+        to_uncover = self.counts[y, x]
+        if to_uncover == 0:
+            self.islands += 1
+            self.uncover_island(x, y)
+            return True
+        self.states[y, x] = UNCOVERED
+        self.changes.append((x, y))
+        if to_uncover == -1:
+            self.mines_revealed += 1
+            self.lost = True
+        else:
+            self.uncovered += 1
+            self.safe_left -= 1
+        return True
+
+    def uncover_mines(self):
+        """ Funkcja odsłaniająca wszystkie miny na planszy. """
+        hidden = (self.counts == -1) & (self.states != UNCOVERED)
+        self.mines_revealed += int(np.count_nonzero(hidden))
+        self.states[hidden] = UNCOVERED
+        self.add_changes(hidden)
+
+    def uncover_island(self, x, y):
+        """ Funkcja odsłaniająca wyspę zaczynającą się w polu o zadanych
+        indeksach. Odsłonięte zostają zera połączone z tym polem oraz ich
+        brzegi. Wyspa wyznaczana jest z etykiet policzonych w 'calc_bbbv'
+        (zera wyspy to jej przedział w 'island_cells', więc koszt zależy od
+        rozmiaru wyspy, a nie planszy); jeśli na wyspie stoją flagi, które mogłyby ją przeciąć, wyspa
+        wyznaczana jest przez 'saper_flood.flood_fill'. """
+        width = self.width
+        root = self.labels[y, x]
+        cells = self.island_cells[np.searchsorted(self.island_keys, root, "left"):
+                                  np.searchsorted(self.island_keys, root, "right")]
+        states = self.states.ravel()
+        if not np.any(states[cells] == FLAGGED):
+            (ys, xs) = np.divmod(cells, width)
+            block = np.unique(np.concatenate(
+                [np.clip(ys + dy, 0, self.height - 1) * width + np.clip(xs + dx, 0, width - 1)
+                 for dy in (-1, 0, 1) for dx in (-1, 0, 1)]))
+            opened = block[states[block] == COVERED]
+            states[opened] = UNCOVERED
+            self.add_cells(opened)
+            self.uncovered += len(opened)
+            self.safe_left -= len(opened)
+            return
+
+        opened = flood_fill(self.width, self.height, self.counts.ravel(),
+                            y * self.width + x,
+                            lambda i: states[i] == COVERED)
+        states[np.frombuffer(opened, dtype=np.int32)] = UNCOVERED
+        self.changes.extend((i % self.width, i // self.width) for i in opened)
+        self.uncovered += len(opened)
+        self.safe_left -= len(opened)
+
+    def quick_uncover(self, x, y):
+        """ Funkcja odkrywająca zakrytych sąsiadów pola o wskazanych indeksach,
+        jeśli liczba flag na sąsiednich polach jest równa jego liczbie
+        sąsiednich min. Zwraca prawdę, gdy odkrycie było możliwe i fałsz
+        w przeciwnym wypadku. """
+        if self.states[y, x] != UNCOVERED:
+            return False
+        if self.counts[y, x] != self.get_number_of_flags(x, y):
+            return False
+
+        for i in range(max(-1, -y), min(2, self.height - y)):
+            for j in range(max(-1, -x), min(2, self.width - x)):
+                if self.states[y + i, x + j] != FLAGGED:
+                    self.reveal(x + j, y + i)
+        self.moves += 1
+        if self.log is not None:
+            self.log.record(QUICK_UNCOVER, x, y)
+        return True
+
+    def calc_bbbv(self):
+        """ Funkcja wyliczająca współczynnik 3BV planszy przez
+        'saper_metrics.array_metrics'. Przy okazji zapamiętuje etykiety wysp
+        w 'labels', pełne miary planszy w 'metrics' oraz płaskie indeksy zer
+        'island_cells' posortowane według etykiet wysp 'island_keys'. """
+        zeros = self.counts == 0
+        self.labels = label_islands(zeros)
+        cells = np.flatnonzero(zeros)
+        keys = self.labels.ravel()[cells]
+        order = np.argsort(keys, kind="stable")
+        (self.island_cells, self.island_keys) = (cells[order], keys[order])
+        self.metrics = array_metrics(self.counts, self.labels)
+        self.openings = self.metrics.openings
+        self.bbbv = self.metrics.bbbv
+
+    def flag(self, x, y):
+        """ Funkcja ustawiająca flagę na polu o zadanych indeksach.
+        Zwraca prawdę, gdy operacja powiodła się oraz fałsz, gdy nie ma już
+        więcej flag do wykorzystania. """
+        if self.states[y, x] == UNCOVERED:
+            return False
+
+        if self.states[y, x] == FLAGGED:
+            self.unflag(x, y)
+            return True
+
+        if self.flags >= self.mines:
+            return False
+
+        self.flags += 1
+        self.moves += 1
+        self.states[y, x] = FLAGGED
+        self.changes.append((x, y))
+        if self.log is not None:
+            self.log.record(FLAG, x, y)
+        return True
+
+    def unflag(self, x, y):
+        """ Funkcja usuwająca flagę z pola o podanych indeksach. """
+        self.flags -= 1
+        self.moves += 1
+        self.states[y, x] = COVERED
+        self.changes.append((x, y))
+        if self.log is not None:
+            self.log.record(UNFLAG, x, y)
+
+    def numbers_buffer(self):
+        """ Funkcja zwracająca tablicę 'counts' (ciągłą, int8), z której
+        'saper_logic.BoardBuffers' tworzy widok bez kopiowania. """
+        return self.counts
+
+    def mine_cells(self):
+        """ Funkcja zwracająca rozmieszczenie min jako bajty, po jednym na
+        pole, w formacie 'saper_logic.Board.mine_cells'. """
+        return (self.counts == -1).tobytes()
+
+    def state_cells(self):
+        """ Funkcja zwracająca stany pól jako bajty, po jednym na pole, w
+        formacie 'saper_logic.Board.state_cells'. """
+        return self.states.tobytes()
+
+    def restore(self, mines, states):
+        """ Funkcja odtwarzająca planszę z bajtów w formacie 'mine_cells' i
+        'state_cells', odpowiednik 'saper_logic.Board.restore'. Bajty
+        zamieniane są na tablice bez przeglądania pojedynczych pól. """
+        shape = (self.height, self.width)
+        self.base = self.version + 1
+        self.changes = []
+        if mines is not None:
+            mask = np.frombuffer(mines, dtype=bool).reshape(shape)
+            self.counts = np.where(mask, np.int8(-1), np.int8(0))
+            self.mines = int(np.count_nonzero(mask))
+            self.fill_with_numbers()
+            self.calc_bbbv()
+            self.placed = True
+        self.states = np.frombuffer(states, dtype=np.uint8).reshape(shape).copy()
+        self.flags = int(np.count_nonzero(self.states == FLAGGED))
+        if mines is not None:
+            opened = self.states == UNCOVERED
+            self.mines_revealed = int(np.count_nonzero(opened & mask))
+            self.uncovered = int(np.count_nonzero(opened)) - self.mines_revealed
+            self.safe_left = self.counts.size - self.mines - self.uncovered
+
+    def add_changes(self, mask):
+        """ Funkcja dopisująca do listy 'changes' pola zaznaczone w masce. """
+        self.add_cells(np.flatnonzero(mask))
+
+    def add_cells(self, cells):
+        """ Funkcja dopisująca do listy 'changes' pola o płaskich indeksach
+        'cells'. """
+        (ys, xs) = np.divmod(cells, self.width)
+        self.changes.extend(zip(xs.tolist(), ys.tolist()))
+
+    def visible_values(self, cells):
+        """ Funkcja zwracająca wartości widoczne pól o płaskich indeksach
+        'cells', wyznaczane na tablicach bez przeglądania pól w Pythonie. """
+        cells = np.array(cells, dtype=np.int64)
+        states = self.states.ravel()[cells]
+        values = np.where(states == FLAGGED, VISIBLE_FLAG, VISIBLE_COVERED)
+        return np.where(states == UNCOVERED, self.counts.ravel()[cells], values).tolist()
+
+    @property
+    def version(self):
+        """ Bieżąca wersja strumienia zmian, jak w 'saper_logic.Board'. """
+        return self.base + len(self.changes)
+
+    def changes_since(self, version):
+        """ Funkcja zwracająca zmiany od wersji 'version', jak
+        'saper_logic.Board.changes_since'. Wartości pól liczone są przez 'visible_values'. """
+        return diff(self, version, self.visible_values)
+
+    def trim(self, version):
+        """ Funkcja usuwająca ze strumienia zmian wpisy starsze niż wersja
+        'version'. """
+        drop = min(version, self.version) - self.base
+        if drop > 0:
+            del self.changes[:drop]
+            self.base += drop
+
+    def pop_changes(self):
+        """ Funkcja zwracająca listę współrzędnych (x, y) pól zmienionych od
+        poprzedniego wywołania (całą planszę, jeśli te zmiany zostały już
+        usunięte przez 'trim' lub 'restore'). """
+        start = self.popped - self.base
+        if start < 0:
+            changes = [(x, y) for y in range(self.height) for x in range(self.width)]
+        else:
+            changes = self.changes[start:]
+        self.popped = self.version
+        return changes
+
+    def check_for_win(self):
+        """ Funkcja sprawdzająca, czy plansza nie została już rozwiązana. """
+        return self.safe_left == 0
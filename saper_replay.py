@@ -0,0 +1,279 @@
+import argparse
+import datetime as dt
+import os
+import struct
+import time
+from collections import namedtuple
+import saper_format
+from saper_logic import UNCOVER, QUICK_UNCOVER, FLAG, UNFLAG, backend_class, backend_name
+
+MAGIC = b"SAPL"
+VERSION = 2
+HEADER = struct.Struct("<4sBBHIIIQiid")
+RECORD = struct.Struct("<II")
+LAZY = 1
+
+Move = namedtuple("Move", ["time", "action", "x", "y"])
+Move.__doc__ = """ Ruch z dziennika: czas w milisekundach od utworzenia
+dziennika, rodzaj ruchu (stała z 'saper_logic') i współrzędne pola. """
+
+Audit = namedtuple("Audit", ["valid", "won", "moves", "time", "bbbv", "reason"])
+Audit.__doc__ = """ Wynik sprawdzenia dziennika: czy wszystkie ruchy były
+możliwe, czy gra została wygrana, liczba ruchów, czas gry w milisekundach
+od pierwszego do ostatniego ruchu, 3BV planszy oraz opis pierwszego
+błędu (None dla poprawnego dziennika). """
+
+
+class MoveLog:
+    """ Dziennik ruchów gry, do którego można tylko dopisywać.
+
+    Nagłówek 'HEADER' zawiera parametry planszy potrzebne do jej
+    odtworzenia (wymiary, liczba min, ziarno, pole 'safe' lub (-1, -1) i bit
+    LAZY) oraz czas rozpoczęcia gry, a za nim zapisana jest nazwa backendu
+    planszy ('backend', długość w polu nagłówka), bo backendy losują miny z
+    tego samego ziarna różnie. Dziennik w wersji 1 nie ma nazwy backendu i
+    odtwarzany jest na 'saper_logic.Board'. Każdy ruch zajmuje 8 bajtów: czas w
+    milisekundach i płaski indeks pola przesunięty o 2 bity, w których
+    zapisany jest rodzaj ruchu. Jeśli podano otwarty plik 'file', nagłówek
+    i kolejne ruchy dopisywane są do niego na bieżąco. """
+    def __init__(self, width, height, mines, seed, safe=None, lazy=False,
+                 started=None, file=None, backend="python"):
+        self.width = width
+        self.height = height
+        self.mines = mines
+        self.seed = seed
+        self.safe = safe
+        self.lazy = lazy
+        self.backend = backend
+        self.started = started if started is not None else time.time()
+        self.clock = time.monotonic()
+        self.data = bytearray()
+        self.file = file
+        if file is not None:
+            file.write(self.header())
+
+    def header(self):
+        """ Funkcja zwracająca spakowany nagłówek dziennika. """
+        (x, y) = self.safe if self.safe is not None else (-1, -1)
+        name = self.backend.encode()
+        return HEADER.pack(MAGIC, VERSION, LAZY if self.lazy else 0, len(name),
+                           self.width, self.height, self.mines, self.seed,
+                           x, y, self.started) + name
+
+    def record(self, action, x, y):
+        """ Funkcja dopisująca ruch do dziennika. Wywoływana przez planszę. """
+        record = RECORD.pack(int((time.monotonic() - self.clock) * 1000),
+                             (y * self.width + x) << 2 | action)
+        self.data += record
+        if self.file is not None:
+            self.file.write(record)
+
+    def __len__(self):
+        return len(self.data) // RECORD.size
+
+    def __iter__(self):
+        width = self.width
+        for (ms, code) in RECORD.iter_unpack(self.data):
+            (y, x) = divmod(code >> 2, width)
+            yield Move(ms, code & 3, x, y)
+
+    def board(self, board_class=None):
+        """ Funkcja tworząca planszę w stanie sprzed pierwszego ruchu, domyślnie
+        klasy backendu zapisanego w dzienniku. """
+        if board_class is None:
+            board_class = backend_class(self.backend)
+        return board_class(self.width, self.height, self.mines, self.seed,
+                           safe=self.safe, lazy=self.lazy)
+
+    def dumps(self):
+        """ Funkcja zwracająca cały dziennik jako bajty. """
+        return self.header() + self.data
+
+
+def attach(board, file=None):
+    """ Funkcja tworząca dziennik dla planszy, na której nie wykonano
+    jeszcze żadnego ruchu, i podpinająca go pod zmienną 'log' planszy.
+    Klasa planszy musi być zarejestrowanym backendem ('backend_name'). """
+    if board.moves:
+        raise ValueError("board already has moves")
+    board.log = MoveLog(board.width, board.height, board.mines, board.seed,
+                        board.safe, not board.placed, file=file,
+                        backend=backend_name(type(board)))
+    return board.log
+
+
+def loads(data):
+    """ Funkcja odczytująca dziennik z bajtów. Niepełny ostatni ruch (np. po
+    przerwanym zapisie) jest pomijany. """
+    data = memoryview(data)
+    if len(data) < HEADER.size:
+        raise ValueError("truncated move log")
+    (magic, version, flags, length, width, height, mines, seed, x, y, started) = \
+        HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not a move log")
+    if version not in (1, VERSION):
+        raise ValueError(f"unsupported move log version {version}")
+    start = HEADER.size
+    backend = "python"
+    if version == VERSION:
+        start += length
+        if len(data) < start:
+            raise ValueError("truncated move log")
+        backend = bytes(data[HEADER.size:start]).decode()
+    log = MoveLog(width, height, mines, seed, (x, y) if x >= 0 else None,
+                  bool(flags & LAZY), started, backend=backend)
+    end = start + (len(data) - start) // RECORD.size * RECORD.size
+    log.data[:] = data[start:end]
+    return log
+
+
+def load(path):
+    """ Funkcja wczytująca dziennik z pliku. """
+    with open(path, "rb") as file:
+        return loads(file.read())
+
+
+def save(log, directory="./replays"):
+    """ Funkcja zapisująca dziennik w katalogu 'directory' pod nazwą
+    utworzoną z czasu rozpoczęcia gry. Zwraca ścieżkę pliku. """
+    os.makedirs(directory, exist_ok=True)
+    name = dt.datetime.fromtimestamp(log.started).strftime("%Y-%m-%d_%H-%M-%S-%f")
+    path = os.path.join(directory, f"{name}.sapl")
+    with open(path, "wb") as file:
+        file.write(log.dumps())
+    return path
+
+
+def apply(board, move):
+    """ Funkcja wykonująca ruch z dziennika na planszy. Zwraca prawdę, gdy
+    ruch był możliwy, i fałsz w przeciwnym przypadku. """
+    (_, action, x, y) = move
+    if action == UNCOVER:
+        return board.uncover(x, y)
+    if action == QUICK_UNCOVER:
+        return board.quick_uncover(x, y)
+    state = board.fields[y][x][1]
+    if action == FLAG:
+        return state == 'c' and board.flag(x, y)
+    return state == 'f' and board.flag(x, y)
+
+
+def replay(log, board_class=None):
+    """ Funkcja odtwarzająca cały dziennik bez GUI, domyślnie na backendzie
+    zapisanym w dzienniku. Zwraca planszę w stanie po ostatnim ruchu. """
+    board = log.board(board_class)
+    for move in log:
+        apply(board, move)
+    return board
+
+
+def audit(log, claimed=None, board_class=None):
+    """ Funkcja sprawdzająca, czy dziennik opisuje poprawną grę: ruchy
+    mieszczą się na planszy, czasy nie maleją, każdy ruch był możliwy i
+    żaden nie nastąpił po końcu gry. Podanie 'claimed', czasu gry w
+    sekundach zgłoszonego z wynikiem, sprawdza też, czy nie jest on krótszy
+    od czasu zapisanego w dzienniku. Plansza domyślnie tworzona jest przez
+    backend zapisany w dzienniku. Zwraca obiekt 'Audit'. """
+    board = log.board(board_class)
+    size = log.width * log.height
+    (first, last) = (None, 0)
+    for (i, (ms, code)) in enumerate(RECORD.iter_unpack(log.data)):
+        reason = None
+        if code >> 2 >= size:
+            reason = f"move {i} is outside the board"
+        elif ms < last:
+            reason = f"time goes back at move {i}"
+        elif board.lost or board.check_for_win():
+            reason = f"move {i} is after the end of the game"
+        else:
+            (y, x) = divmod(code >> 2, log.width)
+            if not apply(board, (ms, code & 3, x, y)):
+                reason = f"move {i} is not possible"
+        if reason is not None:
+            return Audit(False, False, i, last - (first or 0), board.bbbv, reason)
+        if first is None:
+            first = ms
+        last = ms
+    duration = last - (first or 0)
+    if claimed is not None and claimed * 1000 + 1000 < duration:
+        return Audit(False, False, len(log), duration, board.bbbv,
+                     "claimed time is shorter than the recorded game")
+    return Audit(True, board.check_for_win(), len(log), duration, board.bbbv, None)
+
+
+class Replay:
+    """ Odtwarzacz dziennika z szybkim przewijaniem.
+
+    Przy tworzeniu dziennik odtwarzany jest raz, a co 'interval' ruchów
+    zapamiętywana jest migawka planszy w formacie 'saper_format'. Przejście
+    do dowolnego ruchu wczytuje najbliższą wcześniejszą migawkę i wykonuje
+    najwyżej 'interval' - 1 ruchów. """
+    def __init__(self, log, interval=64, board_class=None):
+        self.log = log
+        self.moves = list(log)
+        self.interval = interval
+        board = log.board(board_class)
+        self.board_class = type(board)
+        self.snapshots = [saper_format.dumps(board)]
+        for (i, move) in enumerate(self.moves, 1):
+            apply(board, move)
+            if i % interval == 0:
+                self.snapshots.append(saper_format.dumps(board))
+
+    def __len__(self):
+        return len(self.moves)
+
+    def seek(self, n):
+        """ Funkcja zwracająca nową planszę w stanie po 'n' pierwszych
+        ruchach. """
+        n = max(0, min(n, len(self.moves)))
+        k = n // self.interval
+        (board, _) = saper_format.loads(self.snapshots[k], self.board_class)
+        for move in self.moves[k * self.interval:n]:
+            apply(board, move)
+        return board
+
+
+def audit_file(path):
+    """ Funkcja wykonywana w procesie roboczym: sprawdza dziennik z pliku. """
+    try:
+        return (path, audit(load(path)))
+    except (OSError, ValueError, ImportError) as error:
+        return (path, Audit(False, False, 0, 0, None, str(error)))
+
+
+def audit_files(paths, processes=None):
+    """ Generator sprawdzający dzienniki z wielu plików na puli procesów.
+    Zwraca pary (ścieżka, 'Audit') w kolejności plików. """
+    from multiprocessing import Pool
+    with Pool(processes) as pool:
+        yield from pool.imap(audit_file, paths, chunksize=64)
+
+
+def main(argv=None):
+    """ Punkt wejścia wiersza poleceń sprawdzającego dzienniki gier. """
+    parser = argparse.ArgumentParser(
+        description="Audit recorded minesweeper games.")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="number of worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    invalid = 0
+    for (path, result) in audit_files(args.files, args.processes):
+        if not result.valid:
+            invalid += 1
+            print(f"{path}: INVALID: {result.reason}")
+        elif result.won and result.time:
+            print(f"{path}: won, 3BV/s {result.bbbv / result.time * 1000:.3f}")
+        else:
+            print(f"{path}: {'won' if result.won else 'not won'}")
+    elapsed = time.perf_counter() - start
+    print(f"{len(args.files)} games, {invalid} invalid, "
+          f"{len(args.files) / elapsed:.0f} games/s")
+
+
+if __name__ == "__main__":
+    main()
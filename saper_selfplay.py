@@ -0,0 +1,332 @@
+""" Symulacja gier rozgrywanych przez automatycznego gracza, służąca do
+kalibracji poziomów trudności.
+
+Dla każdej konfiguracji (szerokość, wysokość, liczba min) rozgrywana jest
+zadana liczba gier na planszach 'saper_logic.Board'. Gracz odsłania
+najpierw środek planszy (pierwsze odsłonięcie jest zawsze bezpieczne), a
+potem pola wskazane przez 'saper_solver.Solver'. Gdy żadne pole nie jest
+pewne, zgaduje pole o najmniejszym prawdopodobieństwie miny. Każde takie
+odsłonięcie liczy się jako wymuszone zgadnięcie.
+
+Gry dzielone są na paczki rozdzielane na pulę procesów. Ziarno gry numer i
+to 'saper_generate.board_seed(seed, i)', więc wyniki nie zależą od
+liczby procesów ani od kolejności paczek. Stan symulacji można zapisywać
+do pliku kontrolnego (opcja '--checkpoint'). Ponowne uruchomienie z tym
+samym plikiem pomija paczki już policzone. W trakcie pracy co
+'--interval' sekund wypisywane jest podsumowanie każdej konfiguracji:
+odsetek wygranych, odsetek gier bez zgadywania, liczba zgadnięć, rozkład
+3BV i czas gry.
+
+Przykład:
+    python saper_selfplay.py --config 30x16x99 --games 1000000 \\
+        --checkpoint expert.json
+    python saper_selfplay.py --size 16x16 --size 30x16 \\
+        --density 0.12 --density 0.16 --density 0.2 --games 10000
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from collections import Counter
+from multiprocessing import Pool
+from saper_logic import Board
+from saper_solver import Solver, hint
+from saper_generate import board_seed
+from saper_instrument import Histogram
+
+DEFAULT_CONFIGS = [(8, 8, 10), (16, 16, 40), (30, 16, 99)]
+
+
+def play(width, height, mines, seed, solver=None):
+    """ Funkcja rozgrywająca jedną grę automatycznym graczem. Solver
+    śledzi grę przyrostowo przez strumień zmian planszy. Najpierw
+    sprawdzana jest sama propagacja ograniczeń, a dokładne przeglądanie
+    rozmieszczeń uruchamiane jest tylko wtedy, gdy propagacja nie znajduje
+    ruchu. Zwraca krotkę (wygrana, liczba wymuszonych zgadnięć, 3BV, czas
+    gry w sekundach). """
+    start = time.perf_counter()
+    if solver is None:
+        solver = Solver(width, height, mines)
+    solver.reset()
+    board = Board(width, height, mines, seed, lazy=True)
+    board.uncover(width // 2, height // 2)
+    version = 0
+    guesses = 0
+    while not board.lost and not board.check_for_win():
+        (version, changes) = board.changes_since(version)
+        board.trim(version)
+        solver.update(changes)
+        solution = solver.solve_current(exact=False)
+        if not solution.safe:
+            solution = solver.solve_current()
+        if solution.safe:
+            cells = solution.safe
+        else:
+            guesses += 1
+            cells = [hint(solution)]
+        for i in cells:
+            board.uncover(i % width, i // width)
+    return (not board.lost, guesses, board.bbbv, time.perf_counter() - start)
+
+
+def percentile(counter, p):
+    """ Funkcja zwracająca percentyl 'p' wartości zliczonych w 'counter'. """
+    total = sum(counter.values())
+    seen = 0
+    for value in sorted(counter):
+        seen += counter[value]
+        if seen * 100 >= p * total:
+            return value
+    return None
+
+
+class Stats:
+    """ Zbiorcze wyniki gier jednej konfiguracji: liczba gier i wygranych,
+    rozkłady liczby zgadnięć i 3BV (wartość -> liczba gier) oraz histogram
+    czasów gry. Wyniki paczek łączone są przez 'merge', więc kolejność ich
+    nadejścia nie ma znaczenia. """
+    def __init__(self):
+        self.games = 0
+        self.wins = 0
+        self.guesses = Counter()
+        self.bbbv = Counter()
+        self.time = Histogram()
+
+    def add(self, won, guesses, bbbv, seconds):
+        """ Funkcja dopisująca wynik jednej gry z 'play'. """
+        self.games += 1
+        self.wins += won
+        self.guesses[guesses] += 1
+        self.bbbv[bbbv] += 1
+        self.time.add(seconds)
+
+    def merge(self, other):
+        """ Funkcja dodająca wyniki innego obiektu 'Stats'. """
+        self.games += other.games
+        self.wins += other.wins
+        self.guesses.update(other.guesses)
+        self.bbbv.update(other.bbbv)
+        self.time.merge(other.time)
+
+    def to_dict(self):
+        """ Funkcja zwracająca wyniki jako słownik gotowy do zapisu w JSON-ie. """
+        return {"games": self.games, "wins": self.wins,
+                "guesses": {str(k): n for (k, n) in sorted(self.guesses.items())},
+                "bbbv": {str(k): n for (k, n) in sorted(self.bbbv.items())},
+                "time": self.time.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        """ Funkcja odtwarzająca wyniki ze słownika z 'to_dict'. """
+        stats = cls()
+        (stats.games, stats.wins) = (data["games"], data["wins"])
+        stats.guesses = Counter({int(k): n for (k, n) in data["guesses"].items()})
+        stats.bbbv = Counter({int(k): n for (k, n) in data["bbbv"].items()})
+        stats.time = Histogram.from_dict(data["time"])
+        return stats
+
+    def summary(self):
+        """ Funkcja zwracająca podsumowanie wyników: odsetek wygranych i gier
+        bez zgadywania, średnią liczbę zgadnięć, rozkład 3BV oraz czasy gry
+        (w sekundach). """
+        if not self.games:
+            return {"games": 0}
+        return {"games": self.games, "win_rate": self.wins / self.games,
+                "no_guess_rate": self.guesses[0] / self.games,
+                "guesses_mean": sum(k * n for (k, n) in self.guesses.items()) / self.games,
+                "guesses_p90": percentile(self.guesses, 90),
+                "bbbv_mean": sum(k * n for (k, n) in self.bbbv.items()) / self.games,
+                "bbbv_p10": percentile(self.bbbv, 10), "bbbv_p50": percentile(self.bbbv, 50),
+                "bbbv_p90": percentile(self.bbbv, 90),
+                "time_mean": self.time.total / self.games,
+                "time_p50": self.time.percentile(50), "time_p99": self.time.percentile(99)}
+
+
+def simulate_chunk(task):
+    """ Funkcja wykonywana w procesie roboczym: rozgrywa gry o numerach z
+    przedziału [start, stop) paczki 'chunk' konfiguracji z krotki 'task'.
+    Zwraca krotkę (konfiguracja, paczka, stop, 'Stats'). """
+    (config, seed, chunk, start, stop) = task
+    (width, height, mines) = config
+    solver = Solver(width, height, mines)
+    stats = Stats()
+    for i in range(start, stop):
+        stats.add(*play(width, height, mines, board_seed(seed, i), solver))
+    return (config, chunk, stop, stats)
+
+
+def config_key(config):
+    """ Funkcja zamieniająca konfigurację na napis 'WxHxM'. """
+    return "x".join(map(str, config))
+
+
+class Simulation:
+    """ Stan symulacji: wyniki każdej konfiguracji i, dla każdej paczki
+    (numeru jej pierwszej gry), numer gry, do której została policzona.
+    Dzięki temu zwiększenie liczby gier przy wznowieniu dokańcza paczkę
+    przyciętą wcześniej do mniejszej liczby gier. Stan zapisywany jest do
+    pliku kontrolnego przez 'save' i odczytywany przez 'load'. Plik
+    nadpisywany jest atomowo, więc przerwanie w trakcie zapisu nie psuje
+    poprzedniego stanu. """
+    def __init__(self, configs, games, seed=0, chunk_size=256):
+        self.configs = list(configs)
+        self.games = games
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.stats = {config: Stats() for config in self.configs}
+        self.done = {config: {} for config in self.configs}
+
+    def tasks(self):
+        """ Funkcja zwracająca listę niepoliczonych paczek. Kolejne paczki
+        należą na zmianę do kolejnych konfiguracji, więc wszystkie
+        konfiguracje postępują równo. """
+        tasks = []
+        for chunk in range(0, self.games, self.chunk_size):
+            stop = min(self.games, chunk + self.chunk_size)
+            for config in self.configs:
+                start = self.done[config].get(chunk, chunk)
+                if start < stop:
+                    tasks.append((config, self.seed, chunk, start, stop))
+        return tasks
+
+    def add(self, config, chunk, stop, stats):
+        """ Funkcja dopisująca wynik paczki z 'simulate_chunk'. """
+        self.stats[config].merge(stats)
+        self.done[config][chunk] = stop
+
+    def run(self, processes=None):
+        """ Generator rozgrywający niepoliczone paczki w puli 'processes'
+        procesów (przy jednym procesie w bieżącym) i zwracający
+        konfigurację po dopisaniu wyniku każdej paczki. """
+        tasks = self.tasks()
+        if processes == 1:
+            results = map(simulate_chunk, tasks)
+        else:
+            pool = Pool(processes)
+            results = pool.imap_unordered(simulate_chunk, tasks)
+        try:
+            for (config, chunk, stop, stats) in results:
+                self.add(config, chunk, stop, stats)
+                yield config
+        finally:
+            if processes != 1:
+                pool.terminate()
+
+    def save(self, path):
+        """ Funkcja zapisująca stan symulacji do pliku kontrolnego. """
+        data = {"seed": self.seed, "chunk_size": self.chunk_size,
+                "configs": {config_key(c): {"done": sorted(self.done[c].items()),
+                                            "stats": self.stats[c].to_dict()}
+                            for c in self.configs}}
+        with open(path + ".tmp", "w") as file:
+            json.dump(data, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(path + ".tmp", path)
+
+    def load(self, path):
+        """ Funkcja wczytująca stan zapisany przez 'save'. Wczytywane są
+        tylko konfiguracje tej symulacji; paczki policzone dla większej
+        liczby gier, niż zlecona teraz, pozostają w wynikach. """
+        with open(path) as file:
+            data = json.load(file)
+        if (data["seed"], data["chunk_size"]) != (self.seed, self.chunk_size):
+            raise ValueError("checkpoint was written with a different seed or chunk size")
+        for config in self.configs:
+            saved = data["configs"].get(config_key(config))
+            if saved is not None:
+                self.stats[config] = Stats.from_dict(saved["stats"])
+                self.done[config] = dict(saved["done"])
+
+
+def format_summary(config, summary):
+    """ Funkcja zwracająca jednowierszowe podsumowanie konfiguracji. """
+    if not summary["games"]:
+        return f"{config_key(config):>12}: no games yet"
+    return (f"{config_key(config):>12}: {summary['games']:8} games, "
+            f"win {summary['win_rate']:6.1%}, no guess {summary['no_guess_rate']:6.1%}, "
+            f"guesses {summary['guesses_mean']:5.2f} (p90 {summary['guesses_p90']}), "
+            f"3BV {summary['bbbv_mean']:6.1f} (p10 {summary['bbbv_p10']}, "
+            f"p90 {summary['bbbv_p90']}), "
+            f"time p50 <= {summary['time_p50'] * 1000:.2f} ms")
+
+
+def report(simulation, configs, json_lines, file=sys.stdout):
+    """ Funkcja wypisująca podsumowania podanych konfiguracji, jako tekst lub
+    jako obiekty JSON, po jednym na wiersz. """
+    for config in configs:
+        summary = simulation.stats[config].summary()
+        if json_lines:
+            print(json.dumps(dict(summary, config=config_key(config))), file=file)
+        else:
+            print(format_summary(config, summary), file=file)
+    file.flush()
+
+
+def parse_config(text, parts):
+    """ Funkcja zamieniająca napis 'AxB...' na krotkę 'parts' liczb. """
+    values = tuple(int(v) for v in text.lower().split("x"))
+    if len(values) != parts:
+        raise argparse.ArgumentTypeError(f"expected {parts} numbers separated by 'x'")
+    return values
+
+
+def main(argv=None):
+    """ Punkt wejścia wiersza poleceń symulacji. """
+    parser = argparse.ArgumentParser(
+        description="Play minesweeper games with an automated player to calibrate difficulty.")
+    parser.add_argument("--config", action="append", default=[],
+                        type=lambda t: parse_config(t, 3), help="WIDTHxHEIGHTxMINES")
+    parser.add_argument("--size", action="append", default=[],
+                        type=lambda t: parse_config(t, 2),
+                        help="WIDTHxHEIGHT, combined with every --density")
+    parser.add_argument("--density", action="append", type=float, default=[],
+                        help="fraction of fields with mines")
+    parser.add_argument("--games", type=int, default=1000, help="games per configuration")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the series; game i uses (seed << 32) | i")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="number of worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--checkpoint", help="file to resume from and save progress to")
+    parser.add_argument("--interval", type=float, default=10,
+                        help="seconds between progress reports and checkpoints")
+    parser.add_argument("--json", action="store_true",
+                        help="report JSON objects, one per line")
+    args = parser.parse_args(argv)
+    if bool(args.size) != bool(args.density):
+        parser.error("--size and --density must be given together")
+    configs = list(args.config)
+    for ((width, height), density) in itertools.product(args.size, args.density):
+        configs.append((width, height, round(density * width * height)))
+    configs = list(dict.fromkeys(configs or DEFAULT_CONFIGS))
+    for (width, height, mines) in configs:
+        if not (0 < width and 0 < height and 0 <= mines < width * height):
+            parser.error(f"invalid configuration {width}x{height}x{mines}")
+
+    simulation = Simulation(configs, args.games, args.seed, args.chunk_size)
+    if args.checkpoint is not None and os.path.exists(args.checkpoint):
+        simulation.load(args.checkpoint)
+    changed = set()
+    last = time.monotonic()
+    try:
+        for config in simulation.run(args.processes):
+            changed.add(config)
+            if time.monotonic() - last >= args.interval:
+                report(simulation, [c for c in configs if c in changed], args.json)
+                if args.checkpoint is not None:
+                    simulation.save(args.checkpoint)
+                changed.clear()
+                last = time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.checkpoint is not None:
+            simulation.save(args.checkpoint)
+    report(simulation, configs, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+""" Serwer gry bez GUI oparty na 'asyncio'.
+
+Serwer obsługuje wiele sesji (plansz) w jednym procesie i rozmawia z
+klientami protokołem JSON, jeden obiekt na wiersz, przez TCP lub gniazdo
+uniksowe. Każde żądanie ma pole "op" i opcjonalne "id", powtarzane w
+odpowiedzi. Odpowiedź zawiera "ok" (fałsz razem z "error" przy błędnym
+żądaniu). Dostępne operacje:
+
+- {"op": "new", "width", "height", "mines", "seed"?, "no_guess"?} tworzy
+  sesję i zwraca jej identyfikator "session" oraz pole startowe "start"
+  (odsłonięte już pole planszy bez zgadywania lub null); plansza bez
+  zgadywania może mieć najwyżej NO_GUESS_CELLS pól,
+- {"op": "uncover" | "flag" | "chord", "session", "x", "y"} wykonuje ruch i
+  zwraca "moved" (czy ruch był możliwy), "changes", "version", "won" i
+  "lost",
+- {"op": "state", "session", "since"?} zwraca zmiany od wersji "since"
+  (domyślnie od poprzedniej odpowiedzi sesji), a z "full": true cały
+  widoczny stan planszy,
+- {"op": "close", "session"} kończy sesję.
+
+Zmiany pochodzą ze strumienia zmian planszy ('changes_since'): to lista
+par [płaski indeks y * width + x, wartość widoczna], gdzie wartość to
+liczba sąsiednich min odsłoniętego pola (-1 dla miny),
+'saper_logic.VISIBLE_COVERED' dla pola zakrytego lub
+'saper_logic.VISIBLE_FLAG' dla flagi. Wpisy starsze niż ostatnio wysłana
+wersja są usuwane, więc prośba o starszą wersję zwraca całą planszę.
+
+Generowanie plansz bez zgadywania i rozmieszczanie min na dużych planszach
+wykonywane są w puli procesów, żeby nie blokować pętli zdarzeń. Sesje
+nieużywane dłużej niż 'idle' sekund są usuwane.
+
+Przykład:
+    python saper_server.py --port 7070
+    python saper_loadgen.py --port 7070 --clients 200 --games 5
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from saper_logic import Board, BACKENDS, backend_class
+from saper_noguess import generate_no_guess
+
+INLINE_CELLS = 4096
+NO_GUESS_CELLS = 1 << 14
+MAX_CELLS = 1 << 22
+LINE_LIMIT = 1 << 26
+
+
+def new_board(board_class, width, height, mines, seed, generated=None):
+    """ Funkcja tworząca planszę sesji: z krotki (ziarno, pole startowe)
+    'generated' z 'generate_no_guess' planszę bez zgadywania z odsłoniętym
+    polem startowym, a bez niej planszę zwykłą, tworzoną leniwie. Zwraca
+    krotkę (plansza, pole startowe). """
+    if generated is not None:
+        (board_seed, start) = generated
+        board = board_class(width, height, mines, board_seed, safe=start)
+        board.uncover(*start)
+        return (board, start)
+    return (board_class(width, height, mines, seed, lazy=True), None)
+
+
+def first_uncover(board, x, y):
+    """ Funkcja wykonywana w procesie roboczym: pierwsze odsłonięcie pola
+    planszy tworzonej leniwie, razem z rozmieszczeniem min. Zwraca planszę
+    i wynik odsłonięcia; plansze zapisują się do pickle w zwięzłej postaci
+    (np. 'saper_logic.Board.__getstate__'). """
+    return (board, board.uncover(x, y))
+
+
+class Session:
+    """ Pojedyncza gra na serwerze: plansza, wersja strumienia zmian wysłana
+    w ostatniej odpowiedzi, czas ostatniego użycia i blokada szeregująca
+    żądania tej sesji, także te wykonywane w puli procesów. """
+    def __init__(self, board):
+        self.board = board
+        self.version = 0
+        self.used = time.monotonic()
+        self.lock = asyncio.Lock()
+
+
+class GameServer:
+    """ Serwer przechowujący sesje gry i obsługujący połączenia klientów.
+    Plansze tworzone są klasą 'board_class' (np. 'saper_bitboard.BitBoard',
+    która przy tysiącach sesji zajmuje znacznie mniej pamięci, wybierana w
+    wierszu poleceń przez '--backend bitboard'). Pula
+    procesów tworzona jest przy pierwszym zleceniu. """
+    def __init__(self, idle=300, processes=None, board_class=Board, max_sessions=100000):
+        self.idle = idle
+        self.processes = processes
+        self.board_class = board_class
+        self.max_sessions = max_sessions
+        self.executor = None
+        self.sessions = {}
+        self.ids = itertools.count(1)
+        self.server = None
+        self.evictor = None
+
+    async def offload(self, function, *args):
+        """ Funkcja wykonująca 'function' w puli procesów. """
+        if self.executor is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self.executor = ProcessPoolExecutor(self.processes)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def start(self, host=None, port=None, path=None):
+        """ Funkcja uruchamiająca serwer na gnieździe uniksowym 'path' lub na
+        porcie TCP oraz zadanie usuwające bezczynne sesje. """
+        if path is not None:
+            self.server = await asyncio.start_unix_server(
+                self.handle, path, limit=LINE_LIMIT, backlog=1024)
+        else:
+            self.server = await asyncio.start_server(
+                self.handle, host, port, limit=LINE_LIMIT, backlog=1024)
+        self.evictor = asyncio.create_task(self.evict_loop())
+        return self.server
+
+    async def close(self):
+        """ Funkcja zatrzymująca serwer i pulę procesów. """
+        if self.evictor is not None:
+            self.evictor.cancel()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def evict_loop(self):
+        """ Zadanie co chwilę usuwające bezczynne sesje. """
+        while True:
+            await asyncio.sleep(max(1, self.idle / 4))
+            self.evict()
+
+    def evict(self, now=None):
+        """ Funkcja usuwająca sesje nieużywane dłużej niż 'idle' sekund.
+        Zwraca liczbę usuniętych sesji. """
+        limit = (now if now is not None else time.monotonic()) - self.idle
+        stale = [sid for (sid, session) in self.sessions.items()
+                 if session.used < limit and not session.lock.locked()]
+        for sid in stale:
+            del self.sessions[sid]
+        return len(stale)
+
+    async def handle(self, reader, writer):
+        """ Obsługa jednego połączenia: odczyt żądań wiersz po wierszu i
+        odsyłanie odpowiedzi w tej samej kolejności. Błąd żądania (także z
+        puli procesów) zamieniany jest na odpowiedź z 'ok' równym fałsz. """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    response = await self.dispatch(message)
+                    if "id" in message:
+                        response["id"] = message["id"]
+                except Exception as error:
+                    response = {"ok": False, "error": str(error) or type(error).__name__}
+                writer.write(json.dumps(response, separators=(",", ":")).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def session(self, message):
+        """ Funkcja zwracająca sesję z żądania i odnawiająca jej czas. """
+        session = self.sessions.get(message["session"])
+        if session is None:
+            raise KeyError("unknown session")
+        session.used = time.monotonic()
+        return session
+
+    async def dispatch(self, message):
+        """ Funkcja wykonująca jedno żądanie i zwracająca odpowiedź. """
+        op = message["op"]
+        if op == "new":
+            return await self.new_game(message)
+        session = self.session(message)
+        if op == "close":
+            del self.sessions[message["session"]]
+            return {"ok": True}
+        async with session.lock:
+            if op == "state":
+                since = -1 if message.get("full", False) else message.get("since", session.version)
+                return self.state(session, int(since))
+            (x, y) = (int(message["x"]), int(message["y"]))
+            board = session.board
+            if not (0 <= x < board.width and 0 <= y < board.height):
+                raise ValueError("field outside the board")
+            if op == "uncover":
+                moved = await self.uncover(session, x, y)
+            elif op == "flag":
+                moved = board.flag(x, y)
+            elif op == "chord":
+                moved = board.quick_uncover(x, y)
+            else:
+                raise ValueError(f"unknown op {op!r}")
+            board = session.board
+            if board.lost and moved:
+                board.uncover_mines()
+            response = self.state(session, session.version)
+            response["moved"] = moved
+            return response
+
+    async def new_game(self, message):
+        """ Funkcja tworząca nową sesję. Zwykła plansza tworzona jest leniwie
+        w bieżącym procesie (to tanie), a planszy bez zgadywania, najwyżej
+        NO_GUESS_CELLS pól, szuka pula procesów, która odsyła tylko ziarno i
+        pole startowe. """
+        (width, height, mines) = (int(message["width"]), int(message["height"]),
+                                  int(message["mines"]))
+        if not (0 < width and 0 < height and width * height <= MAX_CELLS
+                and 0 <= mines < width * height):
+            raise ValueError("invalid board parameters")
+        no_guess = bool(message.get("no_guess", False))
+        if no_guess and width * height > NO_GUESS_CELLS:
+            raise ValueError(f"no_guess boards are limited to {NO_GUESS_CELLS} fields")
+        if len(self.sessions) >= self.max_sessions:
+            self.evict()
+            if len(self.sessions) >= self.max_sessions:
+                raise ValueError("too many sessions")
+        seed = message.get("seed")
+        generated = None
+        if no_guess:
+            generated = await self.offload(generate_no_guess, width, height, mines, seed,
+                                           1000, self.board_class)
+        (board, start) = new_board(self.board_class, width, height, mines, seed, generated)
+        sid = f"{next(self.ids):x}"
+        self.sessions[sid] = Session(board)
+        return {"ok": True, "session": sid, "width": width, "height": height,
+                "mines": mines, "start": start}
+
+    async def uncover(self, session, x, y):
+        """ Funkcja odsłaniająca pole. Pierwsze odsłonięcie dużej planszy
+        tworzonej leniwie (rozmieszczenie min, cyfry i 3BV) trafia do puli
+        procesów. """
+        board = session.board
+        if board.placed or board.width * board.height <= INLINE_CELLS:
+            return board.uncover(x, y)
+        (session.board, moved) = await self.offload(first_uncover, board, x, y)
+        return moved
+
+    def state(self, session, since):
+        """ Funkcja zwracająca zmiany planszy sesji od wersji 'since' oraz
+        stan gry, zapamiętująca wysłaną wersję i usuwająca starsze wpisy
+        strumienia zmian. """
+        board = session.board
+        (session.version, changes) = board.changes_since(since)
+        board.trim(session.version)
+        return {"ok": True, "changes": changes, "version": session.version,
+                "won": board.check_for_win(), "lost": board.lost, "flags": board.flags}
+
+
+async def serve(args):
+    """ Funkcja uruchamiająca serwer do przerwania. """
+    board_class = backend_class("bitboard" if args.bitboard else args.backend)
+    server = GameServer(args.idle, args.processes, board_class, args.max_sessions)
+    listener = await server.start(args.host, args.port, args.unix)
+    print("listening on", ", ".join(str(s.getsockname()) for s in listener.sockets), flush=True)
+    try:
+        await listener.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    """ Punkt wejścia wiersza poleceń serwera. """
+    parser = argparse.ArgumentParser(description="Run a headless minesweeper server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7070)
+    parser.add_argument("--unix", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--idle", type=float, default=300,
+                        help="seconds after which idle sessions are dropped")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes for board generation")
+    parser.add_argument("--max-sessions", type=int, default=100000)
+    parser.add_argument("--backend", choices=list(BACKENDS),
+                        help="board backend (default: $SAPER_BACKEND or python)")
+    parser.add_argument("--bitboard", action="store_true",
+                        help="same as --backend bitboard")
+    try:
+        asyncio.run(serve(parser.parse_args(argv)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+from collections import OrderedDict, defaultdict, namedtuple
+from math import comb
+from saper_topology import SquareGrid, grid
+
+COVERED = 9
+
+Solution = namedtuple("Solution", ["safe", "mines", "probabilities"])
+Solution.__doc__ = """ Wynik działania solvera: zbiór płaskich indeksów pól
+na pewno bezpiecznych, zbiór indeksów pól na pewno zaminowanych oraz
+słownik prawdopodobieństw miny dla wszystkich zakrytych pól. """
+
+
+def visible_state(board):
+    """ Funkcja zwracająca widoczny stan planszy jako płaską listę: cyfrę dla
+    pól odsłoniętych i 'COVERED' dla pól zakrytych. Flagi traktowane są jak
+    pola zakryte, ponieważ gracz mógł się pomylić. """
+    return [n if state == 'u' else COVERED
+            for row in board.fields for (n, state) in row]
+
+
+def neighbours(width, height, i, topology=SquareGrid):
+    """ Funkcja zwracająca listę płaskich indeksów sąsiadów pola 'i'. """
+    return grid(width, height, topology).neighbours(i)
+
+
+def constraints_of(width, height, visible, topology=SquareGrid):
+    """ Funkcja budująca zbiór ograniczeń (zbiór zakrytych sąsiadów, liczba
+    min wśród nich) z odsłoniętych cyfr sąsiadujących z polami zakrytymi. """
+    constraints = set()
+    shape = grid(width, height, topology)
+    (kinds, deltas) = (shape.kinds, shape.deltas)
+    for (i, value) in enumerate(visible):
+        if value == COVERED or value <= 0:
+            continue
+        cells = frozenset(i + d for d in deltas[kinds[i]] if visible[i + d] == COVERED)
+        if cells:
+            constraints.add((cells, value))
+    return constraints
+
+
+def propagate(constraints, safe, mines):
+    """ Funkcja wyznaczająca pewne ruchy przez propagację ograniczeń i
+    redukcję podzbiorów: jeśli ograniczenie A zawiera się w B, to B zastępowane
+    jest różnicą B - A z liczbą min pomniejszoną o liczbę min A.
+    Uzupełnia zbiory 'safe' i 'mines', zwraca pozostałe ograniczenia. """
+    while True:
+        reduced = set()
+        progress = False
+        for (cells, count) in constraints:
+            left = cells - safe - mines
+            count -= len(cells & mines)
+            if not left:
+                continue
+            if count == 0:
+                safe |= left
+                progress = True
+            elif count == len(left):
+                mines |= left
+                progress = True
+            else:
+                reduced.add((left, count))
+        constraints = reduced
+        if progress:
+            continue
+
+        by_cell = defaultdict(list)
+        for constraint in constraints:
+            for cell in constraint[0]:
+                by_cell[cell].append(constraint)
+        replaced = {}
+        for small in constraints:
+            for big in by_cell[next(iter(small[0]))]:
+                if len(big[0]) > len(small[0]) and small[0] <= big[0] \
+                        and big not in replaced:
+                    replaced[big] = (big[0] - small[0], big[1] - small[1])
+        if not replaced:
+            return constraints
+        constraints = (constraints - replaced.keys()) | set(replaced.values())
+
+
+def components(constraints):
+    """ Funkcja dzieląca ograniczenia na niezależne składowe, czyli grupy
+    ograniczeń połączonych wspólnymi polami. """
+    parent = {}
+
+    def find(cell):
+        while parent[cell] != cell:
+            parent[cell] = parent[parent[cell]]
+            cell = parent[cell]
+        return cell
+
+    for (cells, count) in constraints:
+        for cell in cells:
+            parent.setdefault(cell, cell)
+        first = find(next(iter(cells)))
+        for cell in cells:
+            root = find(cell)
+            if root != first:
+                parent[root] = first
+    groups = defaultdict(list)
+    for constraint in constraints:
+        groups[find(next(iter(constraint[0])))].append(constraint)
+    return list(groups.values())
+
+
+def enumerate_component(constraints, limit):
+    """ Funkcja przeglądająca wszystkie rozmieszczenia min zgodne z
+    ograniczeniami jednej składowej (z co najwyżej 'limit' minami).
+    Zwraca parę słowników: liczba min -> liczba rozwiązań oraz liczba min ->
+    {pole: liczba rozwiązań z miną na tym polu}. """
+    order = []
+    seen = set()
+    for (cells, count) in sorted(constraints, key=lambda c: min(c[0])):
+        for cell in sorted(cells):
+            if cell not in seen:
+                seen.add(cell)
+                order.append(cell)
+    constraints = list(constraints)
+    of_cell = {cell: [] for cell in order}
+    for (c, (cells, count)) in enumerate(constraints):
+        for cell in cells:
+            of_cell[cell].append(c)
+    need = [count for (cells, count) in constraints]
+    free = [len(cells) for (cells, count) in constraints]
+
+    solutions = defaultdict(int)
+    cell_counts = defaultdict(lambda: defaultdict(int))
+    placed = []
+
+    def search(k):
+        if len(placed) > limit:
+            return
+        if k == len(order):
+            mines = len(placed)
+            solutions[mines] += 1
+            counts = cell_counts[mines]
+            for cell in placed:
+                counts[cell] += 1
+            return
+        cell = order[k]
+        for mine in (False, True):
+            ok = True
+            for c in of_cell[cell]:
+                free[c] -= 1
+                if mine:
+                    need[c] -= 1
+                if need[c] < 0 or need[c] > free[c]:
+                    ok = False
+            if ok:
+                if mine:
+                    placed.append(cell)
+                search(k + 1)
+                if mine:
+                    placed.pop()
+            for c in of_cell[cell]:
+                free[c] += 1
+                if mine:
+                    need[c] += 1
+
+    search(0)
+    return (dict(solutions), {k: dict(v) for (k, v) in cell_counts.items()})
+
+
+def convolve(a, b):
+    """ Funkcja mnożąca dwa rozkłady (liczba min -> liczba rozwiązań). """
+    result = defaultdict(int)
+    for (i, x) in a.items():
+        for (j, y) in b.items():
+            result[i + j] += x * y
+    return result
+
+
+class Solver:
+    """ Solver planszy sapera działający na widocznym stanie gry.
+
+    Najpierw wyznacza pewne ruchy propagacją ograniczeń z redukcją
+    podzbiorów, a pozostałe ograniczenia dzieli na niezależne składowe
+    frontu i dla każdej z nich przegląda wszystkie rozmieszczenia min.
+    Wyniki składowych zapamiętywane są według ich ograniczeń, więc po
+    ruchu ponownie liczone są tylko składowe, które ten ruch zmienił.
+
+    Solver może też śledzić grę przyrostowo: 'update' przyjmuje zmiany ze
+    strumienia zmian planszy ('changes_since') i przelicza ograniczenia
+    tylko cyfr wokół zmienionych pól, a 'solve_current' rozwiązuje tak
+    uaktualniony stan. Ograniczenia w nietkniętej części frontu pozostają
+    identyczne, więc ich składowe pochodzą z pamięci podręcznej. """
+    def __init__(self, width, height, mines, cache_size=4096, topology=SquareGrid):
+        self.width = width
+        self.height = height
+        self.mines = mines
+        self.topology = topology
+        self.visible = [COVERED] * (width * height)
+        self.constraints = {}
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+
+    def solve_board(self, board):
+        """ Funkcja rozwiązująca aktualny stan obiektu 'saper_logic.Board'. """
+        return self.solve(visible_state(board))
+
+    def component(self, constraints):
+        """ Funkcja zwracająca (z pamięci podręcznej, jeśli to możliwe) wynik
+        'enumerate_component' dla jednej składowej. """
+        key = frozenset(constraints)
+        result = self.cache.get(key)
+        if result is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return result
+        self.misses += 1
+        result = enumerate_component(constraints, self.mines)
+        self.cache[key] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return result
+
+    def reset(self):
+        """ Funkcja czyszcząca stan śledzony przez 'update' przed nową grą.
+        Pamięć podręczna składowych zostaje, bo nie zależy od planszy. """
+        self.visible = [COVERED] * (self.width * self.height)
+        self.constraints = {}
+
+    def update(self, changes):
+        """ Funkcja nanosząca na zapamiętany widoczny stan zmiany (płaski
+        indeks, wartość widoczna) z 'changes_since' planszy. Flagi
+        (wartości większe od 'COVERED') traktowane są jak pola zakryte.
+        Przeliczane są tylko ograniczenia cyfr sąsiadujących ze zmianami. """
+        shape = grid(self.width, self.height, self.topology)
+        visible = self.visible
+        touched = set()
+        for (i, value) in changes:
+            visible[i] = min(value, COVERED)
+            touched.update(shape.block(i))
+        for i in touched:
+            value = visible[i]
+            cells = None
+            if value != COVERED and value > 0:
+                cells = frozenset(n for n in shape.neighbours(i) if visible[n] == COVERED)
+            if cells:
+                self.constraints[i] = (cells, value)
+            else:
+                self.constraints.pop(i, None)
+
+    def solve_current(self, exact=True):
+        """ Funkcja rozwiązująca stan zapamiętany przez 'update'. """
+        return self.solve(self.visible, exact, set(self.constraints.values()))
+
+    def solve(self, visible, exact=True, constraints=None):
+        """ Funkcja rozwiązująca widoczny stan planszy (lista z
+        'visible_state'). Zwraca obiekt 'Solution'. Przy 'exact' równym fałsz
+        pomijane jest przeglądanie rozmieszczeń i zwracane są tylko ruchy
+        wynikające z propagacji, bez prawdopodobieństw. Ograniczenia
+        wyznaczone wcześniej można podać w 'constraints'. """
+        safe = set()
+        mines = set()
+        if constraints is None:
+            constraints = constraints_of(self.width, self.height, visible, self.topology)
+        constraints = propagate(constraints, safe, mines)
+        if not exact:
+            return Solution(safe, mines, {})
+
+        covered = [i for (i, value) in enumerate(visible) if value == COVERED]
+        left = self.mines - len(mines)
+        groups = components(constraints)
+        results = [self.component(group) for group in groups]
+        frontier = set()
+        for group in groups:
+            for (cells, count) in group:
+                frontier |= cells
+        outside = [i for i in covered
+                   if i not in frontier and i not in safe and i not in mines]
+        free = len(outside)
+
+        prefix = [{0: 1}]
+        for (solutions, cell_counts) in results:
+            prefix.append(convolve(prefix[-1], solutions))
+        suffix = [{0: 1}]
+        for (solutions, cell_counts) in reversed(results):
+            suffix.append(convolve(suffix[-1], solutions))
+        suffix.reverse()
+
+        def rest(k):
+            """ Liczba rozmieszczeń pozostałych min poza frontem. """
+            return comb(free, left - k) if 0 <= left - k <= free else 0
+
+        total = sum(count * rest(k) for (k, count) in prefix[-1].items())
+        probabilities = {i: 0.0 for i in safe}
+        probabilities.update({i: 1.0 for i in mines})
+        if total == 0:
+            return Solution(safe, mines, probabilities)
+
+        for (c, (solutions, cell_counts)) in enumerate(results):
+            others = convolve(prefix[c], suffix[c + 1])
+            weight = {k: sum(count * rest(k + j) for (j, count) in others.items())
+                      for k in solutions}
+            for (k, counts) in cell_counts.items():
+                for (cell, count) in counts.items():
+                    probabilities[cell] = probabilities.get(cell, 0) + count * weight[k]
+            for group_cells in groups[c]:
+                for cell in group_cells[0]:
+                    probabilities.setdefault(cell, 0)
+        for cell in frontier:
+            probabilities[cell] /= total
+            if probabilities[cell] == 0:
+                safe.add(cell)
+            elif probabilities[cell] == 1:
+                mines.add(cell)
+        if free:
+            expected = sum(count * rest(k) * (left - k)
+                           for (k, count) in prefix[-1].items())
+            for cell in outside:
+                probabilities[cell] = expected / (free * total)
+            if expected == 0:
+                safe.update(outside)
+            elif expected == free * total:
+                mines.update(outside)
+        return Solution(safe, mines, probabilities)
+
+
+def hint(solution):
+    """ Funkcja wybierająca pole do odsłonięcia: najmniejsze pole na pewno
+    bezpieczne, a gdy takiego nie ma, pole o najmniejszym
+    prawdopodobieństwie miny. Zwraca płaski indeks pola lub None. """
+    if solution.safe:
+        return min(solution.safe)
+    if not solution.probabilities:
+        return None
+    return min(solution.probabilities, key=lambda i: (solution.probabilities[i], i))
@@ -0,0 +1,103 @@
+import functools
+
+
+class SquareGrid:
+    """ Topologia planszy: sąsiedztwo pól jako przesunięcia płaskich
+    indeksów (y * width + x).
+
+    Każde pole ma rodzaj zapisany w bajcie tablicy 'kinds', a 'deltas[rodzaj]'
+    to krotka przesunięć do pól bloku wokół pola (łącznie z nim samym), już
+    przyciętego do planszy. Pola jednego rodzaju mają te same przesunięcia,
+    więc tablice zajmują bajt na pole, a przejście po sąsiadach to
+    'for d in deltas[kinds[i]]' bez sprawdzania brzegów. W kwadratowej siatce
+    rodzaj mówi, przy których brzegach leży pole (najwyżej 16 rodzajów).
+
+    Inne topologie dziedziczą po tej klasie i nadpisują 'kind', 'row_kind'
+    oraz 'block_xy'; domyślna siatka nie płaci za ich istnienie. """
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        rows = {}
+        kinds = bytearray()
+        for y in range(height):
+            key = self.row_kind(y)
+            if key not in rows:
+                rows[key] = bytes(self.kind(x, y) for x in range(width))
+            kinds += rows[key]
+        self.kinds = bytes(kinds)
+        self.deltas = [()] * 256
+        for kind in set(kinds):
+            i = self.kinds.find(kind)
+            (y, x) = divmod(i, width)
+            self.deltas[kind] = tuple(ny * width + nx - i for (nx, ny) in self.block_xy(x, y))
+
+    def __reduce__(self):
+        """ Topologia zapisywana jest przez pickle jako wywołanie 'grid', więc
+        po odczytaniu pochodzi z pamięci podręcznej procesu, a tablice nie są
+        przesyłane. """
+        return (grid, (self.width, self.height, type(self)))
+
+    def kind(self, x, y):
+        """ Funkcja zwracająca rodzaj pola: bity mówią, czy pole ma sąsiada z
+        lewej, z prawej, u góry i u dołu. """
+        return (x > 0) | (x < self.width - 1) << 1 | (y > 0) << 2 | (y < self.height - 1) << 3
+
+    def row_kind(self, y):
+        """ Funkcja zwracająca klucz wiersza: wiersze o tym samym kluczu mają
+        te same rodzaje pól. """
+        return (y > 0, y < self.height - 1)
+
+    def block_xy(self, x, y):
+        """ Funkcja zwracająca współrzędne pól bloku 3x3 wokół pola (łącznie
+        z nim), przyciętego do planszy. """
+        return [(x + j, y + i)
+                for i in range(max(-1, -y), min(2, self.height - y))
+                for j in range(max(-1, -x), min(2, self.width - x))]
+
+    def block(self, i):
+        """ Funkcja zwracająca listę płaskich indeksów pola 'i' i jego
+        sąsiadów. """
+        return [i + d for d in self.deltas[self.kinds[i]]]
+
+    def neighbours(self, i):
+        """ Funkcja zwracająca listę płaskich indeksów sąsiadów pola 'i'. """
+        return [i + d for d in self.deltas[self.kinds[i]] if d]
+
+
+class TorusGrid(SquareGrid):
+    """ Siatka zawinięta w torus: pola przy brzegu sąsiadują z polami przy
+    przeciwległym brzegu. """
+    def block_xy(self, x, y):
+        """ Funkcja zwracająca współrzędne bloku 3x3 wokół pola, zawiniętego
+        na brzegach, bez powtórzeń na wąskich planszach. """
+        cells = [((x + j) % self.width, (y + i) % self.height)
+                 for i in (-1, 0, 1) for j in (-1, 0, 1)]
+        return list(dict.fromkeys(cells))
+
+
+class HexGrid(SquareGrid):
+    """ Siatka sześciokątna w układzie "odd-r": nieparzyste wiersze są
+    przesunięte o pół pola w prawo, a każde pole ma do sześciu sąsiadów. """
+    def kind(self, x, y):
+        """ Rodzaj pola uwzględnia też parzystość wiersza. """
+        return SquareGrid.kind(self, x, y) | (y & 1) << 4
+
+    def row_kind(self, y):
+        return (y > 0, y < self.height - 1, y & 1)
+
+    def block_xy(self, x, y):
+        """ Funkcja zwracająca współrzędne pola i jego sąsiadów na siatce
+        sześciokątnej, przyciętych do planszy. """
+        shift = y & 1
+        cells = [(x - 1 + shift, y - 1), (x + shift, y - 1),
+                 (x - 1, y), (x, y), (x + 1, y),
+                 (x - 1 + shift, y + 1), (x + shift, y + 1)]
+        return [(i, j) for (i, j) in cells
+                if 0 <= i < self.width and 0 <= j < self.height]
+
+
+@functools.lru_cache(maxsize=32)
+def grid(width, height, topology=SquareGrid):
+    """ Funkcja zwracająca (z pamięci podręcznej) obiekt topologii klasy
+    'topology' dla planszy o podanym kształcie. """
+    return topology(width, height)
@@ -4,4 +4,11 @@ from distutils.core import setup
 setup(name="python-saper",
       version="1.0",
       author="Wiktor Bukowski",
-      py_modules=["saper", "game_window", "saper_logic", "saper_gui", "highscore_handler"])
\ No newline at end of file
+      packages=["saper_logic"],
+      py_modules=["saper", "game_window", "saper_gui", "highscore_handler",
+                  "saper_numpy", "saper_flood", "tile_cache",
+                  "saper_generate", "saper_metrics",
+                  "saper_solver", "saper_noguess", "saper_format",
+                  "saper_replay", "saper_instrument", "saper_bitboard",
+                  "saper_server", "saper_loadgen", "saper_topology",
+                  "saper_selfplay", "saper_endless"])
\ No newline at end of file
@@ -1,6 +1,32 @@
 
 import saper_logic as sl
+import saper_generate
+import saper_format
+import saper_replay
+import saper_instrument
+import saper_bitboard
+import saper_server
+import saper_loadgen
+from highscore_handler import HighscoreHandler
+import saper_metrics
+import saper_solver
+import saper_noguess
+import saper_topology
+import saper_selfplay
+import saper_endless
+import asyncio
+import io
+import os
+import random
+import tempfile
+import time
 import unittest
+import unittest.mock
+
+try:
+    import saper_numpy
+except ImportError:
+    saper_numpy = None
 
 class Test(unittest.TestCase):
     def __init__(self, parent=None):
@@ -22,4 +48,541 @@ class Test(unittest.TestCase):
         self.board.uncover(0, 0)
         self.assertEqual(self.board.fields[0][0][1], 'u')
 
+    def test_counters(self):
+        board = sl.Board(3, 3, 0)
+        board.fields[0][0] = (-1, 'c')
+        board.mines = 1
+        board.fill_with_numbers()
+        self.assertEqual(board.safe_left, 8)
+        board.uncover(1, 1)
+        board.flag(0, 0)
+        self.assertEqual((board.uncovered, board.safe_left, board.flags), (1, 7, 1))
+        board.uncover(2, 2)
+        self.assertEqual((board.uncovered, board.safe_left), (8, 0))
+        self.assertEqual(board.check_for_win(), True)
+        board.uncover_mines()
+        self.assertEqual(board.mines_revealed, 1)
+
+    def test_changes(self):
+        board = sl.Board(3, 3, 0)
+        board.fields[0][0] = (-1, 'c')
+        board.mines = 1
+        board.fill_with_numbers()
+        board.flag(0, 0)
+        self.assertEqual(board.pop_changes(), [(0, 0)])
+        board.uncover(2, 2)
+        self.assertEqual(sorted(board.pop_changes()), [(x, y) for x in range(3) for y in range(3) if (x, y) != (0, 0)])
+        self.assertEqual(board.pop_changes(), [])
+
+    def test_changes_since(self):
+        board = sl.Board(3, 3, 0)
+        board.fields[0][0] = (-1, 'c')
+        board.mines = 1
+        board.fill_with_numbers()
+        board.flag(0, 0)
+        board.flag(0, 0)
+        (version, changes) = board.changes_since(0)
+        self.assertEqual((version, changes), (2, [(0, sl.VISIBLE_COVERED)]))
+        board.uncover(1, 1)
+        self.assertEqual(board.changes_since(version), (3, [(4, 1)]))
+        board.trim(3)
+        self.assertEqual(len(board.changes_since(0)[1]), 9)
+
+    def test_uncover_huge_island(self):
+        board = sl.Board(400, 400, 1)
+        (x, y) = (0, 0) if board.fields[0][0][0] == 0 else (399, 399)
+        board.uncover(x, y)
+        self.assertEqual(board.check_for_win(), True)
+
+    def test_bbbv(self):
+        board = sl.Board(3, 3, 0)
+        board.fields[1][1] = (-1, 'c')
+        board.fill_with_numbers()
+        board.calc_bbbv()
+        self.assertEqual(board.bbbv, 8)
+
+    def test_lazy_board(self):
+        board = sl.Board(9, 9, 70, lazy=True)
+        self.assertEqual(board.bbbv, None)
+        board.flag(8, 8)
+        board.uncover(4, 4)
+        self.assertEqual(board.lost, False)
+        self.assertEqual(board.fields[4][4], (0, 'u'))
+        self.assertEqual(board.fields[8][8][1], 'f')
+        self.assertEqual(sum(n == -1 for n in board.numbers), 70)
+        self.assertNotEqual(board.bbbv, None)
+
+    def test_seed_is_deterministic(self):
+        self.assertEqual(sl.Board(16, 16, 40, seed=7).fields, sl.Board(16, 16, 40, seed=7).fields)
+
+
+class GenerateTest(unittest.TestCase):
+    def test_generate_matches_board(self):
+        records = list(saper_generate.generate(9, 9, 10, 5, seed=3, processes=1))
+        self.assertEqual(len(records), 5)
+        board = sl.Board(9, 9, 10, saper_generate.board_seed(3, 4))
+        self.assertEqual(records[4][:3], (board.seed, board.bbbv, board.openings))
+
+    def test_binary_roundtrip(self):
+        records = list(saper_generate.generate(8, 8, 10, 3, processes=1))
+        file = io.BytesIO()
+        saper_generate.write_binary(file, 8, 8, 10, records)
+        file.seek(0)
+        self.assertEqual(list(saper_generate.read_binary(file)), records)
+
+
+class FormatTest(unittest.TestCase):
+    def test_roundtrip(self):
+        board = sl.Board(30, 16, 99, seed=5, lazy=True)
+        board.flag(3, 3)
+        board.uncover(10, 10)
+        board.flag(0, 0)
+        (loaded, time) = saper_format.loads(saper_format.dumps(board, 42))
+        self.assertEqual(time, 42)
+        self.assertEqual(loaded.fields, board.fields)
+        for name in ("uncovered", "safe_left", "flags", "moves", "islands", "bbbv"):
+            self.assertEqual(getattr(loaded, name), getattr(board, name))
+
+    def test_lazy_board_keeps_flags(self):
+        board = sl.Board(8, 8, 10, lazy=True)
+        board.flag(1, 1)
+        (loaded, time) = saper_format.loads(saper_format.dumps(board))
+        self.assertFalse(loaded.placed)
+        loaded.uncover(5, 5)
+        self.assertEqual(loaded.fields[1][1][1], 'f')
+
+    def test_load_rejects_truncated_file(self):
+        data = saper_format.dumps(sl.Board(8, 8, 10, seed=1))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "game.sapr")
+            for size in (0, 5, len(data) - 1):
+                with open(path, "wb") as file:
+                    file.write(data[:size])
+                with self.assertRaises(ValueError):
+                    saper_format.load(path)
+
+
+class ReplayTest(unittest.TestCase):
+    def play(self, backend="python"):
+        board = sl.create_board(16, 16, 40, seed=3, backend=backend, lazy=True)
+        log = saper_replay.attach(board)
+        board.uncover(8, 8)
+        board.flag(0, 0)
+        board.flag(0, 0)
+        for (i, mine) in enumerate(board.mine_cells()):
+            if not mine:
+                board.uncover(i % 16, i // 16)
+        return (board, log)
+
+    def test_replay_matches_game(self):
+        (board, log) = self.play()
+        loaded = saper_replay.loads(log.dumps())
+        self.assertEqual(saper_replay.replay(loaded).fields, board.fields)
+        result = saper_replay.audit(loaded)
+        self.assertTrue(result.valid)
+        self.assertTrue(result.won)
+        replay = saper_replay.Replay(loaded, interval=4)
+        expected = loaded.board()
+        for move in list(loaded)[:10]:
+            saper_replay.apply(expected, move)
+        self.assertEqual(replay.seek(10).fields, expected.fields)
+
+    def test_audit_rejects_impossible_move(self):
+        (board, log) = self.play()
+        log.data[-8:] = log.data[:8]
+        self.assertFalse(saper_replay.audit(log).valid)
+
+    @unittest.skipIf(saper_numpy is None, "NumPy is not installed")
+    def test_log_replays_on_recorded_backend(self):
+        (board, log) = self.play("numpy")
+        loaded = saper_replay.loads(log.dumps())
+        self.assertEqual(loaded.backend, "numpy")
+        self.assertIsInstance(loaded.board(), saper_numpy.NumpyBoard)
+        self.assertTrue(saper_replay.audit(loaded).won)
+
+
+class HighscoreTest(unittest.TestCase):
+    def test_top_and_percentile(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "highscores.csv"), "w") as file:
+                file.write("2020-01-01;20;1.5\n")
+            handler = HighscoreHandler(os.path.join(directory, "highscores.db"),
+                                       os.path.join(directory, "highscores.csv"), "ann")
+            handler.add_many([(8, 8, 10, "bob", "2020-01-02", time, 30)
+                              for time in (10, 15, 30)])
+            handler.handle(12, 12, 8, 8, 10)
+            self.assertEqual(handler.count(0, 0, 0), 1)
+            self.assertEqual([r.time for r in handler.top(8, 8, 10, 2)], [10, 15])
+            self.assertEqual([r.player for r in handler.top(8, 8, 10, player="ann")], ["ann"])
+            self.assertEqual(handler.percentile(2.5, 8, 8, 10), 75)
+            handler.close()
+
+    def test_recovers_corrupt_database(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "highscores.db")
+            with open(path, "wb") as file:
+                file.write(b"not a database" * 100)
+            handler = HighscoreHandler(path, os.path.join(directory, "missing.csv"), "ann")
+            handler.handle(10, 20, 8, 8, 10)
+            self.assertEqual(handler.count(8, 8, 10), 1)
+            handler.close()
+            self.assertTrue(os.path.exists(path + ".corrupt"))
+            handler = HighscoreHandler(path, os.path.join(directory, "missing.csv"), "ann")
+            self.assertEqual(handler.top(8, 8, 10)[0].coef, 2)
+            handler.close()
+
+    def test_unavailable_database_returns_empty_results(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "highscores.db")
+            os.makedirs(path)
+            handler = HighscoreHandler(path, os.path.join(directory, "missing.csv"), "ann")
+            with unittest.mock.patch("sys.stderr", io.StringIO()):
+                handler.handle(10, 20, 8, 8, 10)
+                self.assertEqual((handler.count(8, 8, 10), handler.top(8, 8, 10)), (0, []))
+                self.assertEqual(handler.percentile(1, 8, 8, 10), None)
+                handler.close()
+            self.assertIsNotNone(handler.error)
+            self.assertTrue(os.path.isdir(path))
+
+    def test_skips_truncated_csv_and_zero_time(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "highscores.csv"), "w") as file:
+                file.write("2020-01-01;20;1.5\n2020-01-01;0;1.0\n2020-01-02;2")
+            handler = HighscoreHandler(os.path.join(directory, "highscores.db"),
+                                       os.path.join(directory, "highscores.csv"), "ann")
+            self.assertEqual(handler.count(0, 0, 0), 1)
+            self.assertEqual(handler.handle(0, 5, 8, 8, 10), 5)
+            handler.add_many([(8, 8, 10, "bob", "2020-01-02", 0, 3)])
+            self.assertEqual([r.time for r in handler.top(8, 8, 10)], [1, 1])
+            handler.close()
+
+
+class BitBoardTest(unittest.TestCase):
+    def test_matches_reference_board(self):
+        board = sl.Board(30, 16, 99, seed=3, safe=(5, 5))
+        bits = saper_bitboard.BitBoard(30, 16, 99, seed=3, safe=(5, 5))
+        self.assertEqual(bits.numbers, board.numbers)
+        self.assertEqual(bits.bbbv, board.bbbv)
+        for (x, y) in [(5, 5), (0, 0), (29, 15), (12, 7)]:
+            self.assertEqual(bits.uncover(x, y), board.uncover(x, y))
+        self.assertEqual(sorted(bits.changes_since(0)[1]), sorted(board.changes_since(0)[1]))
+        self.assertEqual(bits.state_cells(), board.state_cells())
+        self.assertEqual(bits.safe_left, board.safe_left)
+
+    def test_copy_is_independent(self):
+        board = saper_bitboard.BitBoard(9, 9, 10, seed=1)
+        copy = board.copy()
+        board.flag(0, 0)
+        self.assertNotEqual(board.key(), copy.key())
+        self.assertEqual(copy.fields[0][0][1], 'c')
+
+
+class ServerTest(unittest.TestCase):
+    def test_session_over_unix_socket(self):
+        async def session(path):
+            server = saper_server.GameServer(idle=60)
+            await server.start(path=path)
+            client = await saper_loadgen.Client.connect({}, path=path)
+            game = await client.request("new", width=9, height=9, mines=10, seed=4, id=1)
+            self.assertEqual(game["id"], 1)
+            moved = await client.request("uncover", session=game["session"], x=4, y=4)
+            self.assertEqual(moved["moved"], True)
+            self.assertEqual(4 * 9 + 4 in dict(moved["changes"]), True)
+            again = await client.request("uncover", session=game["session"], x=4, y=4)
+            self.assertEqual((again["moved"], again["changes"]), (False, []))
+            self.assertEqual(server.evict(time.monotonic() + 120), 1)
+            missing = await client.request("flag", session=game["session"], x=0, y=0)
+            self.assertEqual(missing["ok"], False)
+            huge = await client.request("new", width=200, height=200, mines=10, no_guess=True)
+            self.assertEqual(huge["ok"], False)
+            with unittest.mock.patch.object(server, "new_game", side_effect=OverflowError("too large")):
+                failed = await client.request("new", width=9, height=9, mines=10)
+            self.assertEqual((failed["ok"], failed["error"]), (False, "too large"))
+            await client.close()
+            await server.close()
+
+        with tempfile.TemporaryDirectory() as directory:
+            asyncio.run(session(os.path.join(directory, "server.sock")))
+
+
+class InstrumentTest(unittest.TestCase):
+    def test_install_and_uninstall(self):
+        uncover = sl.Board.uncover
+        saper_instrument.reset()
+        saper_instrument.install(saper_instrument.logic_targets(sl.Board))
+        try:
+            board = sl.Board(9, 9, 10, 1)
+            board.uncover(0, 0)
+            board.uncover(1, 0)
+        finally:
+            saper_instrument.uninstall()
+        self.assertIs(sl.Board.uncover, uncover)
+        self.assertEqual(saper_instrument.report()["Board.uncover"]["count"], 2)
+        with unittest.mock.patch.dict(os.environ, {"SAPER_BACKEND": "bitboard"}):
+            self.assertIn(("saper_bitboard", "BitBoard.uncover"), saper_instrument.logic_targets())
+
+
+class MetricsTest(unittest.TestCase):
+    def test_board_metrics(self):
+        numbers = [0, 1, -1,
+                   0, 1, 1,
+                   0, 0, 0]
+        metrics = saper_metrics.board_metrics(3, 3, numbers)
+        self.assertEqual(metrics, saper_metrics.BoardMetrics(1, 1, [8], 0))
+
+    @unittest.skipIf(saper_numpy is None, "NumPy is not installed")
+    def test_batch_metrics_match_board(self):
+        np = saper_numpy.np
+        boards = [sl.Board(30, 16, 99, seed=s) for s in range(10)]
+        counts = np.array([np.array(b.numbers, dtype=np.int8).reshape(16, 30) for b in boards])
+        self.assertEqual(saper_metrics.batch_metrics(counts), [b.metrics for b in boards])
+
+
+class SolverTest(unittest.TestCase):
+    def test_certain_mine(self):
+        board = sl.Board(3, 3, 0)
+        board.fields[0][0] = (-1, 'c')
+        board.mines = 1
+        board.fill_with_numbers()
+        board.uncover(2, 2)
+        solution = saper_solver.Solver(3, 3, 1).solve_board(board)
+        self.assertEqual(solution.mines, {0})
+        self.assertEqual(solution.probabilities, {0: 1.0})
+
+    def test_probabilities(self):
+        covered = saper_solver.COVERED
+        solver = saper_solver.Solver(3, 2, 1)
+        solution = solver.solve([covered, 1, covered,
+                                 covered, covered, covered])
+        self.assertEqual(solution.safe, set())
+        for i in (0, 2, 3, 4, 5):
+            self.assertAlmostEqual(solution.probabilities[i], 0.2)
+        self.assertEqual(saper_solver.hint(solution), 0)
+
+    def test_no_guess_board(self):
+        (seed, start) = saper_noguess.generate_no_guess(16, 16, 40, seed=5)
+        board = sl.Board(16, 16, 40, seed, safe=start)
+        self.assertEqual(board.fields[start[1]][start[0]][0], 0)
+        self.assertEqual(saper_noguess.solvable(board, start), True)
+
+    @unittest.skipIf(saper_numpy is None, "NumPy is not installed")
+    def test_no_guess_board_on_other_backend(self):
+        cls = saper_numpy.NumpyBoard
+        (seed, start) = saper_noguess.generate_no_guess(16, 16, 40, seed=5, board_class=cls)
+        self.assertEqual(saper_noguess.solvable(cls(16, 16, 40, seed, safe=start), start), True)
+
+    def test_probabilities_on_large_board(self):
+        board = sl.Board(100, 100, 2500, seed=1, safe=(50, 50))
+        board.uncover(50, 50)
+        solution = saper_solver.Solver(100, 100, 2500).solve(saper_solver.visible_state(board))
+        self.assertTrue(all(0 <= p <= 1 for p in solution.probabilities.values()))
+        self.assertAlmostEqual(saper_solver.Solver(60, 40, 500).solve_current()
+                               .probabilities[0], 500 / 2400)
+
+    def test_incremental_update_matches_full_solve(self):
+        board = sl.Board(16, 16, 40, seed=3)
+        solver = saper_solver.Solver(16, 16, 40)
+        version = -1
+        for (x, y) in [(8, 8), (0, 0), (15, 15), (0, 15)]:
+            board.uncover(x, y)
+            (version, changes) = board.changes_since(version)
+            solver.update(changes)
+            fresh = saper_solver.Solver(16, 16, 40).solve_board(board)
+            self.assertEqual(solver.solve_current().probabilities, fresh.probabilities)
+
+
+class SelfPlayTest(unittest.TestCase):
+    def test_resume_matches_single_run(self):
+        configs = [(8, 8, 10)]
+        whole = saper_selfplay.Simulation(configs, 40, chunk_size=16)
+        for _ in whole.run(processes=1):
+            pass
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "checkpoint.json")
+            part = saper_selfplay.Simulation(configs, 20, chunk_size=16)
+            for _ in part.run(processes=1):
+                pass
+            part.save(path)
+            resumed = saper_selfplay.Simulation(configs, 40, chunk_size=16)
+            resumed.load(path)
+            self.assertEqual(len(resumed.tasks()), 2)
+            for _ in resumed.run(processes=1):
+                pass
+        (a, b) = (whole.stats[configs[0]], resumed.stats[configs[0]])
+        self.assertEqual((a.games, a.wins, a.guesses, a.bbbv), (b.games, b.wins, b.guesses, b.bbbv))
+        self.assertEqual(b.time.count, 40)
+
+
+class EndlessTest(unittest.TestCase):
+    def test_numbers_across_chunk_borders(self):
+        board = saper_endless.EndlessBoard(0.25, seed=4, cache_size=4)
+
+        def mine(x, y):
+            (key, bit) = saper_endless.chunk_of(x, y)
+            return board.mines(key) >> bit & 1
+        for (x, y) in [(31, 31), (32, 32), (-1, -1), (-33, 5), (0, -32), (63, 0)]:
+            expected = -1 if mine(x, y) else sum(mine(x + i, y + j)
+                                                 for i in (-1, 0, 1) for j in (-1, 0, 1))
+            self.assertEqual(board.number(x, y), expected)
+        again = saper_endless.EndlessBoard(0.25, seed=4)
+        self.assertEqual(again.numbers((1, 1)), board.numbers((1, 1)))
+
+    def test_solved_and_compacted_chunks(self):
+        board = saper_endless.EndlessBoard(0.2, seed=1)
+        self.assertEqual(board.uncover(0, 0), True)
+        self.assertEqual(board.number(0, 0), 0)
+        key = (5, -3)
+        for (x, y) in saper_endless.cells_of(key, saper_endless.FULL & ~board.mines(key)):
+            board.uncover(x, y)
+        self.assertEqual(board.lost, False)
+        self.assertIn(key, board.solved)
+        self.assertNotIn(key, board.opened)
+        self.assertEqual(board.compact(), len(board.explored()) - 1)
+        self.assertEqual(board.visible(0, 0), 0)
+        self.assertEqual(board.flag(200, 200), True)
+        (version, changes) = board.changes_since(board.version - 1)
+        self.assertEqual(changes, [((200, 200), sl.VISIBLE_FLAG)])
+
+
+class BackendConformance:
+    """ Testy, które musi przejść każdy backend planszy. Klasa testowa backendu
+    dziedziczy po tej klasie i po unittest.TestCase oraz ustawia 'backend'
+    na nazwę z 'saper_logic.BACKENDS'. Backend porównywany jest z planszą
+    'saper_logic.Board' o tych samych minach (odtworzonych przez 'restore'). """
+    backend = None
+
+    def make(self, seed=5):
+        reference = sl.Board(16, 16, 40, seed=seed)
+        board = sl.create_board(16, 16, 40, seed=seed, backend=self.backend)
+        board.restore(reference.mine_cells(), reference.state_cells())
+        return (reference, board)
+
+    def assertSameState(self, reference, board):
+        (expected, actual) = (sl.BoardBuffers(reference), sl.BoardBuffers(board))
+        self.assertEqual(actual.numbers.tolist(), expected.numbers.tolist())
+        self.assertEqual(actual.visible.tolist(), expected.visible.tolist())
+        for name in ("uncovered", "safe_left", "flags", "mines_revealed", "lost", "bbbv"):
+            self.assertEqual(getattr(board, name), getattr(reference, name), name)
+        self.assertEqual(board.check_for_win(), reference.check_for_win())
+
+    def test_moves_match_reference(self):
+        for seed in range(5):
+            (reference, board) = self.make(seed)
+            self.assertSameState(reference, board)
+            rng = random.Random(seed)
+            start = reference.numbers.index(0)
+            moves = [("uncover", start % 16, start // 16)]
+            while len(moves) < 60:
+                moves.append((rng.choice(("uncover", "flag", "flag", "quick_uncover")),
+                              rng.randrange(16), rng.randrange(16)))
+            for (move, x, y) in moves:
+                if reference.lost or reference.check_for_win():
+                    break
+                self.assertEqual(getattr(board, move)(x, y), getattr(reference, move)(x, y))
+                self.assertSameState(reference, board)
+
+    def test_change_stream(self):
+        (reference, board) = self.make()
+        start = reference.numbers.index(0)
+        version = board.version
+        board.uncover(start % 16, start // 16)
+        reference.uncover(start % 16, start // 16)
+        (version, changes) = board.changes_since(version)
+        self.assertEqual(sorted(changes), sorted(reference.changes_since(0)[1]))
+        board.trim(version)
+        self.assertEqual(board.changes_since(version), (version, []))
+        self.assertEqual(len(board.changes_since(version - 1)[1]), 256)
+
+    def test_lazy_first_uncover_is_safe(self):
+        board = sl.create_board(16, 16, 40, seed=3, backend=self.backend, lazy=True)
+        self.assertEqual(board.uncover(5, 5), True)
+        self.assertEqual(board.lost, False)
+        self.assertEqual(sl.BoardBuffers(board).numbers[5, 5], 0)
+        self.assertEqual(sum(board.mine_cells()), 40)
+
+    def test_crowded_first_uncover_is_safe(self):
+        for seed in range(10):
+            board = sl.create_board(4, 4, 14, seed=seed, backend=self.backend, lazy=True)
+            board.uncover(1, 1)
+            self.assertEqual(board.lost, False)
+            self.assertEqual(sum(board.mine_cells()), 14)
+
+    def test_buffers_are_live_read_only_views(self):
+        (reference, board) = self.make()
+        buffers = sl.BoardBuffers(board)
+        visible = buffers.visible
+        self.assertEqual((visible.format, visible.shape), ('b', (16, 16)))
+        self.assertEqual((buffers.numbers.format, buffers.numbers.shape), ('b', (16, 16)))
+        start = reference.numbers.index(0)
+        board.uncover(start % 16, start // 16)
+        self.assertIs(buffers.visible, visible)
+        self.assertEqual(visible[start // 16, start % 16], 0)
+        with self.assertRaises(TypeError):
+            visible[0, 0] = 1
+
+
+class PythonBackendTest(BackendConformance, unittest.TestCase):
+    backend = "python"
+
+    def test_backend_selection(self):
+        with unittest.mock.patch.dict(os.environ, {"SAPER_BACKEND": ""}):
+            self.assertIs(sl.backend_class(), sl.Board)
+        with unittest.mock.patch.dict(os.environ, {"SAPER_BACKEND": "bitboard"}):
+            self.assertIs(type(sl.create_board(9, 9, 10)), saper_bitboard.BitBoard)
+        with self.assertRaises(ValueError):
+            sl.backend_class("abacus")
+
+
+@unittest.skipIf(saper_numpy is None, "NumPy is not installed")
+class NumpyBackendTest(BackendConformance, unittest.TestCase):
+    backend = "numpy"
+
+
+class BitBoardBackendTest(BackendConformance, unittest.TestCase):
+    backend = "bitboard"
+
+
+class TopologyTest(unittest.TestCase):
+    def test_square_block(self):
+        grid = saper_topology.grid(4, 3)
+        self.assertEqual(grid.block(0), [0, 1, 4, 5])
+        self.assertEqual(sorted(grid.neighbours(5)), [0, 1, 2, 4, 6, 8, 9, 10])
+        self.assertEqual(len(set(grid.kinds)), 9)
+
+    def test_torus_and_hex_neighbours(self):
+        torus = saper_topology.grid(5, 4, saper_topology.TorusGrid)
+        self.assertEqual({len(torus.neighbours(i)) for i in range(20)}, {8})
+        self.assertEqual(sorted(torus.neighbours(0)), [1, 4, 5, 6, 9, 15, 16, 19])
+        hexes = saper_topology.grid(5, 4, saper_topology.HexGrid)
+        self.assertEqual(sorted(hexes.neighbours(7)), [2, 3, 6, 8, 12, 13])
+        self.assertEqual(sorted(hexes.neighbours(12)), [6, 7, 11, 13, 16, 17])
+
+    def test_torus_board(self):
+        board = sl.Board(6, 6, 5, seed=1, topology=saper_topology.TorusGrid)
+        torus = saper_topology.grid(6, 6, saper_topology.TorusGrid)
+        for (i, number) in enumerate(board.numbers):
+            if number != -1:
+                mines = sum(board.numbers[j] == -1 for j in torus.neighbours(i))
+                self.assertEqual(number, mines)
+        self.assertEqual(len(board.around(0, 0)), 9)
+
+
+@unittest.skipIf(saper_numpy is None, "NumPy is not installed")
+class NumpyBoardTest(unittest.TestCase):
+    def test_numbers_match_reference(self):
+        board = saper_numpy.NumpyBoard(30, 16, 99)
+        for y in range(board.height):
+            for x in range(board.width):
+                self.assertEqual(board.fields[y][x][0], board.get_number_of_mines(x, y))
+
+    def test_win_after_uncovering_all_safe_fields(self):
+        board = saper_numpy.NumpyBoard(9, 9, 10)
+        self.assertEqual(board.check_for_win(), False)
+        for y in range(board.height):
+            for x in range(board.width):
+                if board.fields[y][x][0] != -1:
+                    board.uncover(x, y)
+        self.assertEqual(board.check_for_win(), True)
+        self.assertEqual(board.lost, False)
+
 unittest.main()
\ No newline at end of file
@@ -0,0 +1,104 @@
+import threading
+from collections import OrderedDict
+from PyQt5.QtGui import QImage, QPainter, QPixmap
+from PyQt5.QtCore import Qt, QRect
+
+TILE_FILES = [f"{i}.png" for i in range(0, 9)] + \
+    ["blue_tile.png", "purple_tile.png", "naval-mine.png", "flag.png"]
+NUMBER_TILES = list(range(0, 9))
+DEFAULT_TILE = 9
+HOVER_TILE = 10
+MINE_TILE = 11
+FLAG_TILE = 12
+
+
+class TileCache:
+    """ Wspólna dla całego procesu pamięć podręczna tekstur pól.
+
+    Pliki z ikonkami wczytywane są tylko raz. Dla każdego rozmiaru pola
+    budowany jest atlas: jeden QPixmap, w którym przeskalowane tekstury
+    leżą obok siebie w kolejności 'TILE_FILES'. Przechowywane jest tylko
+    'keep' ostatnio używanych rozmiarów, starsze są usuwane po zmianie
+    rozmiaru okna. Liczniki 'hits' i 'misses' zliczają trafienia i
+    chybienia przy pobieraniu atlasów.
+
+    Pliki dekodowane są przy pierwszym użyciu albo, po wywołaniu 'preload',
+    w wątku w tle, dzięki czemu nie opóźniają pokazania pierwszego okna. """
+    def __init__(self, directory="./icons", keep=4):
+        self.directory = directory
+        self.keep = keep
+        self.sources = None
+        self.images = None
+        self.loader = None
+        self.atlases = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def preload(self):
+        """ Funkcja rozpoczynająca dekodowanie ikonek w wątku w tle. Wątek
+        tworzy obiekty QImage, które (w przeciwieństwie do QPixmap) można
+        tworzyć poza wątkiem GUI. """
+        if self.sources is None and self.loader is None:
+            self.loader = threading.Thread(target=self.decode, daemon=True)
+            self.loader.start()
+
+    def decode(self):
+        """ Funkcja dekodująca pliki ikonek do obiektów QImage. """
+        self.images = [QImage(f"{self.directory}/{name}") for name in TILE_FILES]
+
+    def load(self):
+        """ Funkcja wczytująca ikonki przy pierwszym użyciu. Jeśli trwa
+        dekodowanie w tle, czeka na jego koniec. """
+        if self.sources is None:
+            if self.loader is not None:
+                self.loader.join()
+                self.loader = None
+            else:
+                self.decode()
+            self.sources = [QPixmap.fromImage(image) for image in self.images]
+            self.images = None
+        return self.sources
+
+    def atlas(self, width, height):
+        """ Funkcja zwracająca atlas tekstur przeskalowanych do rozmiaru
+        width x height, budując go w razie potrzeby. """
+        key = (width, height)
+        atlas = self.atlases.get(key)
+        if atlas is not None:
+            self.hits += 1
+            self.atlases.move_to_end(key)
+            return atlas
+
+        self.misses += 1
+        sources = self.load()
+        atlas = QPixmap(width * len(sources), height)
+        atlas.fill(Qt.transparent)
+        painter = QPainter(atlas)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        for (i, pixmap) in enumerate(sources):
+            painter.drawPixmap(QRect(i * width, 0, width, height), pixmap)
+        painter.end()
+        self.atlases[key] = atlas
+        while len(self.atlases) > self.keep:
+            self.atlases.popitem(last=False)
+        return atlas
+
+    def source_rect(self, tile, width, height):
+        """ Funkcja zwracająca prostokąt tekstury 'tile' w atlasie. """
+        return QRect(tile * width, 0, width, height)
+
+    def draw(self, painter, rect, tile):
+        """ Funkcja rysująca teksturę 'tile' w prostokącie 'rect' bez
+        skalowania w czasie rysowania. """
+        (width, height) = (rect.width(), rect.height())
+        painter.drawPixmap(rect, self.atlas(width, height),
+                           self.source_rect(tile, width, height))
+
+    def clear(self):
+        """ Funkcja usuwająca wszystkie atlasy i zerująca liczniki. """
+        self.atlases.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+tile_cache = TileCache()